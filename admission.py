@@ -0,0 +1,76 @@
+# Admission control for endpoints that see deadline surges
+
+import threading
+from contextlib import contextmanager
+
+from werkzeug.exceptions import ServiceUnavailable
+
+from app import app, db
+
+
+class AdmissionGate:
+    """
+    Caps how many requests run a section at once in this worker.
+
+    Up to max_concurrent requests run; up to max_waiting more queue for a
+    slot for at most wait_seconds. Anything beyond that is shed at once with
+    a 503 and Retry-After, rather than piling up on the connection pool.
+    Queued requests hand back their database connection while they wait.
+    """
+
+    def __init__(self, max_concurrent, max_waiting, wait_seconds, message):
+        self.max_concurrent = max_concurrent
+        self.max_waiting = max_waiting
+        self.wait_seconds = wait_seconds
+        self.message = message
+        self.shed_count = 0
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def _shed(self):
+        with self._lock:
+            self.shed_count += 1
+        return ServiceUnavailable(description=self.message, retry_after=max(1, round(self.wait_seconds)))
+
+    @contextmanager
+    def admit(self):
+        """
+        Run the block once a slot is free.
+
+        Raises:
+            ServiceUnavailable: If too many requests are already queued or no
+            slot frees up within wait_seconds
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_waiting:
+                    queue_full = True
+                else:
+                    queue_full = False
+                    self._waiting += 1
+            if queue_full:
+                raise self._shed()
+
+            try:
+                db.session.commit()
+                acquired = self._slots.acquire(timeout=self.wait_seconds)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not acquired:
+                raise self._shed()
+
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+
+apply_gate = AdmissionGate(
+    max_concurrent=app.config['APPLY_MAX_CONCURRENT'],
+    max_waiting=app.config['APPLY_MAX_WAITING'],
+    wait_seconds=app.config['APPLY_WAIT_SECONDS'],
+    message='Too many applications are being submitted right now. Your application was not submitted; '
+            'please try again in a few seconds.'
+)
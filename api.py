@@ -0,0 +1,444 @@
+# Versioned JSON API for jobs, applications, interview rounds and feedback
+
+import json
+from datetime import datetime, date
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context, url_for
+from flask_login import current_user
+from app import db
+from models import (
+    CompanyProfile, JobPosting, Application, StudentProfile, InterviewRound,
+    InterviewFeedback, ReportJob, REPORT_DONE
+)
+from replica import replica_read
+from ranking import rank_candidates
+from recommendations import relevance_index
+from eligibility import eligibility_index
+from skills import parse_skills, students_with_skills
+from utils import live_season_filter
+
+api = Blueprint('api_v1', __name__, url_prefix='/api/v1')
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+# Rows fetched from the cursor at a time while streaming a list
+STREAM_BATCH_SIZE = 200
+
+# Field name -> column for each resource. Lists select only the requested
+# columns and serialize the result tuples directly, without ORM objects.
+JOB_FIELDS = {
+    'id': JobPosting.id,
+    'company_id': JobPosting.company_id,
+    'company_name': CompanyProfile.company_name,
+    'title': JobPosting.title,
+    'description': JobPosting.description,
+    'cgpa_criteria': JobPosting.cgpa_criteria,
+    'eligible_branches': JobPosting.eligible_branches,
+    'application_deadline': JobPosting.application_deadline,
+    'num_rounds': JobPosting.num_rounds,
+    'package_offered': JobPosting.package_offered,
+    'season': JobPosting.season,
+    'created_at': JobPosting.created_at,
+    'updated_at': JobPosting.updated_at,
+}
+JOB_DEFAULT_FIELDS = [
+    'id', 'company_name', 'title', 'cgpa_criteria', 'eligible_branches',
+    'application_deadline', 'package_offered'
+]
+
+APPLICATION_FIELDS = {
+    'id': Application.id,
+    'student_id': Application.student_id,
+    'student_name': StudentProfile.full_name,
+    'roll_number': StudentProfile.roll_number,
+    'branch': StudentProfile.branch,
+    'cgpa': StudentProfile.cgpa,
+    'job_id': Application.job_id,
+    'job_title': JobPosting.title,
+    'status': Application.status,
+    'applied_date': Application.applied_date,
+    'updated_date': Application.updated_date,
+}
+APPLICATION_DEFAULT_FIELDS = ['id', 'student_id', 'job_id', 'job_title', 'status', 'updated_date']
+
+ROUND_FIELDS = {
+    'id': InterviewRound.id,
+    'job_id': InterviewRound.job_id,
+    'round_number': InterviewRound.round_number,
+    'round_name': InterviewRound.round_name,
+    'round_description': InterviewRound.round_description,
+    'round_date': InterviewRound.round_date,
+}
+ROUND_DEFAULT_FIELDS = ['id', 'job_id', 'round_number', 'round_name', 'round_date']
+
+FEEDBACK_FIELDS = {
+    'id': InterviewFeedback.id,
+    'application_id': InterviewFeedback.application_id,
+    'round_id': InterviewFeedback.round_id,
+    'round_name': InterviewRound.round_name,
+    'job_id': Application.job_id,
+    'feedback': InterviewFeedback.feedback,
+    'rating': InterviewFeedback.rating,
+    'interviewer_name': InterviewFeedback.interviewer_name,
+    'created_at': InterviewFeedback.created_at,
+}
+FEEDBACK_DEFAULT_FIELDS = ['id', 'application_id', 'round_name', 'rating', 'feedback', 'created_at']
+
+
+class APIError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@api.errorhandler(APIError)
+def handle_api_error(e):
+    return jsonify({'error': e.message}), e.status
+
+
+@api.errorhandler(404)
+def handle_not_found(e):
+    return jsonify({'error': 'Not found'}), 404
+
+
+@api.before_request
+def require_login():
+    if not current_user.is_authenticated:
+        return jsonify({'error': 'Authentication required'}), 401
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'Cannot serialize {type(value).__name__}')
+
+
+def _dumps(value):
+    return json.dumps(value, default=_json_default, separators=(',', ':'))
+
+
+def _selected_fields(available, default):
+    """
+    Parse the ?fields= sparse fieldset parameter.
+
+    Args:
+        available: The resource's field -> column mapping
+        default: Field names returned when the parameter is absent
+
+    Returns:
+        list: The requested field names, always including 'id'
+    """
+    raw = request.args.get('fields')
+    if not raw:
+        return list(default)
+
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in available]
+    if unknown:
+        raise APIError(f'Unknown fields: {", ".join(unknown)}')
+
+    # The id is the pagination cursor, so it is always present
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return fields
+
+
+def _page_args():
+    """
+    Parse keyset pagination parameters (?after=<id>&limit=<n>).
+
+    Returns:
+        tuple: (after_id or None, limit)
+    """
+    try:
+        after = request.args.get('after', type=int)
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise APIError('limit must be an integer')
+
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise APIError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return after, limit
+
+
+def _stream_list(stmt, available, default, id_column):
+    """
+    Run a list query with sparse fields and keyset pagination, and stream
+    the JSON response as rows come off the cursor.
+
+    Args:
+        stmt: A function taking the selected columns and returning a Select
+        available: The resource's field -> column mapping
+        default: Default field names
+        id_column: Column used as the pagination key
+
+    Returns:
+        Response: A streamed application/json response
+    """
+    fields = _selected_fields(available, default)
+    after, limit = _page_args()
+
+    query = stmt([available[name].label(name) for name in fields])
+    if after is not None:
+        query = query.where(id_column > after)
+    query = query.order_by(id_column).limit(limit + 1).execution_options(yield_per=STREAM_BATCH_SIZE)
+
+    id_index = fields.index('id')
+    rows = db.session.execute(query)
+
+    def generate():
+        yield '{"data":['
+        count = 0
+        last_id = next_cursor = None
+        for row in rows:
+            # The extra row only tells us another page exists
+            if count == limit:
+                next_cursor = last_id
+                break
+            yield (',' if count else '') + _dumps(dict(zip(fields, row)))
+            last_id = row[id_index]
+            count += 1
+        rows.close()
+        yield '],"next_cursor":' + _dumps(next_cursor) + '}'
+
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
+
+def _require_student():
+    if not current_user.is_student():
+        raise APIError('Student privileges required', 403)
+    return current_user.student_profile
+
+
+def _get_job_for_user(job_id):
+    """
+    Load a job posting the current user is allowed to see.
+
+    Companies only see their own postings; students and CDC see all.
+    """
+    job = db.get_or_404(JobPosting, job_id)
+    if current_user.is_company() and job.company_id != current_user.company_profile.id:
+        raise APIError('You do not have permission to view this job', 403)
+    return job
+
+
+@api.route('/jobs')
+@replica_read
+def list_jobs():
+    def stmt(columns):
+        query = db.select(*columns).select_from(JobPosting).join(CompanyProfile).where(
+            live_season_filter(JobPosting.season, request.args.get('season'))
+        )
+        if current_user.is_company():
+            query = query.where(JobPosting.company_id == current_user.company_profile.id)
+        elif current_user.is_student() or request.args.get('active') == '1':
+            query = query.where(JobPosting.application_deadline >= datetime.utcnow())
+        return query
+
+    return _stream_list(stmt, JOB_FIELDS, JOB_DEFAULT_FIELDS, JobPosting.id)
+
+
+@api.route('/jobs/<int:job_id>')
+@replica_read
+def get_job(job_id):
+    _get_job_for_user(job_id)
+    fields = _selected_fields(JOB_FIELDS, list(JOB_FIELDS))
+    row = db.session.execute(
+        db.select(*[JOB_FIELDS[name] for name in fields])
+        .select_from(JobPosting).join(CompanyProfile)
+        .where(JobPosting.id == job_id)
+    ).one()
+    return Response(_dumps(dict(zip(fields, row))), mimetype='application/json')
+
+
+@api.route('/jobs/eligible')
+@replica_read
+def list_eligible_jobs():
+    student = _require_student()
+
+    # SQL equivalent of utils.check_eligibility, so pagination stays in the database
+    branch_match = (db.literal(',') + JobPosting.eligible_branches + ',').contains(f',{student.branch},')
+
+    def stmt(columns):
+        return db.select(*columns).select_from(JobPosting).join(CompanyProfile).where(
+            JobPosting.application_deadline >= datetime.utcnow(),
+            JobPosting.cgpa_criteria <= student.cgpa,
+            branch_match
+        )
+
+    return _stream_list(stmt, JOB_FIELDS, JOB_DEFAULT_FIELDS, JobPosting.id)
+
+
+@api.route('/jobs/<int:job_id>/rounds')
+@replica_read
+def list_job_rounds(job_id):
+    _get_job_for_user(job_id)
+
+    def stmt(columns):
+        return db.select(*columns).where(InterviewRound.job_id == job_id)
+
+    return _stream_list(stmt, ROUND_FIELDS, ROUND_DEFAULT_FIELDS, InterviewRound.id)
+
+
+@api.route('/applications')
+@replica_read
+def list_applications():
+    def stmt(columns):
+        query = db.select(*columns).select_from(Application).join(StudentProfile).join(JobPosting).where(
+            live_season_filter(JobPosting.season, request.args.get('season'))
+        )
+        if current_user.is_student():
+            query = query.where(Application.student_id == current_user.student_profile.id)
+        elif current_user.is_company():
+            query = query.where(JobPosting.company_id == current_user.company_profile.id)
+
+        job_id = request.args.get('job_id', type=int)
+        if job_id is not None:
+            query = query.where(Application.job_id == job_id)
+        status = request.args.get('status')
+        if status:
+            query = query.where(Application.status == status)
+        skills = parse_skills(request.args.get('skill'))
+        if skills:
+            query = query.where(Application.student_id.in_(students_with_skills(skills)))
+        return query
+
+    return _stream_list(stmt, APPLICATION_FIELDS, APPLICATION_DEFAULT_FIELDS, Application.id)
+
+
+@api.route('/applications/<int:application_id>/status')
+@replica_read
+def get_application_status(application_id):
+    application = db.get_or_404(Application, application_id)
+
+    # Same ownership checks as the HTML views in routes.py
+    if current_user.is_student() and application.student_id != current_user.student_profile.id:
+        raise APIError('You do not have permission to view this application', 403)
+    if current_user.is_company() and application.job_posting.company_id != current_user.company_profile.id:
+        raise APIError('You do not have permission to view this application', 403)
+
+    return jsonify({
+        'id': application.id,
+        'status': application.status,
+        'updated_date': application.updated_date.isoformat() if application.updated_date else None
+    })
+
+
+@api.route('/feedback')
+@replica_read
+def list_feedback():
+    def stmt(columns):
+        query = db.select(*columns).select_from(InterviewFeedback).join(InterviewRound).join(
+            Application, InterviewFeedback.application_id == Application.id
+        )
+        if current_user.is_student():
+            query = query.where(Application.student_id == current_user.student_profile.id)
+        elif current_user.is_company():
+            query = query.join(JobPosting, Application.job_id == JobPosting.id).where(
+                JobPosting.company_id == current_user.company_profile.id
+            )
+
+        application_id = request.args.get('application_id', type=int)
+        if application_id is not None:
+            query = query.where(InterviewFeedback.application_id == application_id)
+        return query
+
+    return _stream_list(stmt, FEEDBACK_FIELDS, FEEDBACK_DEFAULT_FIELDS, InterviewFeedback.id)
+
+
+@api.route('/jobs/<int:job_id>/ranking')
+@replica_read
+def get_job_ranking(job_id):
+    if current_user.is_student():
+        raise APIError('Company or CDC privileges required', 403)
+    job = _get_job_for_user(job_id)
+
+    top_k = request.args.get('k', DEFAULT_PAGE_SIZE, type=int)
+    if top_k < 1 or top_k > MAX_PAGE_SIZE:
+        raise APIError(f'k must be between 1 and {MAX_PAGE_SIZE}')
+
+    ranked = rank_candidates(job, top_k=top_k)
+    return Response(_dumps({'data': [candidate._asdict() for candidate in ranked]}),
+                    mimetype='application/json')
+
+
+@api.route('/jobs/<int:job_id>/matching-students')
+@replica_read
+def get_matching_students(job_id):
+    if current_user.is_student():
+        raise APIError('Company or CDC privileges required', 403)
+    job = _get_job_for_user(job_id)
+
+    top_k = request.args.get('k', DEFAULT_PAGE_SIZE, type=int)
+    if top_k < 1 or top_k > MAX_PAGE_SIZE:
+        raise APIError(f'k must be between 1 and {MAX_PAGE_SIZE}')
+
+    query = db.select(StudentProfile.id).where(
+        StudentProfile.cgpa >= job.cgpa_criteria,
+        StudentProfile.branch.in_(job.eligible_branches.split(','))
+    )
+    skills = parse_skills(request.args.get('skill'))
+    if skills:
+        query = query.where(StudentProfile.id.in_(students_with_skills(skills)))
+    eligible_ids = db.session.scalars(query).all()
+    ranked = relevance_index.rank_students_for_job(job.id, eligible_ids, top_k=top_k)
+    return Response(_dumps({'data': [{'student_id': student_id, 'score': score} for student_id, score in ranked]}),
+                    mimetype='application/json')
+
+
+# What-if counts while CDC sets up a posting: students admitted by
+# ?cgpa_criteria= and ?branches= (all branches when omitted), how many are
+# already placed, and the top ?limit= students by CGPA
+@api.route('/eligibility/preview')
+@replica_read
+def eligibility_preview():
+    if not current_user.is_cdc():
+        raise APIError('CDC privileges required', 403)
+
+    cgpa_criteria = request.args.get('cgpa_criteria', 0.0, type=float)
+    raw_branches = request.args.get('branches')
+    branches = [name.strip() for name in raw_branches.split(',') if name.strip()] if raw_branches else None
+    limit = request.args.get('limit', 20, type=int)
+    if limit < 0 or limit > MAX_PAGE_SIZE:
+        raise APIError(f'limit must be between 0 and {MAX_PAGE_SIZE}')
+
+    preview = eligibility_index.preview(cgpa_criteria, branches, limit=limit)
+
+    student_ids = preview.pop('student_ids')
+    rows = {row.id: row for row in db.session.execute(
+        db.select(StudentProfile.id, StudentProfile.full_name, StudentProfile.roll_number,
+                  StudentProfile.branch, StudentProfile.cgpa)
+        .where(StudentProfile.id.in_(student_ids))
+    )} if student_ids else {}
+    preview['students'] = [
+        {**rows[student_id]._asdict(), 'placed': eligibility_index.is_placed(student_id)}
+        for student_id in student_ids if student_id in rows
+    ]
+    return jsonify(preview)
+
+
+# Progress of an offline report job, polled by the CDC reports page
+@api.route('/reports/<int:job_id>')
+def report_status(job_id):
+    if not current_user.is_cdc():
+        raise APIError('CDC privileges required', 403)
+
+    job = db.get_or_404(ReportJob, job_id)
+    return Response(_dumps({
+        'id': job.id,
+        'kind': job.kind,
+        'format': job.format,
+        'season': job.season,
+        'status': job.status,
+        'error': job.error,
+        'row_count': job.row_count,
+        'file_size': job.file_size,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'queue_seconds': job.queue_seconds,
+        'run_seconds': job.run_seconds,
+        'download_url': url_for('cdc_download_report', job_id=job.id) if job.status == REPORT_DONE else None,
+    }), mimetype='application/json')
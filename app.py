@@ -5,6 +5,14 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
+from replica import RoutingSession, REPLICA_BIND_KEY
+from fragment_cache import fragments
+from blob_store import blob_store
+from sqlite_mode import write_queue
+from chatbot import knowledge_base
+from warmup import init_bytecode_cache
+from compression import compressor
+from static_assets import static_assets
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -14,7 +22,7 @@ class Base(DeclarativeBase):
     pass
 
 # Initialize SQLAlchemy
-db = SQLAlchemy(model_class=Base)
+db = SQLAlchemy(model_class=Base, session_options={"class_": RoutingSession})
 
 # Create the Flask app
 app = Flask(__name__)
@@ -29,8 +37,117 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
 }
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# Closed placement seasons can be moved to a separate archive database;
+# archiving is off unless ARCHIVE_DATABASE_URL is set
+app.config["SQLALCHEMY_BINDS"] = {}
+if os.environ.get("ARCHIVE_DATABASE_URL"):
+    app.config["SQLALCHEMY_BINDS"]["archive"] = os.environ["ARCHIVE_DATABASE_URL"]
+# Academic year such as "2025-26"; derived from today's date when unset
+app.config["CURRENT_SEASON"] = os.environ.get("CURRENT_SEASON")
+
+# Optional read replica; read-only views opt in with @replica_read
+if os.environ.get("DATABASE_REPLICA_URL"):
+    app.config["SQLALCHEMY_BINDS"][REPLICA_BIND_KEY] = os.environ["DATABASE_REPLICA_URL"]
+app.config["REPLICA_STICKY_SECONDS"] = int(os.environ.get("REPLICA_STICKY_SECONDS", "5"))
+
+# Assumed interview lengths for schedule conflict checks
+app.config["INTERVIEW_ROUND_MINUTES"] = int(os.environ.get("INTERVIEW_ROUND_MINUTES", "60"))
+app.config["MOCK_INTERVIEW_MINUTES"] = int(os.environ.get("MOCK_INTERVIEW_MINUTES", "45"))
+
+# Fragment cache for rendered partials ("memory" per worker, or "sqlite" shared)
+app.config["FRAGMENT_CACHE_BACKEND"] = os.environ.get("FRAGMENT_CACHE_BACKEND", "memory")
+app.config["FRAGMENT_CACHE_PATH"] = os.environ.get("FRAGMENT_CACHE_PATH")
+# Seconds and number of fragments kept by the shared "sqlite" backend
+app.config["FRAGMENT_CACHE_TTL_SECONDS"] = int(os.environ.get("FRAGMENT_CACHE_TTL_SECONDS", "86400"))
+app.config["FRAGMENT_CACHE_MAX_ENTRIES"] = int(os.environ.get("FRAGMENT_CACHE_MAX_ENTRIES", "100000"))
+
+# Live update fan-out between workers ("memory" for one worker, or "sqlite")
+app.config["LIVE_UPDATES_BACKEND"] = os.environ.get("LIVE_UPDATES_BACKEND", "memory")
+app.config["LIVE_UPDATES_PATH"] = os.environ.get("LIVE_UPDATES_PATH")
+app.config["LIVE_UPDATES_KEEPALIVE_SECONDS"] = 15
+
+# Optionally keep resumes in a compressed, content-addressed local blob store
+app.config["RESUME_BLOB_STORE"] = os.environ.get("RESUME_BLOB_STORE", "0") == "1"
+app.config["BLOB_STORE_PATH"] = os.environ.get("BLOB_STORE_PATH")
+
+# SQLite production settings, applied to SQLite databases only. WAL lets
+# pages keep reading while a submission is being written.
+app.config["SQLITE_JOURNAL_MODE"] = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+app.config["SQLITE_SYNCHRONOUS"] = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+app.config["SQLITE_BUSY_TIMEOUT_MS"] = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+app.config["SQLITE_CACHE_SIZE_KB"] = int(os.environ.get("SQLITE_CACHE_SIZE_KB", "65536"))
+app.config["SQLITE_MMAP_SIZE"] = int(os.environ.get("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Serialize applications, status updates and feedback through one writer
+# thread per worker and commit them in batches
+app.config["SQLITE_WRITE_QUEUE"] = os.environ.get("SQLITE_WRITE_QUEUE", "0") == "1"
+app.config["SQLITE_WRITE_BATCH_SIZE"] = int(os.environ.get("SQLITE_WRITE_BATCH_SIZE", "50"))
+
+# Surge protection for student_apply: concurrent applies per worker, how many
+# may queue for a slot and for how long before being told to retry
+app.config["APPLY_MAX_CONCURRENT"] = int(os.environ.get("APPLY_MAX_CONCURRENT", "8"))
+app.config["APPLY_MAX_WAITING"] = int(os.environ.get("APPLY_MAX_WAITING", "32"))
+app.config["APPLY_WAIT_SECONDS"] = float(os.environ.get("APPLY_WAIT_SECONDS", "2"))
+# Seconds a worker trusts its cached set of jobs a student has applied to
+app.config["APPLIED_JOBS_TTL_SECONDS"] = int(os.environ.get("APPLIED_JOBS_TTL_SECONDS", "60"))
+# Hours a stored Idempotency-Key response is replayed
+app.config["IDEMPOTENCY_KEY_TTL_HOURS"] = int(os.environ.get("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+# Placement policy: comma-separated rules ("one_offer": a student holding an
+# offer may only apply to jobs paying more than PLACEMENT_UPGRADE_RATIO times
+# it; empty disables), dream companies exempt from them (by name, and any job
+# paying at least PLACEMENT_DREAM_PACKAGE_LPA), and how long a worker trusts
+# its cached copy of a student's offers
+app.config["PLACEMENT_POLICY_RULES"] = os.environ.get("PLACEMENT_POLICY_RULES", "one_offer")
+app.config["PLACEMENT_UPGRADE_RATIO"] = float(os.environ.get("PLACEMENT_UPGRADE_RATIO", "1.0"))
+app.config["PLACEMENT_DREAM_COMPANIES"] = os.environ.get("PLACEMENT_DREAM_COMPANIES", "")
+app.config["PLACEMENT_DREAM_PACKAGE_LPA"] = (
+    float(os.environ["PLACEMENT_DREAM_PACKAGE_LPA"]) if os.environ.get("PLACEMENT_DREAM_PACKAGE_LPA") else None
+)
+app.config["PLACEMENT_OFFER_TTL_SECONDS"] = int(os.environ.get("PLACEMENT_OFFER_TTL_SECONDS", "60"))
+
+# Chatbot FAQ file (defaults to data/chatbot_faq.json) and how often, in
+# seconds, it is checked for edits to load without a restart
+app.config["CHATBOT_KB_PATH"] = os.environ.get("CHATBOT_KB_PATH")
+app.config["CHATBOT_KB_RELOAD_SECONDS"] = int(os.environ.get("CHATBOT_KB_RELOAD_SECONDS", "5"))
+
+# Offline placement reports: worker processes per web worker, queued or
+# running jobs allowed site-wide and per user, render time limit, and where
+# finished files are kept (defaults to instance/reports)
+app.config["REPORT_WORKERS"] = int(os.environ.get("REPORT_WORKERS", "2"))
+app.config["REPORT_MAX_PENDING"] = int(os.environ.get("REPORT_MAX_PENDING", "10"))
+app.config["REPORT_MAX_PENDING_PER_USER"] = int(os.environ.get("REPORT_MAX_PENDING_PER_USER", "3"))
+app.config["REPORT_TIMEOUT_SECONDS"] = int(os.environ.get("REPORT_TIMEOUT_SECONDS", "900"))
+app.config["REPORT_STORAGE_PATH"] = os.environ.get("REPORT_STORAGE_PATH")
+
+# Compiled templates are cached on disk and shared by workers (defaults to
+# instance/jinja_cache); fill it at deploy time with `flask precompile-templates`
+app.config["JINJA_BYTECODE_CACHE"] = os.environ.get("JINJA_BYTECODE_CACHE", "1") == "1"
+app.config["JINJA_BYTECODE_CACHE_PATH"] = os.environ.get("JINJA_BYTECODE_CACHE_PATH")
+# Load templates and configure mappers when a worker starts, before it serves
+app.config["WORKER_WARMUP"] = os.environ.get("WORKER_WARMUP", "1") == "1"
+
+# Gzip (and Brotli, when installed) for text responses of at least this many bytes
+app.config["COMPRESS_MIN_SIZE"] = int(os.environ.get("COMPRESS_MIN_SIZE", "500"))
+app.config["COMPRESS_LEVEL"] = int(os.environ.get("COMPRESS_LEVEL", "6"))
+app.config["COMPRESS_BROTLI_QUALITY"] = int(os.environ.get("COMPRESS_BROTLI_QUALITY", "5"))
+# Fingerprinted, precompressed static files written by `flask build-assets`
+# (defaults to instance/assets)
+app.config["ASSETS_BUILD_PATH"] = os.environ.get("ASSETS_BUILD_PATH")
+
+# Resume skill extraction: the skill taxonomy (defaults to data/skills.json)
+# and worker processes per web worker that extract skills from saved
+# resumes (0 leaves it to `flask extract-skills`)
+app.config["SKILLS_TAXONOMY_PATH"] = os.environ.get("SKILLS_TAXONOMY_PATH")
+app.config["SKILL_EXTRACTION_WORKERS"] = int(os.environ.get("SKILL_EXTRACTION_WORKERS", "1"))
+
 # Initialize the database
 db.init_app(app)
+fragments.init_app(app)
+blob_store.init_app(app)
+knowledge_base.init_app(app)
+init_bytecode_cache(app)
+compressor.init_app(app)
+static_assets.init_app(app)
 
 # Setup Flask-Login
 login_manager = LoginManager()
@@ -39,9 +156,13 @@ login_manager.login_view = 'login'
 login_manager.login_message_category = 'info'
 
 with app.app_context():
+    # Pragmas must be in place before the first connection is opened
+    write_queue.init_app(app, db)
+    
     # Import models to ensure tables are created
     import models
-    db.create_all()
+    # Tables of binds that are not configured (the archive) are skipped
+    db.create_all(bind_key=[key for key in db.metadatas if key is None or key in db.engines])
     
     # Set up the user loader for Flask-Login
     @login_manager.user_loader
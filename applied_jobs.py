@@ -0,0 +1,80 @@
+# Per-worker cache of the jobs each student has applied to
+
+import threading
+import time
+from collections import OrderedDict
+
+from app import app, db
+from commit_hooks import on_commit
+from models import Application
+
+# Students whose applied sets are kept per worker
+MAX_STUDENTS = 20000
+
+
+class AppliedJobs:
+    """
+    Caches, per student, the set of job ids they have applied to, so a
+    repeated apply can be answered without touching the database.
+
+    Sets are loaded with one indexed query and kept in step with this
+    worker's commits. Applications made or withdrawn through other workers
+    are picked up when the entry expires after ttl seconds; the unique
+    constraint on Application remains the real guard against duplicates.
+    """
+
+    def __init__(self, ttl=60, max_students=MAX_STUDENTS):
+        self.ttl = ttl
+        self.max_students = max_students
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load(self, student_id):
+        job_ids = set(db.session.execute(
+            db.select(Application.job_id).where(Application.student_id == student_id)
+        ).scalars())
+        with self._lock:
+            self._entries[student_id] = (time.monotonic(), job_ids)
+            self._entries.move_to_end(student_id)
+            while len(self._entries) > self.max_students:
+                self._entries.popitem(last=False)
+        return job_ids
+
+    def has_applied(self, student_id, job_id):
+        """
+        Check whether a student has applied to a job.
+
+        Returns:
+            bool: True if an application exists (as of at most ttl seconds ago)
+        """
+        with self._lock:
+            entry = self._entries.get(student_id)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return job_id in self._load(student_id)
+        return job_id in entry[1]
+
+    def apply_changes(self, changes):
+        with self._lock:
+            for applied, student_id, job_id in changes:
+                entry = self._entries.get(student_id)
+                if entry is None:
+                    continue
+                if applied:
+                    entry[1].add(job_id)
+                else:
+                    entry[1].discard(job_id)
+
+
+applied_jobs = AppliedJobs(ttl=app.config['APPLIED_JOBS_TTL_SECONDS'])
+
+
+def _collect_changes(session, changes):
+    for obj in session.new:
+        if isinstance(obj, Application):
+            changes.append((True, obj.student_id, obj.job_id))
+    for obj in session.deleted:
+        if isinstance(obj, Application):
+            changes.append((False, obj.student_id, obj.job_id))
+
+
+on_commit('applied_job_changes', _collect_changes, applied_jobs.apply_changes)
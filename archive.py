@@ -0,0 +1,215 @@
+# Archival of closed placement seasons into the "archive" bind
+
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from app import db
+from models import (
+    JobPosting, Application, InterviewRound, InterviewSlot, InterviewFeedback,
+    CompanyProfile, StudentProfile, ApplicationStatusEvent, FunnelStat,
+    ArchivedJobPosting, ArchivedApplication, ArchivedInterviewRound, ArchivedInterviewFeedback,
+    ArchivedApplicationStatusEvent, ArchivedFunnelStat
+)
+from funnel import FunnelAggregator
+from utils import current_season
+
+# Bind key of the archive database, configured by ARCHIVE_DATABASE_URL
+ARCHIVE_BIND_KEY = 'archive'
+
+# Job postings moved per batch, together with their rounds, applications and feedback
+DEFAULT_BATCH_SIZE = 200
+
+
+def archive_enabled():
+    """Whether an archive database is configured."""
+    return ARCHIVE_BIND_KEY in db.engines
+
+
+def _rows(statement):
+    return [dict(row._mapping) for row in db.session.execute(statement)]
+
+
+def _copy_batch(job_ids):
+    """
+    Copy a batch of postings and their history into the archive database.
+
+    Rows already in the archive (from a run interrupted after this step) are
+    replaced, so copying the same batch twice is harmless.
+    """
+    jobs = _rows(
+        db.select(JobPosting.id, JobPosting.company_id, CompanyProfile.company_name, JobPosting.title,
+                  JobPosting.description, JobPosting.cgpa_criteria, JobPosting.eligible_branches,
+                  JobPosting.application_deadline, JobPosting.num_rounds, JobPosting.package_offered,
+                  JobPosting.season, JobPosting.created_at)
+        .join(CompanyProfile).where(JobPosting.id.in_(job_ids))
+    )
+    applications = _rows(
+        db.select(Application.id, Application.student_id, Application.job_id, StudentProfile.branch,
+                  StudentProfile.cgpa, Application.status, Application.applied_date, Application.updated_date)
+        .join(StudentProfile).where(Application.job_id.in_(job_ids))
+    )
+    rounds = _rows(
+        db.select(InterviewRound.id, InterviewRound.job_id, InterviewRound.round_number, InterviewRound.round_name,
+                  InterviewRound.round_description, InterviewRound.round_date)
+        .where(InterviewRound.job_id.in_(job_ids))
+    )
+    feedbacks = _rows(
+        db.select(InterviewFeedback.id, InterviewFeedback.application_id, InterviewFeedback.round_id,
+                  InterviewFeedback.feedback, InterviewFeedback.rating, InterviewFeedback.interviewer_name,
+                  InterviewFeedback.created_at)
+        .join(InterviewRound).where(InterviewRound.job_id.in_(job_ids))
+    )
+    events = _rows(
+        db.select(ApplicationStatusEvent.id, ApplicationStatusEvent.application_id, ApplicationStatusEvent.job_id,
+                  ApplicationStatusEvent.student_id, ApplicationStatusEvent.branch,
+                  ApplicationStatusEvent.from_status, ApplicationStatusEvent.to_status,
+                  ApplicationStatusEvent.created_at)
+        .where(ApplicationStatusEvent.job_id.in_(job_ids))
+    )
+    stats = _rows(
+        db.select(FunnelStat.id, FunnelStat.job_id, FunnelStat.branch, FunnelStat.status, FunnelStat.entered,
+                  FunnelStat.exited, FunnelStat.current, FunnelStat.seconds_in_stage)
+        .where(FunnelStat.job_id.in_(job_ids))
+    )
+
+    archived_at = datetime.utcnow()
+    for job in jobs:
+        job['archived_at'] = archived_at
+
+    with db.engines[ARCHIVE_BIND_KEY].begin() as connection:
+        for model, rows in (
+            (ArchivedJobPosting, jobs), (ArchivedApplication, applications),
+            (ArchivedInterviewRound, rounds), (ArchivedInterviewFeedback, feedbacks),
+            (ArchivedApplicationStatusEvent, events), (ArchivedFunnelStat, stats),
+        ):
+            if rows:
+                connection.execute(sa.delete(model).where(model.id.in_([row['id'] for row in rows])))
+                connection.execute(sa.insert(model), rows)
+
+    return len(applications)
+
+
+def _delete_batch(job_ids):
+    """
+    Remove a copied batch from the live tables, children first.
+    """
+    round_ids = db.select(InterviewRound.id).where(InterviewRound.job_id.in_(job_ids))
+    application_ids = db.select(Application.id).where(Application.job_id.in_(job_ids))
+
+    db.session.execute(db.delete(InterviewFeedback).where(InterviewFeedback.round_id.in_(round_ids)))
+    db.session.execute(db.delete(InterviewSlot).where(InterviewSlot.application_id.in_(application_ids)))
+    db.session.execute(db.delete(Application).where(Application.job_id.in_(job_ids)))
+    db.session.execute(db.delete(InterviewRound).where(InterviewRound.job_id.in_(job_ids)))
+    db.session.execute(db.delete(ApplicationStatusEvent).where(ApplicationStatusEvent.job_id.in_(job_ids)))
+    db.session.execute(db.delete(FunnelStat).where(FunnelStat.job_id.in_(job_ids)))
+    db.session.execute(db.delete(JobPosting).where(JobPosting.id.in_(job_ids)))
+
+
+def archive_season(season, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """
+    Move a closed season from the live tables into the archive database.
+
+    Each batch is committed to the archive before it is deleted from the
+    live tables, and the live tables are the record of what is left to do,
+    so an interrupted run is resumed by running it again. Status events
+    and funnel statistics move with their jobs; pending events are folded
+    into the funnel statistics first so none are lost.
+
+    Args:
+        season: The season to archive, e.g. '2024-25'
+        batch_size: Job postings moved per batch
+        progress: Optional callable taking (jobs moved, applications moved)
+
+    Returns:
+        tuple: (job postings archived, applications archived)
+
+    Raises:
+        ValueError: If the season is the current one, or no archive
+        database is configured
+    """
+    if not archive_enabled():
+        raise ValueError('Set ARCHIVE_DATABASE_URL to enable the archive first')
+    if season == current_season():
+        raise ValueError(f'Season {season} is still the current season')
+
+    FunnelAggregator().run()
+
+    jobs_moved = applications_moved = 0
+    while True:
+        job_ids = db.session.execute(
+            db.select(JobPosting.id).where(JobPosting.season == season)
+            .order_by(JobPosting.id).limit(batch_size)
+        ).scalars().all()
+        if not job_ids:
+            break
+
+        applications_moved += _copy_batch(job_ids)
+        _delete_batch(job_ids)
+        db.session.commit()
+
+        jobs_moved += len(job_ids)
+        if progress is not None:
+            progress(jobs_moved, applications_moved)
+
+    return jobs_moved, applications_moved
+
+
+def live_seasons():
+    """
+    Seasons that still have postings in the live tables, newest first.
+    """
+    return db.session.execute(
+        db.select(JobPosting.season).distinct().order_by(JobPosting.season.desc())
+    ).scalars().all()
+
+
+def archived_seasons():
+    """
+    Seasons that have been moved to the archive, newest first.
+    """
+    if not archive_enabled():
+        return []
+    return db.session.execute(
+        db.select(ArchivedJobPosting.season).distinct().order_by(ArchivedJobPosting.season.desc())
+    ).scalars().all()
+
+
+def season_applications(season):
+    """
+    Applications of one season as flat rows for analytics and exports.
+
+    Reads both the live tables and the archive, so a season that is only
+    partly archived is still complete; rows present in both (a batch copied
+    but not yet deleted) are returned once.
+
+    Args:
+        season: The season, e.g. '2024-25'
+
+    Returns:
+        list: Rows with application_id, student_id, branch, cgpa, job_id,
+        job_title, company_name, package_offered, status, applied_date and
+        updated_date, ordered by application_id
+    """
+    archived = [] if not archive_enabled() else db.session.execute(
+        db.select(
+            ArchivedApplication.id.label('application_id'), ArchivedApplication.student_id,
+            ArchivedApplication.branch, ArchivedApplication.cgpa, ArchivedApplication.job_id,
+            ArchivedJobPosting.title.label('job_title'), ArchivedJobPosting.company_name,
+            ArchivedJobPosting.package_offered, ArchivedApplication.status, ArchivedApplication.applied_date, ArchivedApplication.updated_date
+        ).join(ArchivedJobPosting, ArchivedApplication.job_id == ArchivedJobPosting.id)
+        .where(ArchivedJobPosting.season == season)
+    ).all()
+    live = db.session.execute(
+        db.select(
+            Application.id.label('application_id'), Application.student_id, StudentProfile.branch,
+            StudentProfile.cgpa, Application.job_id, JobPosting.title.label('job_title'),
+            CompanyProfile.company_name, JobPosting.package_offered, Application.status,
+            Application.applied_date, Application.updated_date
+        ).select_from(Application).join(StudentProfile).join(JobPosting).join(CompanyProfile)
+        .where(JobPosting.season == season)
+    ).all()
+
+    rows = {row.application_id: row for row in archived}
+    rows.update((row.application_id, row) for row in live)
+    return [rows[application_id] for application_id in sorted(rows)]
@@ -0,0 +1,84 @@
+# Content-addressed, compressed local storage for large text blobs
+
+import hashlib
+import logging
+import os
+import tempfile
+import zlib
+
+
+def content_digest(text):
+    """
+    Return the SHA-256 hex digest identifying a piece of text.
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class BlobStore:
+    """
+    Stores text under its SHA-256 digest as zlib-compressed files, two
+    directory levels deep (ab/cdef...). Identical content is stored once and
+    files are never modified after they are written, so readers need no
+    locking.
+    """
+
+    def __init__(self, app=None):
+        self.path = None
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RESUME_BLOB_STORE', False)
+        self.path = app.config.get('BLOB_STORE_PATH') or os.path.join(app.instance_path, 'blobs')
+        if self.enabled:
+            os.makedirs(self.path, exist_ok=True)
+
+    def _file_for(self, digest):
+        return os.path.join(self.path, digest[:2], digest[2:])
+
+    def put(self, text):
+        """
+        Store text and return its digest.
+
+        Args:
+            text: The text to store
+
+        Returns:
+            str: The digest to keep in the database
+        """
+        digest = content_digest(text)
+        target = self._file_for(digest)
+        if os.path.exists(target):
+            return digest
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(target))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(zlib.compress(text.encode('utf-8'), 6))
+            # Atomic, so concurrent writers of the same content are harmless
+            os.replace(temp_path, target)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return digest
+
+    def get(self, digest):
+        """
+        Load the text stored under a digest.
+
+        Returns:
+            str: The text, or None if the blob is missing or unreadable
+            (logged, so one lost file does not break the pages showing it)
+        """
+        try:
+            with open(self._file_for(digest), 'rb') as f:
+                return zlib.decompress(f.read()).decode('utf-8')
+        except (OSError, zlib.error) as e:
+            logging.error(f'Could not read blob {digest}: {e}')
+            return None
+
+
+blob_store = BlobStore()
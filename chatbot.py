@@ -1,77 +1,223 @@
-# Simple rule-based chatbot for placement-related queries
+# Placement assistant chatbot backed by a ranked FAQ knowledge base
 
+import json
+import logging
+import math
+import os
+import random
 import re
+import threading
+import time
+from collections import Counter
+
+# BM25 parameters: term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Question and keyword terms count this many times more than answer terms
+TITLE_WEIGHT = 3
+
+# Queries scoring below this get a default response
+MIN_SCORE = 1.0
+
+# Seconds between checks of the knowledge base file for changes
+DEFAULT_RELOAD_SECONDS = 5
+
+STOP_WORDS = frozenset("""
+    a about after all also am an and any are as at be been before but by can could
+    did do does doing for from get got had has have how i if in into is it its me
+    my of on or our should so some than that the their them then there these they
+    this to us was we what when where which who why will with would you your
+""".split())
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """
+    Split text into lowercase index terms, dropping stop words and
+    reducing simple plurals ("tips" -> "tip").
+    """
+    terms = []
+    for word in TOKEN_RE.findall(text.lower()):
+        if word in STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+
+class _Index:
+    """
+    Inverted index over FAQ entries. Each posting holds the entry's
+    precomputed BM25 weight for the term, so a query only sums the postings
+    of its own terms and its cost does not grow with the number of entries.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+        documents = []
+        for entry in entries:
+            title = entry['question'] + ' ' + ' '.join(entry.get('keywords', []))
+            terms = tokenize(title) * TITLE_WEIGHT + tokenize(' '.join(entry['answers']))
+            documents.append(Counter(terms))
+
+        lengths = [sum(counts.values()) for counts in documents]
+        average_length = (sum(lengths) / len(lengths)) if lengths else 0
+
+        document_frequency = Counter()
+        for counts in documents:
+            document_frequency.update(counts.keys())
+
+        total = len(documents)
+        self.postings = {}
+        for position, counts in enumerate(documents):
+            # Without any terms at all there is no length to normalize by
+            if average_length:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[position] / average_length)
+            else:
+                norm = BM25_K1
+            for term, frequency in counts.items():
+                df = document_frequency[term]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                weight = idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                self.postings.setdefault(term, []).append((position, weight))
+
+    def search(self, query):
+        """
+        Find the best matching entry for a query.
+
+        Returns:
+            tuple: (entry, score), or (None, 0.0) if no term matched
+        """
+        scores = Counter()
+        for term in set(tokenize(query)):
+            for position, weight in self.postings.get(term, ()):
+                scores[position] += weight
+        if not scores:
+            return None, 0.0
+        position, score = scores.most_common(1)[0]
+        return self.entries[position], score
+
+
+def load_entries(path):
+    """
+    Read and check FAQ entries from a JSON file: a list of objects with a
+    "question" string, an optional list of "keywords" strings and a
+    non-empty list of "answers" strings.
+
+    Raises:
+        ValueError: If an entry is malformed
+    """
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    if not isinstance(entries, list):
+        raise ValueError('Knowledge base must be a JSON list of entries')
+    for number, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict):
+            raise ValueError(f'Entry {number} must be an object')
+        question, answers = entry.get('question'), entry.get('answers')
+        if not question or not isinstance(question, str):
+            raise ValueError(f'Entry {number} needs a question string')
+        if not answers or not isinstance(answers, list) or not all(isinstance(answer, str) for answer in answers):
+            raise ValueError(f'Entry {number} needs a non-empty list of answer strings')
+        keywords = entry.get('keywords', [])
+        if not isinstance(keywords, list) or not all(isinstance(keyword, str) for keyword in keywords):
+            raise ValueError(f'Keywords of entry {number} must be a list of strings')
+    return entries
+
+
+class KnowledgeBase:
+    """
+    FAQ knowledge base loaded from a JSON file into an in-memory index.
+
+    The file is checked for changes at most every reload_seconds; a changed
+    file is indexed in full on a background thread and then swapped in with
+    a single assignment, so queries keep using the old index until the new
+    one is complete and never wait for the rebuild.
+    A file that fails to load leaves the current index in place.
+    """
+
+    def __init__(self, app=None):
+        self.path = None
+        self.reload_seconds = DEFAULT_RELOAD_SECONDS
+        self._index = _Index([])
+        self._mtime = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.path = app.config.get('CHATBOT_KB_PATH') or os.path.join(app.root_path, 'data', 'chatbot_faq.json')
+        self.reload_seconds = app.config.get('CHATBOT_KB_RELOAD_SECONDS', DEFAULT_RELOAD_SECONDS)
+        self.reload()
+
+    def reload(self):
+        """
+        Rebuild the index from the file and swap it in.
+
+        Returns:
+            bool: True if the new index is in use
+        """
+        with self._reload_lock:
+            try:
+                # Recorded even if loading fails, so a broken file is retried
+                # only once it is edited again
+                self._mtime = os.stat(self.path).st_mtime_ns
+                index = _Index(load_entries(self.path))
+            except (OSError, ValueError) as e:
+                logging.error(f"Could not load chatbot knowledge base {self.path}: {e}")
+                return False
+            except Exception:
+                # Never let a bad file stop the app from starting or kill the
+                # reload thread; keep answering from the current index
+                logging.exception(f"Could not index chatbot knowledge base {self.path}")
+                return False
+            self._index = index
+            return True
+
+    def _reload_if_changed(self):
+        now = time.monotonic()
+        if self.path is None or now - self._checked_at < self.reload_seconds:
+            return
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            threading.Thread(target=self.reload, daemon=True).start()
+
+    def __len__(self):
+        return len(self._index.entries)
+
+    def search(self, query):
+        """
+        Find the best matching FAQ entry.
+
+        Args:
+            query: The user's message
+
+        Returns:
+            dict: The entry, or None if nothing scored at least MIN_SCORE
+        """
+        self._reload_if_changed()
+        entry, score = self._index.search(query)
+        return entry if score >= MIN_SCORE else None
+
+
+knowledge_base = KnowledgeBase()
 
-# Define patterns and responses
-FAQ_RESPONSES = {
-    r'(?i).*resume.*': [
-        "For a good resume, focus on these key elements: 1) Clear formatting, 2) Relevant skills and experiences, 3) Quantifiable achievements, and 4) No grammar/spelling errors. Keep it to one page if possible.",
-        "Here are some resume tips: 1) Use action verbs, 2) Customize for each job, 3) Include relevant projects and internships, 4) Highlight technical skills relevant to the position."
-    ],
-    
-    r'(?i).*interview.*tips.*': [
-        "Interview tips: 1) Research the company thoroughly, 2) Practice common questions, 3) Prepare examples of your work/projects, 4) Dress professionally, 5) Arrive early, 6) Ask thoughtful questions.",
-        "For technical interviews: 1) Review core concepts, 2) Practice problem-solving aloud, 3) Clarify questions before answering, 4) Show your thought process, 5) Test your solutions with examples."
-    ],
-    
-    r'(?i).*prepare.*technical.*interview.*': [
-        "For technical interviews: 1) Study fundamental concepts in your field, 2) Practice coding problems on platforms like LeetCode or HackerRank, 3) Review data structures and algorithms, 4) Be ready to explain your thought process.",
-        "Technical interview preparation: 1) Review your resume projects and be ready to discuss them in detail, 2) Practice system design if relevant, 3) Brush up on language-specific concepts, 4) Understand the company's technical stack."
-    ],
-    
-    r'(?i).*placement.*process.*': [
-        "The typical placement process includes: 1) Resume submission, 2) Aptitude/technical test, 3) Technical interview, 4) HR interview, and 5) Final selection. The number of rounds may vary by company.",
-        "Each company's placement process is slightly different. Generally, there's a pre-placement talk, followed by screening tests, multiple rounds of interviews, and then final selection."
-    ],
-    
-    r'(?i).*aptitude.*test.*': [
-        "To prepare for aptitude tests: 1) Practice quantitative problems, 2) Improve logical reasoning, 3) Work on verbal ability, 4) Take timed mock tests, 5) Review basic mathematics (percentages, ratios, etc.)",
-        "Aptitude tests typically cover numerical ability, logical reasoning, verbal ability, and sometimes technical knowledge. Regular practice using resources like IndiaBix or previous year questions is helpful."
-    ],
-    
-    r'(?i).*group.*discussion.*': [
-        "Group discussion tips: 1) Initiate or conclude if possible, 2) Be clear and concise, 3) Support points with examples, 4) Listen actively, 5) Be respectful of others' views, 6) Include quiet participants.",
-        "In group discussions, focus on: 1) Content quality over quantity, 2) Body language, 3) Logical flow of thoughts, 4) Balancing assertiveness with respect, 5) Staying on topic."
-    ],
-    
-    r'(?i).*hr.*interview.*': [
-        "For HR interviews: 1) Be ready to discuss your background, 2) Prepare for 'Tell me about yourself', 3) Know why you want to join the company, 4) Ask thoughtful questions, 5) Understand the company culture.",
-        "Common HR questions include: 'Why should we hire you?', 'Where do you see yourself in 5 years?', 'What are your strengths/weaknesses?', 'Why do you want to work with us?', 'How do you handle stress?'"
-    ],
-    
-    r'(?i).*dress.*code.*': [
-        "For placement interviews, business formal is usually expected. Men: formal shirt, trousers, tie, and formal shoes. Women: formal shirt/blouse with trousers/formal skirt, or a business suit.",
-        "When in doubt about dress code, it's better to be slightly overdressed than underdressed. Professional appearance shows you take the opportunity seriously."
-    ],
-    
-    r'(?i).*salary.*negotiation.*': [
-        "For salary negotiation: 1) Research industry standards, 2) Know your worth, 3) Consider the entire compensation package, 4) Be professional and reasonable, 5) Get the final offer in writing.",
-        "As a fresher, you may have limited negotiation leverage, but you can still discuss: 1) Joining bonuses, 2) Relocation assistance, 3) Training opportunities, 4) Growth paths."
-    ],
-    
-    r'(?i).*resume.*projects.*': [
-        "For resume projects: 1) Focus on relevant ones, 2) Explain your role clearly, 3) Highlight technologies used, 4) Quantify impact where possible, 5) Be prepared to discuss in detail.",
-        "When showcasing projects, explain: 1) Problem statement, 2) Your solution approach, 3) Technologies/methods used, 4) Challenges faced and overcome, 5) Results and learnings."
-    ],
-    
-    r'(?i).*internship.*': [
-        "Internships are valuable because they: 1) Provide real-world experience, 2) Help build your network, 3) Let you apply classroom knowledge, 4) Make your resume stronger, 5) Can lead to full-time offers.",
-        "To find internships: 1) Use your college placement cell, 2) Check company websites, 3) Network on LinkedIn, 4) Attend job fairs, 5) Look at internship platforms like Internshala."
-    ],
-    
-    r'(?i).*communication.*skills.*': [
-        "Improve communication skills by: 1) Reading regularly, 2) Practicing public speaking, 3) Taking feedback seriously, 4) Joining clubs/debates, 5) Recording and analyzing your speaking.",
-        "Communication skills are crucial for placements. Practice with mock interviews, group discussions, and presentations. Focus on clarity, confidence, and conciseness."
-    ]
-}
 
 def get_chatbot_response(user_input):
     """
-    Generate a response for a user query based on predefined patterns.
-    
+    Generate a response for a user query from the FAQ knowledge base.
+
     Args:
         user_input: The user's message
-    
+
     Returns:
         str: The chatbot's response
     """
@@ -81,32 +227,30 @@ def get_chatbot_response(user_input):
         "I'm not sure I understand. Try asking about interview tips, resume preparation, or the placement process.",
         "That's beyond my current knowledge. I can help with resume building, interview preparation, and placement processes."
     ]
-    
+
     # Check for greetings
     greeting_patterns = [
         r'(?i)^(hi|hello|hey|greetings|howdy)[\s!]*$',
         r'(?i)^(good\s(morning|afternoon|evening))[\s!]*$'
     ]
-    
+
     for pattern in greeting_patterns:
         if re.match(pattern, user_input.strip()):
             return "Hello! I'm your placement assistant. I can help with interview preparation, resume tips, and other placement-related queries. What would you like to know?"
-    
+
     # Check for thanks
     thanks_patterns = [
         r'(?i)^(thanks|thank you|thankyou|thank you so much|thanks a lot|thank you very much)[\s!]*$'
     ]
-    
+
     for pattern in thanks_patterns:
         if re.match(pattern, user_input.strip()):
             return "You're welcome! If you have any more questions about placements or interview preparation, feel free to ask."
-    
-    # Check for specific queries
-    for pattern, responses in FAQ_RESPONSES.items():
-        if re.search(pattern, user_input):
-            import random
-            return random.choice(responses)
-    
-    # Return default response if no pattern matched
-    import random
+
+    # Answer from the best matching FAQ entry
+    entry = knowledge_base.search(user_input)
+    if entry is not None:
+        return random.choice(entry['answers'])
+
+    # Return default response if nothing matched well enough
     return random.choice(default_responses)
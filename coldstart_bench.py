@@ -0,0 +1,167 @@
+# First-request latency benchmark for freshly started workers
+#
+# Each run starts a new Python process, as a recycled gunicorn worker would
+# be, imports the app and times the first GET of each route per role. Runs
+# are made "before" (no bytecode cache, no warmup) and "after" (bytecode
+# cache filled by precompile-templates, warmup on), and the medians are
+# printed side by side. Startup time is shown separately, since warmup moves
+# work from the first requests into startup.
+#
+#   DATABASE_URL=sqlite:////tmp/coldstart.db python coldstart_bench.py --runs 5
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+USERNAME_PREFIX = 'coldstart_'
+PASSWORD = 'coldstart'
+
+# Role -> pages fetched once each, in order, after logging in
+ROUTES = {
+    'anonymous': ['/login', '/register/student'],
+    'student': ['/dashboard', '/student/eligible-companies', '/student/applications', '/student/feedback',
+                '/student/profile', '/chatbot'],
+    'cdc': ['/dashboard', '/cdc/companies', '/cdc/student-applications', '/cdc/schedule-mock', '/cdc/reports'],
+    'company': ['/dashboard', '/company/students'],
+}
+
+MODES = {
+    'before': {'JINJA_BYTECODE_CACHE': '0', 'WORKER_WARMUP': '0'},
+    'after': {'JINJA_BYTECODE_CACHE': '1', 'WORKER_WARMUP': '1'},
+}
+
+
+def seed(env):
+    """
+    Create one student, CDC and company account and a posting, reusing
+    accounts left by an earlier run.
+    """
+    os.environ.update(env)
+    import main  # noqa: F401
+    from app import app, db
+    from werkzeug.security import generate_password_hash
+    from models import User, StudentProfile, CompanyProfile, JobPosting, ROLE_STUDENT, ROLE_CDC, ROLE_COMPANY
+
+    with app.app_context():
+        if User.query.filter_by(username=f'{USERNAME_PREFIX}student').first() is not None:
+            return
+
+        password_hash = generate_password_hash(PASSWORD)
+        users = {
+            role: User(username=f'{USERNAME_PREFIX}{role}', email=f'{USERNAME_PREFIX}{role}@example.com',
+                       password_hash=password_hash, role=role)
+            for role in (ROLE_STUDENT, ROLE_CDC, ROLE_COMPANY)
+        }
+        users[ROLE_STUDENT].student_profile = StudentProfile(
+            full_name='Cold Start', roll_number='CS00000001', branch='Computer Science', cgpa=8.5
+        )
+        company = CompanyProfile(company_name='Cold Start Corp')
+        users[ROLE_COMPANY].company_profile = company
+        company.job_postings.append(JobPosting(
+            title='Cold start engineer', cgpa_criteria=7.0, eligible_branches='Computer Science',
+            application_deadline=datetime.utcnow() + timedelta(days=7), num_rounds=2
+        ))
+        db.session.add_all(users.values())
+        db.session.commit()
+
+
+def fill_cache(env):
+    os.environ.update(env)
+    from app import app
+    from warmup import precompile_templates
+    return precompile_templates(app)[0]
+
+
+def measure(env):
+    """
+    Start the app in this (fresh) process and time the first request to
+    each route.
+
+    Returns:
+        dict: 'startup_ms' and route -> milliseconds
+    """
+    os.environ.update(env)
+    started = time.perf_counter()
+    import main  # noqa: F401
+    from app import app
+    timings = {'startup_ms': (time.perf_counter() - started) * 1000}
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    for role, paths in ROUTES.items():
+        client = app.test_client()
+        if role != 'anonymous':
+            client.post('/login', data={'username': f'{USERNAME_PREFIX}{role}', 'password': PASSWORD})
+        for path in paths:
+            started = time.perf_counter()
+            response = client.get(path)
+            timings[f'{role} {path}'] = (time.perf_counter() - started) * 1000
+            if response.status_code >= 400:
+                timings[f'{role} {path}'] = None
+    return timings
+
+
+def run_fresh(func, env):
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(func, env).result()
+
+
+def summarize(runs):
+    keys = [key for key in runs[0] if key != 'startup_ms']
+    summary = {'startup_ms': statistics.median(run['startup_ms'] for run in runs), 'routes': {}}
+    for key in keys:
+        values = [run[key] for run in runs if run.get(key) is not None]
+        summary['routes'][key] = statistics.median(values) if values else None
+    return summary
+
+
+def print_report(report):
+    def cell(value):
+        return f'{value:>12.1f}' if value is not None else f'{"error":>12}'
+
+    before, after = report['before'], report['after']
+    print(f"{'':<44}{'before ms':>12}{'after ms':>12}")
+    print(f"{'worker startup':<44}{cell(before['startup_ms'])}{cell(after['startup_ms'])}")
+    for route in before['routes']:
+        print(f"{route:<44}{cell(before['routes'][route])}{cell(after['routes'][route])}")
+    first = {mode: sum(value for value in report[mode]['routes'].values() if value) for mode in MODES}
+    print(f"{'all first requests':<44}{cell(first['before'])}{cell(first['after'])}")
+    print(f"Templates precompiled: {report['templates']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='First-request latency of fresh workers, before and after warmup')
+    parser.add_argument('--database-url', help='Overrides DATABASE_URL')
+    parser.add_argument('--runs', type=int, default=3, help='Fresh processes per mode')
+    parser.add_argument('--json', help='Also write the report to this file')
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    run_fresh(seed, MODES['before'])
+
+    cache_dir = tempfile.mkdtemp(prefix='jinja_cache_')
+    try:
+        report = {}
+        for mode, env in MODES.items():
+            env = {**env, 'JINJA_BYTECODE_CACHE_PATH': cache_dir}
+            if mode == 'after':
+                report['templates'] = run_fresh(fill_cache, env)
+            report[mode] = summarize([run_fresh(measure, env) for _ in range(args.runs)])
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
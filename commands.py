@@ -0,0 +1,149 @@
+# Maintenance commands, run with `flask --app main <command>`
+
+import click
+
+from app import app, db
+from archive import archive_season as move_season_to_archive, DEFAULT_BATCH_SIZE as ARCHIVE_BATCH_SIZE
+from blob_store import blob_store, content_digest
+from models import StudentProfile
+from funnel import FunnelAggregator
+from idempotency import prune_idempotency_records
+from reports import prune_report_jobs
+from warmup import precompile_templates
+from static_assets import static_assets, build_assets as build_static_assets
+from skills import extract_skills as extract_student_skills
+
+
+@app.cli.command('migrate-resumes')
+@click.option('--batch-size', default=500, show_default=True, help='Profiles per commit.')
+def migrate_resumes(batch_size):
+    """Move resumes stored in the database into the blob store."""
+    if not blob_store.enabled:
+        raise click.ClickException('Set RESUME_BLOB_STORE=1 to enable the blob store first.')
+
+    moved = 0
+    last_id = 0
+    while True:
+        students = StudentProfile.query.options(db.undefer(StudentProfile.resume_text)).filter(
+            StudentProfile.id > last_id, StudentProfile.resume_text.isnot(None)
+        ).order_by(StudentProfile.id).limit(batch_size).all()
+        if not students:
+            break
+
+        for student in students:
+            # The setter writes the blob and clears the column
+            student.resume = student.resume_text
+        db.session.commit()
+
+        moved += len(students)
+        last_id = students[-1].id
+        click.echo(f'Moved {moved} resumes')
+
+    click.echo(f'Done. {moved} resumes now in {blob_store.path}')
+
+
+@app.cli.command('extract-skills')
+@click.option('--batch-size', default=500, show_default=True, help='Profiles per commit.')
+@click.option('--all', 'everyone', is_flag=True, help='Re-extract every profile, e.g. after editing the taxonomy.')
+def extract_skills(batch_size, everyone):
+    """Extract skills from resumes whose skills are missing or out of date."""
+    # Resumes saved before resume_digest existed have no digest, so they would
+    # look up to date (both digests NULL); give them one first
+    digested = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            db.select(StudentProfile.id, StudentProfile.resume_text).where(
+                StudentProfile.id > last_id,
+                StudentProfile.resume_text.isnot(None),
+                StudentProfile.resume_digest.is_(None)
+            ).order_by(StudentProfile.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        db.session.execute(db.update(StudentProfile), [
+            {'id': student_id, 'resume_digest': content_digest(text)} for student_id, text in rows
+        ])
+        db.session.commit()
+
+        digested += len(rows)
+        last_id = rows[-1].id
+        click.echo(f'Digested {digested} older resumes')
+
+    query = db.select(StudentProfile.id)
+    if not everyone:
+        query = query.where(StudentProfile.skills_digest.is_distinct_from(StudentProfile.resume_digest))
+
+    stored = 0
+    last_id = 0
+    while True:
+        student_ids = db.session.scalars(
+            query.where(StudentProfile.id > last_id).order_by(StudentProfile.id).limit(batch_size)
+        ).all()
+        if not student_ids:
+            break
+
+        stored += extract_student_skills(student_ids)
+        last_id = student_ids[-1]
+        click.echo(f'Extracted skills for {stored} students')
+
+    click.echo(f'Done. {stored} profiles updated')
+
+
+@app.cli.command('aggregate-funnel')
+@click.option('--batch-size', default=5000, show_default=True, help='Events per commit.')
+def aggregate_funnel(batch_size):
+    """Fold new application status events into the funnel statistics."""
+    consumed = FunnelAggregator(batch_size=batch_size).run()
+    click.echo(f'Consumed {consumed} status events')
+
+
+@app.cli.command('archive-season')
+@click.argument('season')
+@click.option('--batch-size', default=ARCHIVE_BATCH_SIZE, show_default=True, help='Job postings per commit.')
+def archive_season(season, batch_size):
+    """Move a closed SEASON (e.g. 2024-25) into the archive database."""
+    try:
+        jobs, applications = move_season_to_archive(
+            season, batch_size=batch_size,
+            progress=lambda jobs, applications: click.echo(f'Archived {jobs} postings, {applications} applications')
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f'Done. {jobs} postings and {applications} applications from {season} are in the archive')
+
+
+@app.cli.command('prune-idempotency-keys')
+def prune_idempotency_keys():
+    """Delete stored Idempotency-Key responses past IDEMPOTENCY_KEY_TTL_HOURS."""
+    click.echo(f'Deleted {prune_idempotency_records()} idempotency records')
+
+
+@app.cli.command('prune-reports')
+@click.option('--days', default=30, show_default=True, help='Keep reports finished within this many days.')
+def prune_reports(days):
+    """Delete old report jobs and their files."""
+    click.echo(f'Deleted {prune_report_jobs(days)} reports')
+
+
+@app.cli.command('precompile-templates')
+def precompile_templates_command():
+    """Compile all templates into the shared bytecode cache (run at deploy)."""
+    if app.jinja_env.bytecode_cache is None:
+        raise click.ClickException('Set JINJA_BYTECODE_CACHE=1 to enable the bytecode cache first.')
+    loaded, errors = precompile_templates(app)
+    for name, error in errors.items():
+        click.echo(f'{name}: {error}', err=True)
+    if errors:
+        raise click.ClickException(f'{len(errors)} templates failed to compile')
+    click.echo(f'Compiled {loaded} templates')
+
+
+@app.cli.command('build-assets')
+def build_assets():
+    """Write fingerprinted, precompressed copies of the static files (run at deploy)."""
+    built = build_static_assets(app.static_folder, static_assets.build_path, app.config['COMPRESS_MIN_SIZE'])
+    static_assets.load()
+    click.echo(f'Built {built} assets in {static_assets.build_path}')
@@ -0,0 +1,44 @@
+# Act on the changes of a transaction once it commits
+
+import sqlalchemy as sa
+
+from app import db
+
+
+def on_commit(key, collect, apply, container=list):
+    """
+    Gather changes as the session flushes and hand them over once the
+    transaction commits; a rollback discards them. Changes are kept in
+    session.info[key] because the session cannot load objects after
+    commit, so anything apply needs must be captured at flush time.
+
+    Args:
+        key: session.info key, unique per caller
+        collect: collect(session, changes) called after each flush; adds to
+            the changes container
+        apply: apply(changes) called after a commit that has changes
+        container: Factory for the changes container, e.g. list or set
+
+    Returns:
+        function: pending(session), the container the session will apply on
+        commit, for code that writes with bulk statements the flush hook
+        cannot see
+    """
+    def pending(session):
+        return session.info.setdefault(key, container())
+
+    @sa.event.listens_for(db.session, 'after_flush')
+    def _collect(session, flush_context):
+        collect(session, pending(session))
+
+    @sa.event.listens_for(db.session, 'after_commit')
+    def _apply(session):
+        changes = session.info.pop(key, None)
+        if changes:
+            apply(changes)
+
+    @sa.event.listens_for(db.session, 'after_rollback')
+    def _discard(session):
+        session.info.pop(key, None)
+
+    return pending
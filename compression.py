@@ -0,0 +1,81 @@
+# Gzip/Brotli compression of HTML, JSON and other text responses
+
+import gzip
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional; gzip is always available
+    brotli = None
+
+from flask import request
+
+COMPRESSIBLE_TYPES = frozenset([
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript', 'application/javascript',
+    'application/json', 'application/xml', 'image/svg+xml',
+])
+
+
+def available_encodings():
+    """Content codings this server can produce, most preferred first."""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def compress(data, encoding, level=6, brotli_quality=5):
+    """
+    Compress bytes with the given content coding ('br' or 'gzip').
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class Compressor:
+    """
+    Compresses buffered text responses of at least COMPRESS_MIN_SIZE bytes
+    with the best coding the client accepts. Streamed responses and files
+    (including precompressed static assets) are left as they are.
+
+    A compressed response keeps its ETag as a weak validator, since the
+    bytes differ from the uncompressed entity but the content does not.
+    """
+
+    def __init__(self, app=None):
+        self.min_size = 500
+        self.level = 6
+        self.brotli_quality = 5
+        self.encodings = available_encodings()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 500)
+        self.level = app.config.get('COMPRESS_LEVEL', 6)
+        self.brotli_quality = app.config.get('COMPRESS_BROTLI_QUALITY', 5)
+        app.after_request(self.compress_response)
+
+    def compress_response(self, response):
+        if (not 200 <= response.status_code < 300 or response.status_code in (204, 206)
+                or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_TYPES):
+            return response
+
+        # Shared caches must key the response on the client's encodings
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        response.set_data(compress(data, encoding, self.level, self.brotli_quality))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+compressor = Compressor()
@@ -0,0 +1,228 @@
+# In-memory per-branch CGPA index for eligibility what-if queries
+
+import numpy as np
+import sqlalchemy as sa
+
+from app import db
+from commit_hooks import on_commit
+from models import StudentProfile, Application, JobPosting, STATUS_SELECTED
+from reloading import ReloadingIndex, index_update
+from utils import current_season
+
+# Seconds before the index is rebuilt to pick up changes from other workers
+DEFAULT_MAX_AGE = 300
+
+
+class _Branch:
+    """
+    Students of one branch as parallel arrays sorted by CGPA, so the
+    students meeting a cutoff are the suffix starting at searchsorted.
+    """
+
+    def __init__(self, cgpas, ids, placed):
+        self.cgpas = cgpas
+        self.ids = ids
+        self.placed = placed
+
+    def position(self, student_id, cgpa):
+        start = np.searchsorted(self.cgpas, cgpa, side='left')
+        end = np.searchsorted(self.cgpas, cgpa, side='right')
+        matches = np.flatnonzero(self.ids[start:end] == student_id)
+        return int(start + matches[0]) if len(matches) else None
+
+    def insert(self, student_id, cgpa, placed):
+        index = np.searchsorted(self.cgpas, cgpa, side='right')
+        self.cgpas = np.insert(self.cgpas, index, cgpa)
+        self.ids = np.insert(self.ids, index, student_id)
+        self.placed = np.insert(self.placed, index, placed)
+
+    def remove(self, student_id, cgpa):
+        index = self.position(student_id, cgpa)
+        if index is not None:
+            self.cgpas = np.delete(self.cgpas, index)
+            self.ids = np.delete(self.ids, index)
+            self.placed = np.delete(self.placed, index)
+
+
+class EligibilityIndex(ReloadingIndex):
+    """
+    Answers "how many students would this CGPA cutoff and branch set admit,
+    and how many of them are already placed" without touching the database.
+
+    Built with two queries and kept in step with committed changes to
+    student CGPA/branch and to selections in the current season; rebuilt in
+    the background every max_age seconds to pick up changes made through
+    other workers.
+    """
+
+    def __init__(self, max_age=DEFAULT_MAX_AGE):
+        super().__init__(max_age)
+        self.branches = {}
+        self.students = {}
+        self.offers = {}
+
+    def _build(self):
+        students = db.session.execute(
+            db.select(StudentProfile.id, StudentProfile.branch, StudentProfile.cgpa)
+        ).all()
+        offers = dict(db.session.execute(
+            db.select(Application.student_id, db.func.count(Application.id))
+            .join(JobPosting)
+            .where(Application.status == STATUS_SELECTED, JobPosting.season == current_season())
+            .group_by(Application.student_id)
+        ).all())
+
+        by_branch = {}
+        for student_id, branch, cgpa in students:
+            by_branch.setdefault(branch, []).append((cgpa, student_id))
+
+        branches = {}
+        for branch, rows in by_branch.items():
+            rows.sort()
+            ids = np.array([student_id for _, student_id in rows], dtype=np.int64)
+            branches[branch] = _Branch(
+                np.array([cgpa for cgpa, _ in rows], dtype=np.float64),
+                ids,
+                np.array([offers.get(student_id, 0) > 0 for student_id in ids.tolist()], dtype=bool)
+            )
+        return branches, {student_id: (branch, cgpa) for student_id, branch, cgpa in students}, offers
+
+    def _install(self, data):
+        self.branches, self.students, self.offers = data
+
+    @index_update
+    def update_student(self, student_id, branch, cgpa):
+        self._remove(student_id)
+        if branch not in self.branches:
+            self.branches[branch] = _Branch(np.array([], dtype=np.float64), np.array([], dtype=np.int64),
+                                            np.array([], dtype=bool))
+        self.branches[branch].insert(student_id, cgpa, self.offers.get(student_id, 0) > 0)
+        self.students[student_id] = (branch, cgpa)
+
+    @index_update
+    def remove_student(self, student_id):
+        self._remove(student_id)
+
+    def _remove(self, student_id):
+        previous = self.students.pop(student_id, None)
+        if previous is not None:
+            branch, cgpa = previous
+            self.branches[branch].remove(student_id, cgpa)
+
+    @index_update
+    def set_offers(self, student_id, offers):
+        """Record the student's number of selections in the current season."""
+        self.offers[student_id] = offers
+        entry = self.students.get(student_id)
+        if entry is not None:
+            branch = self.branches[entry[0]]
+            index = branch.position(student_id, entry[1])
+            if index is not None:
+                branch.placed[index] = offers > 0
+
+    def preview(self, cgpa_criteria, branches=None, limit=0):
+        """
+        Count the students a posting with these criteria would admit.
+
+        Args:
+            cgpa_criteria: Minimum CGPA
+            branches: Eligible branch names; None means every branch
+            limit: Also return ids of up to this many eligible students,
+                highest CGPA first
+
+        Returns:
+            dict: 'eligible', 'placed' and 'unplaced' totals, 'by_branch'
+            counts, and 'student_ids' (highest CGPA first)
+        """
+        with self._lock:
+            self._ensure_loaded()
+            names = self.branches if branches is None else branches
+
+            by_branch = {}
+            top_ids, top_cgpas = [], []
+            for name in names:
+                branch = self.branches.get(name)
+                if branch is None:
+                    by_branch[name] = {'eligible': 0, 'placed': 0}
+                    continue
+                start = np.searchsorted(branch.cgpas, cgpa_criteria, side='left')
+                by_branch[name] = {
+                    'eligible': int(len(branch.cgpas) - start),
+                    'placed': int(branch.placed[start:].sum()),
+                }
+                if limit:
+                    top_ids.append(branch.ids[start:][-limit:])
+                    top_cgpas.append(branch.cgpas[start:][-limit:])
+
+        student_ids = []
+        if top_ids:
+            ids, cgpas = np.concatenate(top_ids), np.concatenate(top_cgpas)
+            student_ids = ids[np.argsort(-cgpas, kind='stable')[:limit]].tolist()
+
+        eligible = sum(counts['eligible'] for counts in by_branch.values())
+        placed = sum(counts['placed'] for counts in by_branch.values())
+        return {
+            'eligible': eligible,
+            'placed': placed,
+            'unplaced': eligible - placed,
+            'by_branch': by_branch,
+            'student_ids': student_ids,
+        }
+
+    def is_placed(self, student_id):
+        with self._lock:
+            return self.offers.get(student_id, 0) > 0
+
+
+eligibility_index = EligibilityIndex()
+
+
+# Keep the index in step with committed changes. Offers are recounted at
+# flush time rather than adjusted, so a change replayed onto a rebuild that
+# already saw it is not counted twice.
+def _collect_changes(session, changes):
+    offer_changes = set()
+    for obj in session.new | session.dirty:
+        state = sa.inspect(obj)
+        if isinstance(obj, StudentProfile):
+            if (obj in session.new or state.attrs.cgpa.history.has_changes()
+                    or state.attrs.branch.history.has_changes()):
+                changes.append(('update_student', obj.id, obj.branch, obj.cgpa))
+        elif isinstance(obj, Application):
+            history = state.attrs.status.history
+            was_selected = STATUS_SELECTED in (history.deleted or ())
+            is_selected = obj.status == STATUS_SELECTED
+            if (obj in session.new and is_selected) or (history.has_changes() and was_selected != is_selected):
+                offer_changes.add((obj.student_id, obj.job_id))
+    for obj in session.deleted:
+        if isinstance(obj, StudentProfile):
+            changes.append(('remove_student', obj.id))
+        elif isinstance(obj, Application) and obj.status == STATUS_SELECTED:
+            offer_changes.add((obj.student_id, obj.job_id))
+
+    if offer_changes:
+        season = current_season()
+        # Selections for postings of other seasons do not count as offers
+        current_jobs = set(session.connection().execute(
+            sa.select(JobPosting.id).where(
+                JobPosting.id.in_({job_id for _, job_id in offer_changes}), JobPosting.season == season
+            )
+        ).scalars())
+        student_ids = {student_id for student_id, job_id in offer_changes if job_id in current_jobs}
+        if student_ids:
+            offers = dict(session.connection().execute(
+                sa.select(Application.student_id, sa.func.count(Application.id))
+                .join(JobPosting, Application.job_id == JobPosting.id)
+                .where(Application.student_id.in_(student_ids), Application.status == STATUS_SELECTED,
+                       JobPosting.season == season)
+                .group_by(Application.student_id)
+            ).all())
+            changes.extend(('set_offers', student_id, offers.get(student_id, 0)) for student_id in student_ids)
+
+
+def _apply_changes(changes):
+    for method, *args in changes:
+        getattr(eligibility_index, method)(*args)
+
+
+pending_eligibility_changes = on_commit('eligibility_changes', _collect_changes, _apply_changes)
@@ -1,8 +1,9 @@
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, SubmitField, SelectField, FloatField, TextAreaField, IntegerField, DateTimeField, SelectMultipleField, BooleanField
-from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError, NumberRange, Regexp
+from wtforms.validators import DataRequired, Email, EqualTo, Length, ValidationError, NumberRange, Regexp, Optional
 from wtforms.widgets import TextArea
 from models import User, StudentProfile
+from scheduling import parse_interviewer_availability
 import re
 
 # Custom validator for JNTU roll number
@@ -12,6 +13,16 @@ def validate_jntu_roll_number(form, field):
     if not pattern.match(field.data):
         raise ValidationError('Invalid JNTU roll number format. Expected format: 18H51A0501')
 
+# Branches offered by the college, for student profiles and posting eligibility
+BRANCH_CHOICES = [
+    ('Computer Science', 'Computer Science'),
+    ('Information Technology', 'Information Technology'),
+    ('Electronics and Communications', 'Electronics and Communications'),
+    ('Electrical and Electronics', 'Electrical and Electronics'),
+    ('Mechanical Engineering', 'Mechanical Engineering'),
+    ('Civil Engineering', 'Civil Engineering')
+]
+
 class LoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired()])
     password = PasswordField('Password', validators=[DataRequired()])
@@ -24,14 +35,7 @@ class StudentRegistrationForm(FlaskForm):
     confirm_password = PasswordField('Confirm Password', validators=[DataRequired(), EqualTo('password')])
     full_name = StringField('Full Name', validators=[DataRequired()])
     roll_number = StringField('JNTU Roll Number', validators=[DataRequired(), validate_jntu_roll_number])
-    branch = SelectField('Branch', choices=[
-        ('Computer Science', 'Computer Science'),
-        ('Information Technology', 'Information Technology'),
-        ('Electronics and Communications', 'Electronics and Communications'),
-        ('Electrical and Electronics', 'Electrical and Electronics'),
-        ('Mechanical Engineering', 'Mechanical Engineering'),
-        ('Civil Engineering', 'Civil Engineering')
-    ])
+    branch = SelectField('Branch', choices=BRANCH_CHOICES)
     cgpa = FloatField('CGPA', validators=[DataRequired(), NumberRange(min=0, max=10)])
     submit = SubmitField('Register')
     
@@ -75,14 +79,7 @@ class JobPostingForm(FlaskForm):
     title = StringField('Job Title', validators=[DataRequired()])
     description = TextAreaField('Job Description', validators=[DataRequired()])
     cgpa_criteria = FloatField('CGPA Criteria', validators=[DataRequired(), NumberRange(min=0, max=10)])
-    eligible_branches = SelectMultipleField('Eligible Branches', choices=[
-        ('Computer Science', 'Computer Science'),
-        ('Information Technology', 'Information Technology'),
-        ('Electronics and Communications', 'Electronics and Communications'),
-        ('Electrical and Electronics', 'Electrical and Electronics'),
-        ('Mechanical Engineering', 'Mechanical Engineering'),
-        ('Civil Engineering', 'Civil Engineering')
-    ])
+    eligible_branches = SelectMultipleField('Eligible Branches', choices=BRANCH_CHOICES)
     application_deadline = DateTimeField('Application Deadline', format='%Y-%m-%dT%H:%M', validators=[DataRequired()])
     num_rounds = IntegerField('Number of Interview Rounds', validators=[DataRequired(), NumberRange(min=1, max=10)])
     package_offered = StringField('Package Offered (LPA)', validators=[DataRequired()])
@@ -92,14 +89,7 @@ class EditJobPostingForm(FlaskForm):
     title = StringField('Job Title', validators=[DataRequired()])
     description = TextAreaField('Job Description', validators=[DataRequired()])
     cgpa_criteria = FloatField('CGPA Criteria', validators=[DataRequired(), NumberRange(min=0, max=10)])
-    eligible_branches = SelectMultipleField('Eligible Branches', choices=[
-        ('Computer Science', 'Computer Science'),
-        ('Information Technology', 'Information Technology'),
-        ('Electronics and Communications', 'Electronics and Communications'),
-        ('Electrical and Electronics', 'Electrical and Electronics'),
-        ('Mechanical Engineering', 'Mechanical Engineering'),
-        ('Civil Engineering', 'Civil Engineering')
-    ])
+    eligible_branches = SelectMultipleField('Eligible Branches', choices=BRANCH_CHOICES)
     application_deadline = DateTimeField('Application Deadline', format='%Y-%m-%dT%H:%M', validators=[DataRequired()])
     num_rounds = IntegerField('Number of Interview Rounds', validators=[DataRequired(), NumberRange(min=1, max=10)])
     package_offered = StringField('Package Offered (LPA)', validators=[DataRequired()])
@@ -111,6 +101,11 @@ class InterviewRoundForm(FlaskForm):
     round_date = DateTimeField('Round Date and Time', format='%Y-%m-%dT%H:%M', validators=[DataRequired()])
     submit = SubmitField('Schedule Round')
 
+class AutoAssignSlotsForm(FlaskForm):
+    slot_minutes = IntegerField('Slot Length (minutes)', validators=[DataRequired(), NumberRange(min=5, max=480)])
+    interviewers = StringField('Interviewers (comma-separated)', validators=[DataRequired()])
+    submit = SubmitField('Assign Slots')
+
 class InterviewFeedbackForm(FlaskForm):
     feedback = TextAreaField('Feedback', validators=[DataRequired()])
     rating = IntegerField('Rating (1-10)', validators=[DataRequired(), NumberRange(min=1, max=10)])
@@ -124,6 +119,52 @@ class MockInterviewForm(FlaskForm):
     topic = StringField('Interview Topic', validators=[DataRequired()])
     submit = SubmitField('Schedule Mock Interview')
 
+class BulkMockInterviewForm(FlaskForm):
+    branches = SelectMultipleField('Branches', choices=BRANCH_CHOICES)
+    min_cgpa = FloatField('Minimum CGPA', validators=[Optional(), NumberRange(min=0, max=10)])
+    max_cgpa = FloatField('Maximum CGPA', validators=[Optional(), NumberRange(min=0, max=10)])
+    not_yet_mocked = BooleanField('Only students without a mock interview this season', default=True)
+    topic = StringField('Interview Topic', validators=[DataRequired()])
+    slot_minutes = IntegerField('Slot Length (minutes)', validators=[DataRequired(), NumberRange(min=5, max=480)])
+    interviewers = TextAreaField(
+        'Interviewers (one per line: Name | capacity | YYYY-MM-DD HH:MM - HH:MM; ...)',
+        validators=[DataRequired()]
+    )
+    preview = SubmitField('Preview')
+    submit = SubmitField('Schedule Mock Interviews')
+    
+    def validate_interviewers(self, interviewers):
+        try:
+            parse_interviewer_availability(interviewers.data)
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+class ReportForm(FlaskForm):
+    kind = SelectField('Report', choices=[
+        ('branch', 'Placements by Branch'),
+        ('company', 'Placements by Company')
+    ], validators=[DataRequired()])
+    format = SelectField('Format', choices=[
+        ('html', 'HTML'),
+        ('print', 'Printable HTML (save as PDF)'),
+        ('csv', 'CSV')
+    ], validators=[DataRequired()])
+    season = SelectField('Season', validators=[DataRequired()])
+    submit = SubmitField('Generate Report')
+
+class RolloverForm(FlaskForm):
+    source_season = SelectField('Copy From Season', validators=[DataRequired()])
+    target_season = StringField('Into Season', validators=[
+        DataRequired(), Regexp(r'^\d{4}-\d{2}$', message='Use the form 2025-26')
+    ])
+    job_ids = SelectMultipleField('Job Postings', coerce=int, validators=[DataRequired()])
+    offset_days = IntegerField('Shift Dates By (days)', validators=[Optional()])
+    cgpa_criteria = FloatField('Minimum CGPA', validators=[Optional(), NumberRange(min=0, max=10)])
+    eligible_branches = SelectMultipleField('Eligible Branches', choices=BRANCH_CHOICES, validators=[Optional()])
+    package_offered = StringField('Package Offered', validators=[Optional(), Length(max=50)])
+    preview = SubmitField('Preview')
+    submit = SubmitField('Clone Postings')
+
 class MockFeedbackForm(FlaskForm):
     feedback = TextAreaField('Feedback', validators=[DataRequired()])
     submit = SubmitField('Submit Feedback')
@@ -138,16 +179,13 @@ class ApplicationStatusForm(FlaskForm):
     ], validators=[DataRequired()])
     submit = SubmitField('Update Status')
 
+class ShortlistForm(FlaskForm):
+    count = IntegerField('Number of Candidates', validators=[DataRequired(), NumberRange(min=1, max=1000)])
+    submit = SubmitField('Shortlist Top Candidates')
+
 class StudentProfileForm(FlaskForm):
     full_name = StringField('Full Name', validators=[DataRequired()])
-    branch = SelectField('Branch', choices=[
-        ('Computer Science', 'Computer Science'),
-        ('Information Technology', 'Information Technology'),
-        ('Electronics and Communications', 'Electronics and Communications'),
-        ('Electrical and Electronics', 'Electrical and Electronics'),
-        ('Mechanical Engineering', 'Mechanical Engineering'),
-        ('Civil Engineering', 'Civil Engineering')
-    ])
+    branch = SelectField('Branch', choices=BRANCH_CHOICES)
     cgpa = FloatField('CGPA', validators=[DataRequired(), NumberRange(min=0, max=10)])
     resume = TextAreaField('Resume')
     submit = SubmitField('Update Profile')
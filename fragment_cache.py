@@ -0,0 +1,236 @@
+# Fragment cache for rendered template partials
+
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from markupsafe import Markup
+
+# Default number of fragments kept by the in-process LRU
+DEFAULT_CACHE_SIZE = 2048
+
+# Defaults for the shared SQLite store: seconds a fragment is kept, and the
+# most fragments kept; superseded versions are pruned once they expire
+DEFAULT_SHARED_TTL = 24 * 3600
+DEFAULT_SHARED_MAX_ENTRIES = 100000
+
+# Seconds between prunes of the shared store by each worker
+PRUNE_INTERVAL = 60
+
+
+class LRUBackend:
+    """
+    In-process least-recently-used store. Each worker has its own copy.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteBackend:
+    """
+    Store shared by all workers on one machine, kept in a local SQLite file.
+
+    Every edit to a row produces a new key, so old versions are never read
+    again. Entries expire ttl seconds after they are stored, and each worker
+    deletes expired entries (and the oldest, beyond max_entries) at most
+    every PRUNE_INTERVAL seconds while storing.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_SHARED_TTL, max_entries=DEFAULT_SHARED_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._pruned_at = time.monotonic()
+        self._prune_lock = threading.Lock()
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(fragment)')]
+        if columns and 'expires_at' not in columns:
+            # A store from before expiry was added; it is only a cache
+            conn.execute('DROP TABLE fragment')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS fragment (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_fragment_expires_at ON fragment (expires_at)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT value FROM fragment WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value):
+        self._connect().execute(
+            'INSERT OR REPLACE INTO fragment (key, value, expires_at) VALUES (?, ?, ?)',
+            (key, value, time.time() + self.ttl)
+        )
+        self._prune_if_due()
+
+    def _prune_if_due(self):
+        with self._prune_lock:
+            if time.monotonic() - self._pruned_at < PRUNE_INTERVAL:
+                return
+            self._pruned_at = time.monotonic()
+        self.prune()
+
+    def prune(self):
+        """
+        Delete expired fragments, then the soonest to expire beyond max_entries.
+
+        Returns:
+            int: Number of fragments deleted
+        """
+        conn = self._connect()
+        deleted = conn.execute('DELETE FROM fragment WHERE expires_at <= ?', (time.time(),)).rowcount
+        excess = conn.execute('SELECT COUNT(*) FROM fragment').fetchone()[0] - self.max_entries
+        if excess > 0:
+            deleted += conn.execute(
+                'DELETE FROM fragment WHERE key IN (SELECT key FROM fragment ORDER BY expires_at LIMIT ?)', (excess,)
+            ).rowcount
+        return deleted
+
+    def clear(self):
+        self._connect().execute('DELETE FROM fragment')
+
+
+def model_key(obj):
+    """
+    Build the cache key part identifying a model row and its version.
+
+    Args:
+        obj: A model instance with an id and updated_at column
+
+    Returns:
+        tuple: (table name, id, updated_at)
+    """
+    return (obj.__tablename__, obj.id, getattr(obj, 'updated_at', None))
+
+
+class FragmentCache:
+    """
+    Cache of rendered HTML fragments keyed by name and model versions.
+
+    Keys embed the version of every row the fragment depends on, so a
+    changed row simply produces a new key and entries never need to be
+    invalidated. With a shared backend configured, a local LRU sits in
+    front of it.
+
+    Usage from a template (anything per-viewer stays outside the block):
+
+        {% call cache_fragment('job_card', job, job.company) %}
+            ... job card markup ...
+        {% endcall %}
+        {% if item.applied %}<span class="badge">Applied</span>{% endif %}
+    """
+
+    def __init__(self, app=None):
+        self.local = LRUBackend()
+        self.shared = None
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.local = LRUBackend(app.config.get('FRAGMENT_CACHE_SIZE', DEFAULT_CACHE_SIZE))
+
+        backend = app.config.get('FRAGMENT_CACHE_BACKEND', 'memory')
+        if backend == 'sqlite':
+            path = app.config.get('FRAGMENT_CACHE_PATH') or os.path.join(app.instance_path, 'fragments.db')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.shared = SQLiteBackend(
+                path,
+                ttl=app.config.get('FRAGMENT_CACHE_TTL_SECONDS', DEFAULT_SHARED_TTL),
+                max_entries=app.config.get('FRAGMENT_CACHE_MAX_ENTRIES', DEFAULT_SHARED_MAX_ENTRIES)
+            )
+        elif backend != 'memory':
+            raise ValueError(f'Unknown FRAGMENT_CACHE_BACKEND: {backend}')
+
+        app.jinja_env.globals['cache_fragment'] = self.cache_fragment
+
+    def make_key(self, name, *parts):
+        key_parts = [name]
+        for part in parts:
+            key_parts.append(model_key(part) if hasattr(part, '__tablename__') else part)
+        return repr(tuple(key_parts))
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value)
+
+    def get_or_render(self, name, *parts, render):
+        """
+        Return the cached fragment, rendering and storing it on a miss.
+
+        Args:
+            name: Fragment name, e.g. 'job_card'
+            parts: Model instances and/or plain values the fragment depends on
+            render: Zero-argument callable producing the HTML
+
+        Returns:
+            Markup: The rendered fragment
+        """
+        key = self.make_key(name, *parts)
+        value = self.get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is None:
+            value = str(render())
+            self.set(key, value)
+        return Markup(value)
+
+    def cache_fragment(self, name, *parts, caller):
+        """Jinja entry point used with {% call cache_fragment(...) %}."""
+        return self.get_or_render(name, *parts, render=caller)
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+
+fragments = FragmentCache()
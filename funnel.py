@@ -0,0 +1,255 @@
+# Application status event log and incremental funnel aggregation
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import sqlalchemy as sa
+
+from app import db
+from models import (
+    Application, ApplicationStatusEvent, FunnelStat, AggregatorWatermark, StudentProfile, JobPosting,
+    STATUS_APPLIED, STATUS_WITHDRAWN
+)
+
+AGGREGATOR_NAME = 'application_funnel'
+
+# Events consumed per aggregation transaction
+DEFAULT_BATCH_SIZE = 5000
+
+# A missing event id may belong to a transaction that has not committed
+# yet, so the watermark stops before it. Once the event after the gap is
+# this old, the gap is taken to be a rolled-back insert and passed over.
+GAP_TIMEOUT_SECONDS = 300
+
+
+@sa.event.listens_for(db.session, 'after_flush')
+def _log_status_changes(session, flush_context):
+    """
+    Insert an ApplicationStatusEvent for every application created, moved to
+    a new status or withdrawn, in the same transaction as the change.
+    Applications deleted along with their job or student are not
+    withdrawals and are not logged.
+    """
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, Application):
+            changes.append((obj, None, obj.status or STATUS_APPLIED))
+    for obj in session.dirty:
+        if isinstance(obj, Application):
+            history = sa.inspect(obj).attrs.status.history
+            if history.added and history.deleted and history.added[0] != history.deleted[0]:
+                changes.append((obj, history.deleted[0], history.added[0]))
+    deleted_jobs = {obj.id for obj in session.deleted if isinstance(obj, JobPosting)}
+    deleted_students = {obj.id for obj in session.deleted if isinstance(obj, StudentProfile)}
+    for obj in session.deleted:
+        if (isinstance(obj, Application) and obj.job_id not in deleted_jobs
+                and obj.student_id not in deleted_students):
+            changes.append((obj, obj.status, STATUS_WITHDRAWN))
+
+    if not changes:
+        return
+
+    connection = session.connection()
+    branches = dict(connection.execute(
+        db.select(StudentProfile.id, StudentProfile.branch)
+        .where(StudentProfile.id.in_({application.student_id for application, _, _ in changes}))
+    ).all())
+
+    now = datetime.utcnow()
+    connection.execute(db.insert(ApplicationStatusEvent), [
+        {
+            'application_id': application.id,
+            'job_id': application.job_id,
+            'student_id': application.student_id,
+            'branch': branches.get(application.student_id, ''),
+            'from_status': from_status,
+            'to_status': to_status,
+            'created_at': now,
+        }
+        for application, from_status, to_status in changes
+    ])
+
+
+def log_bulk_transition(application_ids, from_status, to_status):
+    """
+    Record events for a set-based status UPDATE with one INSERT ... SELECT.
+
+    Args:
+        application_ids: Ids of the applications that changed
+        from_status: Their status before the update
+        to_status: Their status after the update
+    """
+    select = db.select(
+        Application.id, Application.job_id, Application.student_id, StudentProfile.branch,
+        sa.literal(from_status), sa.literal(to_status), sa.literal(datetime.utcnow())
+    ).join(StudentProfile).where(Application.id.in_(application_ids))
+
+    db.session.execute(db.insert(ApplicationStatusEvent).from_select(
+        ['application_id', 'job_id', 'student_id', 'branch', 'from_status', 'to_status', 'created_at'],
+        select
+    ))
+
+
+class FunnelAggregator:
+    """
+    Consumes new ApplicationStatusEvent rows past a stored watermark and
+    folds them into FunnelStat counters, so each run only reads events it
+    has not seen. For each transition the application's previous event is
+    found through the (application_id, id) index to credit the time spent
+    in the stage it left.
+    """
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+
+    def _watermark(self):
+        watermark = db.session.get(AggregatorWatermark, AGGREGATOR_NAME, with_for_update=True)
+        if watermark is None:
+            watermark = AggregatorWatermark(name=AGGREGATOR_NAME, last_event_id=0)
+            db.session.add(watermark)
+        return watermark
+
+    def _previous_event_times(self, application_ids, before_id):
+        """
+        Latest event time per application among events already consumed.
+        """
+        latest = db.select(
+            ApplicationStatusEvent.application_id, db.func.max(ApplicationStatusEvent.id).label('event_id')
+        ).where(
+            ApplicationStatusEvent.application_id.in_(application_ids),
+            ApplicationStatusEvent.id <= before_id
+        ).group_by(ApplicationStatusEvent.application_id).subquery()
+
+        rows = db.session.execute(
+            db.select(latest.c.application_id, ApplicationStatusEvent.created_at)
+            .join(ApplicationStatusEvent, ApplicationStatusEvent.id == latest.c.event_id)
+        ).all()
+        return dict(rows)
+
+    def run_batch(self):
+        """
+        Consume one batch of events and commit.
+
+        Returns:
+            int: Number of events consumed
+        """
+        watermark = self._watermark()
+        events = db.session.execute(
+            db.select(ApplicationStatusEvent.id, ApplicationStatusEvent.application_id,
+                      ApplicationStatusEvent.job_id, ApplicationStatusEvent.branch,
+                      ApplicationStatusEvent.from_status, ApplicationStatusEvent.to_status,
+                      ApplicationStatusEvent.created_at)
+            .where(ApplicationStatusEvent.id > watermark.last_event_id)
+            .order_by(ApplicationStatusEvent.id)
+            .limit(self.batch_size)
+        ).all()
+
+        # Consume up to the first recent gap in the ids
+        cutoff = datetime.utcnow() - timedelta(seconds=GAP_TIMEOUT_SECONDS)
+        expected_id = watermark.last_event_id + 1
+        for position, event in enumerate(events):
+            if event.id != expected_id and event.created_at > cutoff:
+                events = events[:position]
+                break
+            expected_id = event.id + 1
+
+        if not events:
+            db.session.commit()
+            return 0
+
+        entered_at = self._previous_event_times({event.application_id for event in events}, watermark.last_event_id)
+
+        # (job_id, branch, status) -> [entered, exited, current, seconds_in_stage]
+        deltas = defaultdict(lambda: [0, 0, 0, 0.0])
+        for event in events:
+            if event.from_status is not None:
+                delta = deltas[(event.job_id, event.branch, event.from_status)]
+                delta[1] += 1
+                delta[2] -= 1
+                previous = entered_at.get(event.application_id)
+                if previous is not None:
+                    delta[3] += (event.created_at - previous).total_seconds()
+
+            if event.to_status != STATUS_WITHDRAWN:
+                delta = deltas[(event.job_id, event.branch, event.to_status)]
+                delta[0] += 1
+                delta[2] += 1
+            entered_at[event.application_id] = event.created_at
+
+        self._apply(deltas)
+        watermark.last_event_id = events[-1].id
+        db.session.commit()
+        return len(events)
+
+    def _apply(self, deltas):
+        job_ids = {job_id for job_id, _, _ in deltas}
+        existing = {
+            (stat.job_id, stat.branch, stat.status): stat
+            for stat in FunnelStat.query.filter(FunnelStat.job_id.in_(job_ids))
+        }
+        for key, (entered, exited, current, seconds) in deltas.items():
+            stat = existing.get(key)
+            if stat is None:
+                stat = FunnelStat(job_id=key[0], branch=key[1], status=key[2],
+                                  entered=0, exited=0, current=0, seconds_in_stage=0.0)
+                db.session.add(stat)
+            stat.entered += entered
+            stat.exited += exited
+            stat.current += current
+            stat.seconds_in_stage += seconds
+
+    def run(self):
+        """
+        Consume all pending events in batches.
+
+        Returns:
+            int: Total number of events consumed
+        """
+        total = 0
+        while True:
+            consumed = self.run_batch()
+            total += consumed
+            if consumed < self.batch_size:
+                return total
+
+
+def _funnel_rows(group_column, criteria):
+    return db.session.execute(
+        db.select(group_column, FunnelStat.status,
+                  db.func.sum(FunnelStat.entered), db.func.sum(FunnelStat.current),
+                  db.func.sum(FunnelStat.exited), db.func.sum(FunnelStat.seconds_in_stage))
+        .where(*criteria)
+        .group_by(group_column, FunnelStat.status)
+    ).all()
+
+
+def _summarize(rows):
+    funnel = defaultdict(dict)
+    for key, status, entered, current, exited, seconds in rows:
+        funnel[key][status] = {
+            'entered': entered,
+            'current': current,
+            'avg_hours_in_stage': round(seconds / exited / 3600, 2) if exited else None,
+        }
+    return dict(funnel)
+
+
+def funnel_by_job(job_ids=None):
+    """
+    Funnel counts and average time in stage per job.
+
+    Returns:
+        dict: job_id -> status -> {'entered', 'current', 'avg_hours_in_stage'}
+    """
+    criteria = [FunnelStat.job_id.in_(job_ids)] if job_ids is not None else []
+    return _summarize(_funnel_rows(FunnelStat.job_id, criteria))
+
+
+def funnel_by_branch():
+    """
+    Funnel counts and average time in stage per branch across all jobs.
+
+    Returns:
+        dict: branch -> status -> {'entered', 'current', 'avg_hours_in_stage'}
+    """
+    return _summarize(_funnel_rows(FunnelStat.branch, []))
@@ -0,0 +1,133 @@
+# Conditional GET support (ETag / 304 Not Modified) for read-mostly pages
+
+import hashlib
+import time
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from app import db
+from models import (
+    CompanyProfile, JobPosting, Application, InterviewFeedback, MockInterview
+)
+from policy import placement_policy
+
+
+def build_etag(*parts):
+    """
+    Build a strong ETag value from the given version parts.
+
+    Args:
+        parts: Hashable values identifying the state of the page
+
+    Returns:
+        str: The ETag value (without quotes)
+    """
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+
+
+def _csrf_bucket():
+    """
+    Time bucket that rolls over before embedded CSRF tokens expire, so a
+    revalidated page never serves a stale form token.
+    """
+    limit = current_app.config.get('WTF_CSRF_TIME_LIMIT', 3600) or 3600
+    return int(time.time() // (limit / 2))
+
+
+def conditional_view(version_func):
+    """
+    Decorator that answers a GET with 304 Not Modified when the page's
+    version markers have not changed since the client's copy.
+
+    The version function runs before the view and must be cheap (a few
+    aggregate queries). It returns None to opt out of caching, e.g. when
+    the current user's role does not match the view.
+
+    Args:
+        version_func: Callable returning a tuple of version markers or None
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            # Pending flash messages are rendered into the page, so it must be rebuilt
+            if request.method != 'GET' or session.get('_flashes'):
+                return view(*args, **kwargs)
+
+            version = version_func()
+            if version is None:
+                return view(*args, **kwargs)
+
+            etag = build_etag(request.endpoint, current_user.get_id(), _csrf_bucket(), version)
+            # Weak comparison: compressed responses carry the ETag as W/"..."
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapped
+    return decorator
+
+
+def _table_version(model, timestamp_column, *criteria):
+    """
+    Return (row count, latest timestamp) for a model, optionally filtered.
+    """
+    return tuple(db.session.query(
+        db.func.count(model.id), db.func.max(timestamp_column)
+    ).filter(*criteria).one())
+
+
+def eligible_companies_version():
+    """Version markers for the student's eligible companies page."""
+    if not current_user.is_student():
+        return None
+
+    student = current_user.student_profile
+    return (
+        student.cgpa,
+        student.branch,
+        # Jobs are ordered by relevance to the resume
+        student.resume_digest,
+        _table_version(JobPosting, JobPosting.updated_at,
+                       JobPosting.application_deadline >= datetime.utcnow()),
+        _table_version(CompanyProfile, CompanyProfile.updated_at),
+        _table_version(Application, Application.updated_date,
+                       Application.student_id == student.id),
+        # Which jobs are open to a student holding an offer
+        placement_policy.version,
+    )
+
+
+def cdc_companies_version():
+    """Version markers for the CDC companies listing."""
+    if not current_user.is_cdc():
+        return None
+
+    return (
+        _table_version(CompanyProfile, CompanyProfile.updated_at),
+        _table_version(JobPosting, JobPosting.updated_at),
+    )
+
+
+def student_feedback_version():
+    """Version markers for the student's feedback page."""
+    if not current_user.is_student():
+        return None
+
+    student_id = current_user.student_profile.id
+    interview_feedback = db.session.query(
+        db.func.count(InterviewFeedback.id), db.func.max(InterviewFeedback.updated_at)
+    ).join(Application).filter(Application.student_id == student_id).one()
+
+    return (
+        _table_version(MockInterview, MockInterview.updated_at,
+                       MockInterview.student_id == student_id),
+        tuple(interview_feedback),
+    )
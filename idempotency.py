@@ -0,0 +1,155 @@
+# Idempotency keys for form POSTs that must not take effect twice
+
+import json
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import flash, redirect, request, session
+from flask_login import current_user
+from sqlalchemy.exc import IntegrityError
+
+from app import app, db
+from models import IdempotencyRecord
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+
+# Hidden form field carrying the key for plain HTML forms
+IDEMPOTENCY_FIELD = 'idempotency_key'
+
+MAX_KEY_LENGTH = 64
+
+# Seconds a duplicate waits for the first request with its key in this worker
+IN_FLIGHT_WAIT_SECONDS = 10
+
+
+def new_idempotency_key():
+    """
+    Return a fresh key for a form, e.g.
+    <input type="hidden" name="idempotency_key" value="{{ new_idempotency_key() }}">
+    """
+    return uuid.uuid4().hex
+
+
+app.jinja_env.globals['new_idempotency_key'] = new_idempotency_key
+
+
+def _request_key():
+    key = request.headers.get(IDEMPOTENCY_HEADER) or request.form.get(IDEMPOTENCY_FIELD)
+    if key and len(key) <= MAX_KEY_LENGTH:
+        return key
+    return None
+
+
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+@contextmanager
+def _first_in_worker(scope):
+    """
+    Let one request per key run at a time in this worker; a concurrent
+    duplicate (a double click) waits for it and then replays its response.
+
+    Yields:
+        bool: True for the first request, False for a duplicate that waited
+    """
+    with _in_flight_lock:
+        running = _in_flight.get(scope)
+        if running is None:
+            _in_flight[scope] = done = threading.Event()
+    if running is not None:
+        running.wait(IN_FLIGHT_WAIT_SECONDS)
+        yield False
+        return
+
+    try:
+        yield True
+    finally:
+        with _in_flight_lock:
+            del _in_flight[scope]
+        done.set()
+
+
+def _find(user_id, endpoint, key):
+    oldest = datetime.utcnow() - timedelta(hours=app.config.get('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+    return IdempotencyRecord.query.filter(
+        IdempotencyRecord.user_id == user_id,
+        IdempotencyRecord.endpoint == endpoint,
+        IdempotencyRecord.key == key,
+        IdempotencyRecord.created_at >= oldest
+    ).first()
+
+
+def _replay(record):
+    for category, message in json.loads(record.flashes or '[]'):
+        flash(message, category)
+    return redirect(record.location, code=record.status_code)
+
+
+def _store(user_id, endpoint, key, response, flashes):
+    db.session.add(IdempotencyRecord(
+        user_id=user_id,
+        endpoint=endpoint,
+        key=key,
+        status_code=response.status_code,
+        location=response.headers.get('Location'),
+        flashes=json.dumps(flashes)
+    ))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Another worker stored the same key first
+        db.session.rollback()
+
+
+def idempotent(view):
+    """
+    Route decorator for POSTs that redirect. When the request carries an
+    Idempotency-Key header (or idempotency_key form field), the redirect and
+    flash messages of the first request are stored and replayed for any
+    retry with the same key, instead of running the view again.
+
+    Requests without a key run as usual. Error responses are not stored,
+    so a request that failed or was shed can be retried with the same key.
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        key = _request_key()
+        if key is None or not current_user.is_authenticated:
+            return view(*args, **kwargs)
+
+        user_id, endpoint = current_user.id, request.endpoint
+        record = _find(user_id, endpoint, key)
+        if record is not None:
+            return _replay(record)
+
+        with _first_in_worker((user_id, endpoint, key)) as first:
+            if not first:
+                record = _find(user_id, endpoint, key)
+                if record is not None:
+                    return _replay(record)
+
+            flashes_before = len(session.get('_flashes', []))
+            response = view(*args, **kwargs)
+            if 300 <= response.status_code < 400:
+                _store(user_id, endpoint, key, response, session.get('_flashes', [])[flashes_before:])
+        return response
+    return wrapped
+
+
+def prune_idempotency_records():
+    """
+    Delete stored responses older than IDEMPOTENCY_KEY_TTL_HOURS.
+
+    Returns:
+        int: Number of records deleted
+    """
+    oldest = datetime.utcnow() - timedelta(hours=app.config.get('IDEMPOTENCY_KEY_TTL_HOURS', 24))
+    deleted = db.session.execute(
+        db.delete(IdempotencyRecord).where(IdempotencyRecord.created_at < oldest)
+    ).rowcount
+    db.session.commit()
+    return deleted
@@ -0,0 +1,208 @@
+# Live application updates: after-commit hooks feeding an in-process pub/sub
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+import sqlalchemy as sa
+
+from app import app
+from commit_hooks import on_commit
+from models import Application, InterviewRound, JobPosting, STATUS_APPLIED, STATUS_SHORTLISTED, STATUS_INTERVIEW_SCHEDULED
+
+# Events buffered per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# How often the SQLite backend looks for events from other workers
+POLL_INTERVAL = 0.5
+
+# Events older than this are pruned from the SQLite backend
+EVENT_RETENTION_SECONDS = 300
+
+
+class MemoryBackend:
+    """Delivers events to subscribers in this worker only."""
+
+    def __init__(self, deliver):
+        self.deliver = deliver
+
+    def publish(self, events):
+        for channel, payload in events:
+            self.deliver(channel, payload)
+
+
+class SQLiteBackend:
+    """
+    Cross-worker stand-in for a message broker: publishers append rows to a
+    shared SQLite file and a poller thread in each worker delivers new rows
+    to that worker's subscribers.
+    """
+
+    def __init__(self, path, deliver):
+        self.path = path
+        self.deliver = deliver
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS live_event '
+            '(id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT NOT NULL, payload TEXT NOT NULL, created REAL NOT NULL)'
+        )
+        self._last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM live_event').fetchone()[0]
+        self._poller = None
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def publish(self, events):
+        now = time.time()
+        conn = self._connect()
+        # One transaction per batch, e.g. a bulk shortlist
+        with conn:
+            conn.execute('BEGIN')
+            conn.executemany(
+                'INSERT INTO live_event (channel, payload, created) VALUES (?, ?, ?)',
+                [(channel, json.dumps(payload), now) for channel, payload in events]
+            )
+        self.start()
+
+    def start(self):
+        if self._poller is None:
+            self._poller = threading.Thread(target=self._poll, name='live-updates-poller', daemon=True)
+            self._poller.start()
+
+    def _poll(self):
+        conn = self._connect()
+        last_prune = 0
+        while True:
+            rows = conn.execute(
+                'SELECT id, channel, payload FROM live_event WHERE id > ? ORDER BY id', (self._last_id,)
+            ).fetchall()
+            for event_id, channel, payload in rows:
+                self._last_id = event_id
+                self.deliver(channel, json.loads(payload))
+
+            if time.time() - last_prune > EVENT_RETENTION_SECONDS:
+                conn.execute('DELETE FROM live_event WHERE created < ?', (time.time() - EVENT_RETENTION_SECONDS,))
+                last_prune = time.time()
+            time.sleep(POLL_INTERVAL)
+
+
+class LiveUpdates:
+    """
+    Publish/subscribe hub for per-student event channels.
+
+    Subscribers get a bounded queue; a slow client loses its oldest events
+    rather than growing memory without limit.
+    """
+
+    def __init__(self, app=None):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+        self.backend = MemoryBackend(self._deliver)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('LIVE_UPDATES_BACKEND', 'memory')
+        if backend == 'sqlite':
+            path = app.config.get('LIVE_UPDATES_PATH') or os.path.join(app.instance_path, 'live_events.db')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.backend = SQLiteBackend(path, self._deliver)
+        elif backend == 'memory':
+            self.backend = MemoryBackend(self._deliver)
+        else:
+            raise ValueError(f'Unknown LIVE_UPDATES_BACKEND: {backend}')
+
+    def subscribe(self, channel):
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[channel].add(subscriber)
+        if isinstance(self.backend, SQLiteBackend):
+            self.backend.start()
+        return subscriber
+
+    def unsubscribe(self, channel, subscriber):
+        with self._lock:
+            self._subscribers[channel].discard(subscriber)
+            if not self._subscribers[channel]:
+                del self._subscribers[channel]
+
+    def publish(self, events):
+        """
+        Publish a batch of (channel, payload) events.
+        """
+        if events:
+            self.backend.publish(events)
+
+    def _deliver(self, channel, payload):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(payload)
+            except queue.Full:
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    pass
+                subscriber.put_nowait(payload)
+
+
+live_updates = LiveUpdates(app)
+
+
+def student_channel(student_id):
+    return f'student:{student_id}'
+
+
+def record_status_change(session, application_id, job_id, student_id, status):
+    """
+    Queue a status event to publish once the session commits. Used by code
+    that changes statuses with bulk UPDATEs, which the flush hook cannot see.
+    """
+    _pending_events(session).append((student_channel(student_id), {
+        'type': 'status',
+        'application_id': application_id,
+        'job_id': job_id,
+        'status': status,
+    }))
+
+
+# Applicants who are told about new rounds for their job
+ROUND_AUDIENCE_STATUSES = (STATUS_APPLIED, STATUS_SHORTLISTED, STATUS_INTERVIEW_SCHEDULED)
+
+
+def _collect_events(session, events):
+    for obj in session.dirty:
+        if isinstance(obj, Application) and sa.inspect(obj).attrs.status.history.has_changes():
+            record_status_change(session, obj.id, obj.job_id, obj.student_id, obj.status)
+
+    # A posting created in this flush has no applicants to tell about its rounds
+    new_jobs = {obj.id for obj in session.new if isinstance(obj, JobPosting)}
+    for obj in session.new:
+        if isinstance(obj, InterviewRound) and obj.job_id not in new_jobs:
+            student_ids = session.connection().execute(
+                sa.select(Application.student_id).where(
+                    Application.job_id == obj.job_id, Application.status.in_(ROUND_AUDIENCE_STATUSES)
+                )
+            ).scalars().all()
+            payload = {
+                'type': 'interview_round',
+                'job_id': obj.job_id,
+                'round_id': obj.id,
+                'round_name': obj.round_name,
+                'round_date': obj.round_date.isoformat() if obj.round_date else None,
+            }
+            events.extend((student_channel(student_id), payload) for student_id in student_ids)
+
+
+_pending_events = on_commit('live_events', _collect_events, live_updates.publish)
@@ -0,0 +1,533 @@
+# Load test simulating the application rush before a popular deadline
+#
+# Seeds students and postings, logs simulated students in and runs a mix of
+# browse/apply/withdraw/chatbot traffic from threads (and optionally
+# processes), then reports throughput, latency percentiles, errors, requests
+# shed by admission control, database lock waits and duplicate applications.
+#
+#   # In-process with the Flask test client against a scratch SQLite file
+#   DATABASE_URL=sqlite:////tmp/loadtest.db python loadtest.py --students 2000 --threads 64
+#
+#   # Against a running server; seeding uses the same DATABASE_URL as the server
+#   DATABASE_URL=postgresql://localhost/placement gunicorn -w 4 -b 127.0.0.1:8000 main:app
+#   DATABASE_URL=postgresql://localhost/placement python loadtest.py --url http://127.0.0.1:8000
+
+import argparse
+import http.cookiejar
+import json
+import multiprocessing
+import os
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+USERNAME_PREFIX = 'loadtest_student_'
+PASSWORD = 'loadtest'
+
+CHATBOT_MESSAGES = [
+    'How do I prepare for a technical interview?',
+    'Any resume tips?',
+    'What is the placement process?',
+    'How should I prepare for the aptitude test?',
+    'Tips for HR interview',
+]
+
+DEFAULT_MIX = 'browse=60,apply=25,withdraw=10,chatbot=5'
+
+# Statements slower than this are counted as (probable) lock waits
+DEFAULT_LOCK_THRESHOLD_MS = 100
+
+# Error messages that mean a statement waited on or lost a lock
+LOCK_ERRORS = ('database is locked', 'deadlock detected', 'could not obtain lock',
+               'lock timeout', 'could not serialize access')
+
+CSRF_PATTERN = re.compile(r'name="csrf_token"[^>]*value="([^"]+)"')
+
+
+def parse_mix(text):
+    """
+    Parse an action mix such as 'browse=60,apply=25'.
+
+    Returns:
+        tuple: (action names, weights)
+    """
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name.strip() not in ACTIONS:
+            raise SystemExit(f'Unknown action in --mix: {name}')
+        mix[name.strip()] = float(weight)
+    return list(mix), list(mix.values())
+
+
+def _app():
+    # Imported late so DATABASE_URL can be set from the command line first
+    import main  # noqa: F401
+    from app import app, db
+    return app, db
+
+
+def seed(num_students, num_jobs, deadline_minutes):
+    """
+    Create load-test students, one company and its postings, reusing
+    students left by an earlier run. All postings close deadline_minutes
+    from now.
+    """
+    from werkzeug.security import generate_password_hash
+
+    # The app first: importing models on its own would create the tables
+    # before the model classes are defined
+    app, db = _app()
+    from models import User, StudentProfile, CompanyProfile, JobPosting, ROLE_STUDENT, ROLE_COMPANY
+    # The registration form's branches, so seeded students match real postings
+    from forms import BRANCH_CHOICES
+    branches = [value for value, _ in BRANCH_CHOICES]
+    with app.app_context():
+        existing = db.session.execute(
+            db.select(db.func.count(User.id)).where(User.username.like(f'{USERNAME_PREFIX}%'))
+        ).scalar()
+
+        # One hash for every account; hashing per user would dominate seeding
+        password_hash = generate_password_hash(PASSWORD)
+        if existing < num_students:
+            db.session.execute(db.insert(User), [
+                {'username': f'{USERNAME_PREFIX}{i}', 'email': f'{USERNAME_PREFIX}{i}@example.com',
+                 'password_hash': password_hash, 'role': ROLE_STUDENT}
+                for i in range(existing, num_students)
+            ])
+            new_users = db.session.execute(
+                db.select(User.id, User.username).where(User.username.like(f'{USERNAME_PREFIX}%'))
+                .where(~db.exists().where(StudentProfile.user_id == User.id))
+            ).all()
+            rng = random.Random(0)
+            db.session.execute(db.insert(StudentProfile), [
+                {'user_id': user_id, 'full_name': username, 'roll_number': f'LT{user_id:08d}',
+                 'branch': rng.choice(branches), 'cgpa': round(rng.uniform(6.0, 10.0), 2)}
+                for user_id, username in new_users
+            ])
+
+        company = db.session.execute(
+            db.select(CompanyProfile).join(User).where(User.username == 'loadtest_company')
+        ).scalar()
+        if company is None:
+            user = User(username='loadtest_company', email='loadtest_company@example.com',
+                        password_hash=password_hash, role=ROLE_COMPANY)
+            company = CompanyProfile(company_name='Load Test Corp', user=user)
+            db.session.add(company)
+            db.session.flush()
+
+        deadline = datetime.utcnow() + timedelta(minutes=deadline_minutes)
+        db.session.execute(db.insert(JobPosting), [
+            {'company_id': company.id, 'title': f'Load test role {i}', 'cgpa_criteria': 6.0 + (i % 4) * 0.5,
+             'eligible_branches': ','.join(branches[:2 + i % 4]), 'application_deadline': deadline,
+             'num_rounds': 2, 'description': 'Python SQL data structures algorithms'}
+            for i in range(num_jobs)
+        ])
+        db.session.commit()
+
+
+class TestClient:
+    """Flask test client with the HTTP interface the workers use."""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def get(self, path):
+        response = self.client.get(path)
+        return response.status_code, response.get_data()
+
+    def post(self, path, data=None, json_body=None, headers=None):
+        response = self.client.post(path, data=data, json=json_body, headers=headers)
+        return response.status_code, response.get_data()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HTTPClient:
+    """Cookie-keeping urllib client for a running server; redirects are not followed."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect()
+        )
+
+    def _open(self, request):
+        try:
+            with self.opener.open(request, timeout=60) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def get(self, path):
+        return self._open(urllib.request.Request(self.base_url + path))
+
+    def post(self, path, data=None, json_body=None, headers=None):
+        if json_body is not None:
+            body, content_type = json.dumps(json_body).encode(), 'application/json'
+        else:
+            body, content_type = urllib.parse.urlencode(data or {}).encode(), 'application/x-www-form-urlencoded'
+        return self._open(urllib.request.Request(
+            self.base_url + path, data=body, headers={'Content-Type': content_type, **(headers or {})}, method='POST'
+        ))
+
+
+class Stats:
+    """Latency samples and error counts per action, shared by a process's threads."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.shed = defaultdict(int)
+        self.statuses = defaultdict(int)
+        self.lock_errors = 0
+        self.slow_writes = 0
+        self.slow_write_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, action, seconds, status):
+        with self._lock:
+            self.latencies[action].append(seconds)
+            self.statuses[status] += 1
+            # 503 is admission control asking the client to retry
+            if status == 503:
+                self.shed[action] += 1
+            elif status >= 500 or status == 0:
+                self.errors[action] += 1
+
+    def as_dict(self):
+        return {
+            'latencies': dict(self.latencies), 'errors': dict(self.errors), 'shed': dict(self.shed),
+            'statuses': dict(self.statuses),
+            'lock_errors': self.lock_errors, 'slow_writes': self.slow_writes,
+            'slow_write_seconds': self.slow_write_seconds,
+        }
+
+
+def watch_locks(engine, stats, threshold_ms):
+    """
+    Count lock errors and slow writes on an in-process engine. With SQLite
+    a writer waiting for the file lock shows up as a slow statement (busy
+    timeout) or a 'database is locked' error.
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('loadtest_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['loadtest_started'].pop()
+        if elapsed * 1000 >= threshold_ms and not statement.lstrip().upper().startswith('SELECT'):
+            with stats._lock:
+                stats.slow_writes += 1
+                stats.slow_write_seconds += elapsed
+
+    @event.listens_for(engine, 'handle_error')
+    def _error(context):
+        conn = context.connection
+        if conn is not None and conn.info.get('loadtest_started'):
+            conn.info['loadtest_started'].pop()
+        if any(message in str(context.original_exception).lower() for message in LOCK_ERRORS):
+            with stats._lock:
+                stats.lock_errors += 1
+
+
+class VirtualStudent:
+    """One simulated student: a logged-in client and the jobs they can apply to."""
+
+    def __init__(self, make_client, username, stats):
+        self.make_client = make_client
+        self.username = username
+        self.stats = stats
+        self.client = self.login()
+        self.twin = None
+        self.job_ids = []
+        status, body = self.request('eligible_lookup', 'get', '/api/v1/jobs/eligible?fields=id&limit=1000')
+        if status == 200:
+            self.job_ids = [row['id'] for row in json.loads(body)['data']]
+
+    def login(self):
+        client = self.make_client()
+        status, body = client.get('/login')
+        match = CSRF_PATTERN.search(body.decode('utf-8', 'replace'))
+        data = {'username': self.username, 'password': PASSWORD}
+        if match:
+            data['csrf_token'] = match.group(1)
+        status, _ = client.post('/login', data=data)
+        if status != 302:
+            raise RuntimeError(f'Login failed for {self.username} (HTTP {status})')
+        return client
+
+    def request(self, action, method, path, client=None, **kwargs):
+        started = time.perf_counter()
+        try:
+            status, body = getattr(client or self.client, method)(path, **kwargs)
+        except Exception:
+            status, body = 0, b''
+        self.stats.record(action, time.perf_counter() - started, status)
+        return status, body
+
+    def browse(self, rng):
+        self.request('browse', 'get', '/student/eligible-companies')
+
+    def apply(self, rng, double_submit=0.0):
+        if not self.job_ids:
+            return
+        # Most students go for the few most popular postings
+        if rng.random() < 0.8:
+            job_id = rng.choice(self.job_ids[:5])
+        else:
+            job_id = rng.choice(self.job_ids)
+
+        path = f'/student/apply/{job_id}'
+        headers = {'Idempotency-Key': uuid.uuid4().hex}
+        if rng.random() < double_submit:
+            # A double click: the same student submits twice at once
+            if self.twin is None:
+                self.twin = self.login()
+            other = threading.Thread(target=self.request, args=('apply', 'post', path, self.twin),
+                                     kwargs={'headers': headers})
+            other.start()
+            self.request('apply', 'post', path, headers=headers)
+            other.join()
+        else:
+            self.request('apply', 'post', path, headers=headers)
+
+    def withdraw(self, rng):
+        status, body = self.request('applications_lookup', 'get', '/api/v1/applications?status=applied&fields=id')
+        if status != 200:
+            return
+        applications = json.loads(body)['data']
+        if applications:
+            self.request('withdraw', 'post', f'/student/withdraw/{rng.choice(applications)["id"]}',
+                         headers={'Idempotency-Key': uuid.uuid4().hex})
+
+    def chatbot(self, rng):
+        self.request('chatbot', 'post', '/chatbot/api', json_body={'message': rng.choice(CHATBOT_MESSAGES)})
+
+
+ACTIONS = {
+    'browse': VirtualStudent.browse,
+    'apply': VirtualStudent.apply,
+    'withdraw': VirtualStudent.withdraw,
+    'chatbot': VirtualStudent.chatbot,
+}
+
+
+def run_process(options, process_index):
+    """
+    Run one process's worth of virtual students until the duration ends.
+
+    Returns:
+        dict: The process's Stats as plain data
+    """
+    stats = Stats()
+    if options['url']:
+        def make_client():
+            return HTTPClient(options['url'])
+    else:
+        app, db = _app()
+        app.config['WTF_CSRF_ENABLED'] = False
+        with app.app_context():
+            watch_locks(db.engine, stats, options['lock_threshold_ms'])
+
+        def make_client():
+            return TestClient(app)
+
+    names, weights = parse_mix(options['mix'])
+    deadline = time.monotonic() + options['duration']
+
+    def worker(thread_index):
+        rng = random.Random(process_index * 100003 + thread_index)
+        student_number = (process_index * options['threads'] + thread_index) % options['students']
+        try:
+            student = VirtualStudent(make_client, f'{USERNAME_PREFIX}{student_number}', stats)
+        except Exception:
+            stats.record('login', 0.0, 0)
+            return
+        while time.monotonic() < deadline:
+            action = rng.choices(names, weights)[0]
+            if action == 'apply':
+                student.apply(rng, options['double_submit'])
+            else:
+                ACTIONS[action](student, rng)
+            if options['think_time']:
+                time.sleep(rng.expovariate(1 / options['think_time']))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(options['threads'])]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats.as_dict()
+
+
+def sample_postgres_locks(stop, samples, interval=0.5):
+    """
+    Record the number of ungranted Postgres locks twice a second; works
+    whether the server under test runs in-process or in gunicorn.
+    """
+    app, db = _app()
+    with app.app_context():
+        while not stop.is_set():
+            samples.append(db.session.execute(
+                db.text('SELECT count(*) FROM pg_locks WHERE NOT granted')
+            ).scalar())
+            db.session.rollback()
+            stop.wait(interval)
+
+
+def find_duplicates():
+    """
+    Applications where one student has applied to the same job more than once.
+
+    Returns:
+        list: (student_id, job_id, count) rows
+    """
+    from models import Application
+
+    app, db = _app()
+    with app.app_context():
+        return db.session.execute(
+            db.select(Application.student_id, Application.job_id, db.func.count(Application.id))
+            .group_by(Application.student_id, Application.job_id)
+            .having(db.func.count(Application.id) > 1)
+        ).all()
+
+
+def merge(results):
+    merged = {'latencies': defaultdict(list), 'errors': defaultdict(int), 'shed': defaultdict(int),
+              'statuses': defaultdict(int),
+              'lock_errors': 0, 'slow_writes': 0, 'slow_write_seconds': 0.0}
+    for result in results:
+        for action, samples in result['latencies'].items():
+            merged['latencies'][action].extend(samples)
+        for key in ('errors', 'shed', 'statuses'):
+            for name, count in result[key].items():
+                merged[key][name] += count
+        for key in ('lock_errors', 'slow_writes', 'slow_write_seconds'):
+            merged[key] += result[key]
+    return merged
+
+
+def build_report(merged, elapsed, lock_samples, duplicates):
+    actions = {}
+    for action, samples in sorted(merged['latencies'].items()):
+        milliseconds = np.array(samples) * 1000
+        p50, p95, p99 = np.percentile(milliseconds, [50, 95, 99])
+        actions[action] = {
+            'requests': len(samples),
+            'errors': merged['errors'].get(action, 0),
+            'shed': merged['shed'].get(action, 0),
+            'p50_ms': round(float(p50), 1), 'p95_ms': round(float(p95), 1), 'p99_ms': round(float(p99), 1),
+            'max_ms': round(float(milliseconds.max()), 1),
+        }
+
+    total = sum(action['requests'] for action in actions.values())
+    errors = sum(action['errors'] for action in actions.values())
+    shed = sum(action['shed'] for action in actions.values())
+    report = {
+        'elapsed_seconds': round(elapsed, 1),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 1) if elapsed else 0.0,
+        'error_rate': round(errors / total, 4) if total else 0.0,
+        'shed_rate': round(shed / total, 4) if total else 0.0,
+        'statuses': {str(status): count for status, count in sorted(merged['statuses'].items())},
+        'actions': actions,
+        'lock_errors': merged['lock_errors'],
+        'slow_writes': merged['slow_writes'],
+        'slow_write_seconds': round(merged['slow_write_seconds'], 2),
+        'duplicate_applications': [list(row) for row in duplicates],
+    }
+    if lock_samples:
+        report['pg_waiting_locks_max'] = max(lock_samples)
+        report['pg_waiting_locks_avg'] = round(sum(lock_samples) / len(lock_samples), 2)
+    return report
+
+
+def print_report(report):
+    print(f"{report['requests']} requests in {report['elapsed_seconds']}s "
+          f"({report['throughput_rps']} req/s), error rate {report['error_rate']:.2%}, "
+          f"shed {report['shed_rate']:.2%}")
+    print(f"{'action':<20}{'requests':>10}{'errors':>8}{'shed':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name, action in report['actions'].items():
+        print(f"{name:<20}{action['requests']:>10}{action['errors']:>8}{action['shed']:>8}{action['p50_ms']:>10}"
+              f"{action['p95_ms']:>10}{action['p99_ms']:>10}{action['max_ms']:>10}")
+    print(f"HTTP statuses: {report['statuses']}")
+    print(f"Lock errors: {report['lock_errors']}, slow writes: {report['slow_writes']} "
+          f"({report['slow_write_seconds']}s)")
+    if 'pg_waiting_locks_max' in report:
+        print(f"Waiting Postgres locks: max {report['pg_waiting_locks_max']}, avg {report['pg_waiting_locks_avg']}")
+    duplicates = report['duplicate_applications']
+    print(f'Duplicate applications: {len(duplicates)}' + (f' e.g. {duplicates[:5]}' if duplicates else ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__ or 'Deadline-rush load test')
+    parser.add_argument('--url', help='Base URL of a running server; default is the in-process test client')
+    parser.add_argument('--database-url', help='Overrides DATABASE_URL for seeding and in-process runs')
+    parser.add_argument('--students', type=int, default=500, help='Load-test student accounts')
+    parser.add_argument('--jobs', type=int, default=20, help='Postings to create')
+    parser.add_argument('--deadline-minutes', type=int, default=60, help='Minutes until the postings close')
+    parser.add_argument('--no-seed', action='store_true', help='Use data from an earlier run')
+    parser.add_argument('--threads', type=int, default=32, help='Virtual students per process')
+    parser.add_argument('--processes', type=int, default=1, help='Processes running virtual students')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to run')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Action weights')
+    parser.add_argument('--double-submit', type=float, default=0.05, help='Fraction of applies sent twice at once')
+    parser.add_argument('--think-time', type=float, default=0.0, help='Mean pause between actions in seconds')
+    parser.add_argument('--lock-threshold-ms', type=float, default=DEFAULT_LOCK_THRESHOLD_MS,
+                        help='Writes slower than this count as lock waits (in-process only)')
+    parser.add_argument('--json', help='Also write the report to this file')
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+    parse_mix(args.mix)
+
+    if not args.no_seed:
+        seed(args.students, args.jobs, args.deadline_minutes)
+
+    options = {
+        'url': args.url, 'students': args.students, 'threads': args.threads, 'duration': args.duration,
+        'mix': args.mix, 'double_submit': args.double_submit, 'think_time': args.think_time,
+        'lock_threshold_ms': args.lock_threshold_ms,
+    }
+
+    lock_samples = []
+    stop = threading.Event()
+    if os.environ.get('DATABASE_URL', '').startswith('postgres'):
+        threading.Thread(target=sample_postgres_locks, args=(stop, lock_samples), daemon=True).start()
+
+    started = time.monotonic()
+    if args.processes > 1:
+        with multiprocessing.get_context('spawn').Pool(args.processes) as pool:
+            results = pool.starmap(run_process, [(options, i) for i in range(args.processes)])
+    else:
+        results = [run_process(options, 0)]
+    elapsed = time.monotonic() - started
+    stop.set()
+
+    report = build_report(merge(results), elapsed, lock_samples, find_duplicates())
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,15 @@
 # Import the app and run it
 from app import app
 import routes  # noqa: F401
+import commands  # noqa: F401
+from api import api
+from warmup import warm_up
+
+app.register_blueprint(api)
+
+# Each gunicorn worker imports this module before accepting connections
+if app.config["WORKER_WARMUP"]:
+    warm_up(app)
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -1,4 +1,6 @@
 from app import db
+from blob_store import blob_store, content_digest
+from utils import current_season, season_for
 from flask_login import UserMixin
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -14,6 +16,39 @@ STATUS_SHORTLISTED = 'shortlisted'
 STATUS_INTERVIEW_SCHEDULED = 'interview_scheduled'
 STATUS_SELECTED = 'selected'
 STATUS_REJECTED = 'rejected'
+# Only recorded in the status event log, when a student withdraws
+STATUS_WITHDRAWN = 'withdrawn'
+
+# Legal status changes; a status may always be "changed" to itself
+STATUS_TRANSITIONS = {
+    STATUS_APPLIED: {STATUS_SHORTLISTED, STATUS_INTERVIEW_SCHEDULED, STATUS_REJECTED, STATUS_WITHDRAWN},
+    STATUS_SHORTLISTED: {STATUS_INTERVIEW_SCHEDULED, STATUS_SELECTED, STATUS_REJECTED},
+    STATUS_INTERVIEW_SCHEDULED: {STATUS_SHORTLISTED, STATUS_SELECTED, STATUS_REJECTED},
+    STATUS_SELECTED: set(),
+    STATUS_REJECTED: set(),
+}
+
+# Report job status
+REPORT_QUEUED = 'queued'
+REPORT_RUNNING = 'running'
+REPORT_DONE = 'done'
+REPORT_FAILED = 'failed'
+REPORT_PENDING = (REPORT_QUEUED, REPORT_RUNNING)
+
+def can_transition(from_status, to_status):
+    """
+    Check whether an application may move from one status to another.
+    
+    Args:
+        from_status: The current status (None for a new application)
+        to_status: The requested status
+    
+    Returns:
+        bool: True if the transition is allowed
+    """
+    if from_status is None:
+        return to_status == STATUS_APPLIED
+    return from_status == to_status or to_status in STATUS_TRANSITIONS.get(from_status, set())
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -52,22 +87,58 @@ class StudentProfile(db.Model):
     roll_number = db.Column(db.String(20), unique=True, nullable=False)
     branch = db.Column(db.String(50), nullable=False)
     cgpa = db.Column(db.Float, nullable=False)
-    resume = db.Column(db.Text, nullable=True)
+    # Large text is deferred; resume_text is NULL when the resume lives in the blob store
+    resume_text = db.deferred(db.Column('resume', db.Text, nullable=True))
+    resume_digest = db.Column(db.String(64), nullable=True)
+    # resume_digest of the resume the skills were last extracted from
+    skills_digest = db.Column(db.String(64), nullable=True)
     
     # Relationships
     applications = db.relationship('Application', backref='student', cascade='all, delete-orphan')
     mock_interviews = db.relationship('MockInterview', backref='student', cascade='all, delete-orphan')
+    skills = db.relationship('StudentSkill', backref='student', cascade='all, delete-orphan')
+    
+    @property
+    def resume(self):
+        if self.resume_text is None and self.resume_digest:
+            return blob_store.get(self.resume_digest)
+        return self.resume_text
+    
+    @resume.setter
+    def resume(self, text):
+        if not text:
+            self.resume_text = text
+            self.resume_digest = None
+        elif blob_store.enabled:
+            self.resume_digest = blob_store.put(text)
+            self.resume_text = None
+        else:
+            self.resume_digest = content_digest(text)
+            self.resume_text = text
     
     def __repr__(self):
         return f'<StudentProfile {self.full_name}>'
 
+class StudentSkill(db.Model):
+    # Skill found in a student's resume by skills.py, named as in the taxonomy
+    student_id = db.Column(db.Integer, db.ForeignKey('student_profile.id'), primary_key=True)
+    skill = db.Column(db.String(50), primary_key=True)
+    
+    __table_args__ = (
+        db.Index('ix_student_skill_skill', 'skill', 'student_id'),
+    )
+    
+    def __repr__(self):
+        return f'<StudentSkill {self.student_id}: {self.skill}>'
+
 class CompanyProfile(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     company_name = db.Column(db.String(100), nullable=False)
-    description = db.Column(db.Text, nullable=True)
+    description = db.deferred(db.Column(db.Text, nullable=True))
     website = db.Column(db.String(200), nullable=True)
     established_year = db.Column(db.Integer, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     job_postings = db.relationship('JobPosting', backref='company', cascade='all, delete-orphan')
@@ -75,17 +146,31 @@ class CompanyProfile(db.Model):
     def __repr__(self):
         return f'<CompanyProfile {self.company_name}>'
 
+def _deadline_season(context):
+    # A posting belongs to the season of its deadline, so one created in
+    # June for an August deadline stays listed after the season turns
+    deadline = context.get_current_parameters().get('application_deadline')
+    return season_for(deadline) if deadline is not None else current_season()
+
 class JobPosting(db.Model):
+    # A posting is cloned into a season at most once
+    __table_args__ = (db.UniqueConstraint('season', 'cloned_from_id', name='uq_job_posting_clone'),)
+    
     id = db.Column(db.Integer, primary_key=True)
     company_id = db.Column(db.Integer, db.ForeignKey('company_profile.id'), nullable=False)
     title = db.Column(db.String(100), nullable=False)
-    description = db.Column(db.Text, nullable=True)
+    description = db.deferred(db.Column(db.Text, nullable=True))
     cgpa_criteria = db.Column(db.Float, nullable=False)
     eligible_branches = db.Column(db.String(200), nullable=False)
-    application_deadline = db.Column(db.DateTime, nullable=False)
+    # Indexed for the open-jobs lists, which filter on the deadline alone
+    application_deadline = db.Column(db.DateTime, nullable=False, index=True)
     num_rounds = db.Column(db.Integer, nullable=False)
     package_offered = db.Column(db.String(50), nullable=True)
+    season = db.Column(db.String(9), default=_deadline_season, nullable=False, index=True)
+    # Posting this one was rolled over from; not a foreign key, as the source may be archived
+    cloned_from_id = db.Column(db.Integer, nullable=True, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     applications = db.relationship('Application', backref='job_posting', cascade='all, delete-orphan')
@@ -95,19 +180,119 @@ class JobPosting(db.Model):
         return f'<JobPosting {self.title} by {self.company.company_name}>'
 
 class Application(db.Model):
+    # One application per student and job, however many times apply is submitted
+    __table_args__ = (db.UniqueConstraint('student_id', 'job_id', name='uq_application_student_job'),)
+    
     id = db.Column(db.Integer, primary_key=True)
     student_id = db.Column(db.Integer, db.ForeignKey('student_profile.id'), nullable=False)
     job_id = db.Column(db.Integer, db.ForeignKey('job_posting.id'), nullable=False)
-    status = db.Column(db.String(30), default=STATUS_APPLIED, nullable=False)
+    # Active history keeps the previous status for the status event log
+    status = db.column_property(db.Column(db.String(30), default=STATUS_APPLIED, nullable=False), active_history=True)
     applied_date = db.Column(db.DateTime, default=datetime.utcnow)
     updated_date = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     interview_feedbacks = db.relationship('InterviewFeedback', backref='application', cascade='all, delete-orphan')
+    interview_slots = db.relationship('InterviewSlot', backref='application', cascade='all, delete-orphan')
+    
+    @db.validates('status')
+    def validate_status(self, key, status):
+        current = self.status
+        if current is not None and not can_transition(current, status):
+            raise ValueError(f'Cannot change application status from {current} to {status}')
+        return status
     
     def __repr__(self):
         return f'<Application {self.student.user.username} for {self.job_posting.title}>'
 
+class ApplicationStatusEvent(db.Model):
+    # Append-only; application_id is not a foreign key so history outlives withdrawn applications
+    id = db.Column(db.Integer, primary_key=True)
+    application_id = db.Column(db.Integer, nullable=False)
+    job_id = db.Column(db.Integer, nullable=False, index=True)
+    student_id = db.Column(db.Integer, nullable=False)
+    branch = db.Column(db.String(50), nullable=False)
+    from_status = db.Column(db.String(30), nullable=True)
+    to_status = db.Column(db.String(30), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        db.Index('ix_application_status_event_application', 'application_id', 'id'),
+    )
+    
+    def __repr__(self):
+        return f'<ApplicationStatusEvent {self.application_id}: {self.from_status} -> {self.to_status}>'
+
+class IdempotencyRecord(db.Model):
+    # Response to replay when a POST is retried with the same Idempotency-Key
+    __table_args__ = (db.UniqueConstraint('user_id', 'endpoint', 'key', name='uq_idempotency_scope'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    endpoint = db.Column(db.String(100), nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=False)
+    location = db.Column(db.String(500), nullable=True)
+    flashes = db.Column(db.Text, nullable=True)  # JSON list of [category, message]
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    def __repr__(self):
+        return f'<IdempotencyRecord {self.endpoint} {self.key}>'
+
+class ReportJob(db.Model):
+    # A report rendered offline by reports.py into a file under REPORT_STORAGE_PATH
+    id = db.Column(db.Integer, primary_key=True)
+    requested_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    format = db.Column(db.String(10), nullable=False)
+    season = db.Column(db.String(9), nullable=False)
+    status = db.Column(db.String(20), default=REPORT_QUEUED, nullable=False, index=True)
+    error = db.Column(db.String(500), nullable=True)
+    file_path = db.Column(db.String(500), nullable=True)
+    row_count = db.Column(db.Integer, nullable=True)
+    file_size = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    requester = db.relationship('User', foreign_keys=[requested_by])
+    
+    @property
+    def queue_seconds(self):
+        if self.started_at is None:
+            return None
+        return (self.started_at - self.created_at).total_seconds()
+    
+    @property
+    def run_seconds(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return (self.finished_at - self.started_at).total_seconds()
+    
+    def __repr__(self):
+        return f'<ReportJob {self.id} {self.kind} {self.season} {self.status}>'
+
+class FunnelStat(db.Model):
+    # Incrementally maintained per job, branch and status from ApplicationStatusEvent
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, nullable=False)
+    branch = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(30), nullable=False)
+    entered = db.Column(db.Integer, default=0, nullable=False)
+    exited = db.Column(db.Integer, default=0, nullable=False)
+    current = db.Column(db.Integer, default=0, nullable=False)
+    seconds_in_stage = db.Column(db.Float, default=0.0, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('job_id', 'branch', 'status', name='uq_funnel_stat_key'),
+        db.Index('ix_funnel_stat_branch', 'branch', 'status'),
+    )
+
+class AggregatorWatermark(db.Model):
+    name = db.Column(db.String(50), primary_key=True)
+    last_event_id = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 class InterviewRound(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     job_id = db.Column(db.Integer, db.ForeignKey('job_posting.id'), nullable=False)
@@ -118,18 +303,31 @@ class InterviewRound(db.Model):
     
     # Relationships
     feedbacks = db.relationship('InterviewFeedback', backref='interview_round', cascade='all, delete-orphan')
+    slots = db.relationship('InterviewSlot', backref='interview_round', cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<InterviewRound {self.round_name} for {self.job_posting.title}>'
 
+class InterviewSlot(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    round_id = db.Column(db.Integer, db.ForeignKey('interview_round.id'), nullable=False, index=True)
+    application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False, index=True)
+    interviewer = db.Column(db.String(100), nullable=True)
+    start_time = db.Column(db.DateTime, nullable=False, index=True)
+    end_time = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<InterviewSlot {self.start_time} for application {self.application_id}>'
+
 class InterviewFeedback(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     application_id = db.Column(db.Integer, db.ForeignKey('application.id'), nullable=False)
     round_id = db.Column(db.Integer, db.ForeignKey('interview_round.id'), nullable=False)
-    feedback = db.Column(db.Text, nullable=False)
+    feedback = db.deferred(db.Column(db.Text, nullable=False))
     rating = db.Column(db.Integer, nullable=True)
     interviewer_name = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
         return f'<InterviewFeedback for {self.application.student.user.username}>'
@@ -142,11 +340,83 @@ class MockInterview(db.Model):
     scheduled_date = db.Column(db.DateTime, nullable=False)
     topic = db.Column(db.String(100), nullable=False)
     status = db.Column(db.String(20), default='scheduled', nullable=False)
-    feedback = db.Column(db.Text, nullable=True)
+    feedback = db.deferred(db.Column(db.Text, nullable=True))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship with the CDC user who scheduled it
     cdc_user = db.relationship('User', foreign_keys=[scheduled_by])
     
     def __repr__(self):
         return f'<MockInterview for {self.student.user.username} on {self.topic}>'
+
+# Archive tables for closed placement seasons, stored in the "archive" bind.
+# Rows keep their original ids so archived history can be joined as before.
+class ArchivedJobPosting(db.Model):
+    __bind_key__ = 'archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    company_id = db.Column(db.Integer, nullable=False)
+    company_name = db.Column(db.String(100), nullable=False)
+    title = db.Column(db.String(100), nullable=False)
+    description = db.deferred(db.Column(db.Text, nullable=True))
+    cgpa_criteria = db.Column(db.Float, nullable=False)
+    eligible_branches = db.Column(db.String(200), nullable=False)
+    application_deadline = db.Column(db.DateTime, nullable=False)
+    num_rounds = db.Column(db.Integer, nullable=False)
+    package_offered = db.Column(db.String(50), nullable=True)
+    season = db.Column(db.String(9), nullable=False, index=True)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ArchivedApplication(db.Model):
+    __bind_key__ = 'archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    student_id = db.Column(db.Integer, nullable=False, index=True)
+    job_id = db.Column(db.Integer, nullable=False, index=True)
+    # Snapshot of the student at archive time, for per-branch analytics
+    branch = db.Column(db.String(50), nullable=False)
+    cgpa = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(30), nullable=False)
+    applied_date = db.Column(db.DateTime)
+    updated_date = db.Column(db.DateTime)
+
+class ArchivedInterviewRound(db.Model):
+    __bind_key__ = 'archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    job_id = db.Column(db.Integer, nullable=False, index=True)
+    round_number = db.Column(db.Integer, nullable=False)
+    round_name = db.Column(db.String(100), nullable=False)
+    round_description = db.Column(db.Text, nullable=True)
+    round_date = db.Column(db.DateTime, nullable=True)
+
+class ArchivedInterviewFeedback(db.Model):
+    __bind_key__ = 'archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    application_id = db.Column(db.Integer, nullable=False, index=True)
+    round_id = db.Column(db.Integer, nullable=False)
+    feedback = db.deferred(db.Column(db.Text, nullable=False))
+    rating = db.Column(db.Integer, nullable=True)
+    interviewer_name = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime)
+
+class ArchivedApplicationStatusEvent(db.Model):
+    __bind_key__ = 'archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    application_id = db.Column(db.Integer, nullable=False, index=True)
+    job_id = db.Column(db.Integer, nullable=False, index=True)
+    student_id = db.Column(db.Integer, nullable=False)
+    branch = db.Column(db.String(50), nullable=False)
+    from_status = db.Column(db.String(30), nullable=True)
+    to_status = db.Column(db.String(30), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+
+class ArchivedFunnelStat(db.Model):
+    __bind_key__ = 'archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    job_id = db.Column(db.Integer, nullable=False, index=True)
+    branch = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(30), nullable=False)
+    entered = db.Column(db.Integer, nullable=False)
+    exited = db.Column(db.Integer, nullable=False)
+    current = db.Column(db.Integer, nullable=False)
+    seconds_in_stage = db.Column(db.Float, nullable=False)
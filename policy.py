@@ -0,0 +1,231 @@
+# Placement policy: which jobs a student who already holds an offer may apply to
+
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+
+import sqlalchemy as sa
+
+from app import app, db
+from commit_hooks import on_commit
+from models import Application, JobPosting, CompanyProfile, STATUS_SELECTED
+from utils import current_season
+
+# Students whose offer state is kept per worker
+MAX_STUDENTS = 20000
+
+# Offers (selected applications) a student holds this season
+OfferState = namedtuple('OfferState', ['offers', 'best_package'])
+
+Decision = namedtuple('Decision', ['allowed', 'reason'])
+ALLOWED = Decision(True, None)
+
+PACKAGE_RE = re.compile(r'(\d+(?:\.\d+)?)\s*(crores?|cr|lakhs?|lacs?|lpa|l|k)?\b')
+
+
+@lru_cache(maxsize=1024)
+def parse_package(text):
+    """
+    Read a package such as "12 LPA", "12.5 lakhs", "1.2 Cr", "800k" or
+    "Rs. 8,00,000 p.a." as lakhs per annum. For a range the first amount
+    is used.
+
+    Args:
+        text: The package_offered string
+
+    Returns:
+        float: Lakhs per annum, or None if no amount is found
+    """
+    if not text:
+        return None
+    match = PACKAGE_RE.search(text.lower().replace(',', ''))
+    if match is None:
+        return None
+
+    amount, unit = float(match.group(1)), match.group(2)
+    if unit in ('cr', 'crore', 'crores'):
+        return amount * 100
+    if unit == 'k':
+        return amount / 100
+    if unit is None and amount >= 1000:
+        # A plain rupee amount
+        return amount / 100000
+    return amount
+
+
+def _one_offer_rule(policy, state, job):
+    """
+    A student holding an offer may only apply to jobs paying more than
+    PLACEMENT_UPGRADE_RATIO times their best offer.
+    """
+    if not state.offers:
+        return None
+
+    package = parse_package(job.package_offered)
+    if state.best_package is None:
+        return 'You already hold an offer. Only dream companies remain open to you.'
+    threshold = state.best_package * policy.upgrade_ratio
+    if package is not None and package > threshold:
+        return None
+    return (f'You already hold an offer of {state.best_package:g} LPA. Only jobs paying more than '
+            f'{threshold:g} LPA and dream companies remain open to you.')
+
+
+# Rule name (as used in PLACEMENT_POLICY_RULES) -> function returning the
+# reason a job is closed to the student, or None
+RULES = {
+    'one_offer': _one_offer_rule,
+}
+
+
+class PlacementPolicy:
+    """
+    Decides whether a student may apply to a job under the rules named in
+    PLACEMENT_POLICY_RULES. Jobs at PLACEMENT_DREAM_COMPANIES, or paying at
+    least PLACEMENT_DREAM_PACKAGE_LPA, are dream jobs and exempt from them.
+
+    Each student's offers for the season are loaded with one query and kept
+    per worker, so evaluating every job on a listing costs no queries per
+    job. An entry is dropped when this worker commits a change to one of
+    the student's selections, and expires after ttl seconds to pick up
+    changes made through other workers.
+    """
+
+    def __init__(self, app=None):
+        self.rules = []
+        self.upgrade_ratio = 1.0
+        self.dream_companies = frozenset()
+        self.dream_package = None
+        self.ttl = 60
+        self.max_students = MAX_STUDENTS
+        self._states = OrderedDict()
+        self._dream_ids = (None, frozenset())
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.rules = [name.strip() for name in app.config.get('PLACEMENT_POLICY_RULES', '').split(',') if name.strip()]
+        unknown = [name for name in self.rules if name not in RULES]
+        if unknown:
+            raise ValueError(f'Unknown placement policy rules: {", ".join(unknown)}')
+        self.upgrade_ratio = app.config.get('PLACEMENT_UPGRADE_RATIO', 1.0)
+        self.dream_companies = frozenset(
+            name.strip().lower() for name in app.config.get('PLACEMENT_DREAM_COMPANIES', '').split(',') if name.strip()
+        )
+        self.dream_package = app.config.get('PLACEMENT_DREAM_PACKAGE_LPA')
+        self.ttl = app.config.get('PLACEMENT_OFFER_TTL_SECONDS', 60)
+
+    @property
+    def version(self):
+        """The configured rules, for cache validators of pages that apply them."""
+        return (tuple(self.rules), self.upgrade_ratio, tuple(sorted(self.dream_companies)), self.dream_package)
+
+    def _load(self, student_id):
+        packages = [parse_package(package) for package in db.session.execute(
+            db.select(JobPosting.package_offered)
+            .join(Application, Application.job_id == JobPosting.id)
+            .where(Application.student_id == student_id,
+                   Application.status == STATUS_SELECTED,
+                   JobPosting.season == current_season())
+        ).scalars()]
+        known = [package for package in packages if package is not None]
+        state = OfferState(len(packages), max(known) if known else None)
+        with self._lock:
+            self._states[student_id] = (time.monotonic(), state)
+            self._states.move_to_end(student_id)
+            while len(self._states) > self.max_students:
+                self._states.popitem(last=False)
+        return state
+
+    def offer_state(self, student_id, fresh=False):
+        """
+        The student's offers this season.
+
+        Args:
+            student_id: The StudentProfile id
+            fresh: Reload from the database instead of using the cache
+
+        Returns:
+            OfferState: Number of offers and the best package in LPA
+        """
+        with self._lock:
+            entry = self._states.get(student_id)
+        if fresh or entry is None or time.monotonic() - entry[0] > self.ttl:
+            return self._load(student_id)
+        return entry[1]
+
+    def _dream_company_ids(self):
+        loaded_at, ids = self._dream_ids
+        if loaded_at is None or time.monotonic() - loaded_at > self.ttl:
+            ids = frozenset(db.session.execute(
+                db.select(CompanyProfile.id)
+                .where(db.func.lower(CompanyProfile.company_name).in_(self.dream_companies))
+            ).scalars()) if self.dream_companies else frozenset()
+            self._dream_ids = (time.monotonic(), ids)
+        return ids
+
+    def is_dream(self, job):
+        if self.dream_package is not None:
+            package = parse_package(job.package_offered)
+            if package is not None and package >= self.dream_package:
+                return True
+        return job.company_id in self._dream_company_ids()
+
+    def evaluate(self, student_id, job, fresh=False):
+        """
+        Check the placement rules for a student applying to a job.
+
+        Args:
+            student_id: The StudentProfile id
+            job: The JobPosting (only company_id and package_offered are read)
+            fresh: Reload the student's offers instead of using the cache
+
+        Returns:
+            Decision: allowed, and the reason when it is not
+        """
+        if not self.rules:
+            return ALLOWED
+        state = self.offer_state(student_id, fresh=fresh)
+        if not state.offers or self.is_dream(job):
+            return ALLOWED
+        for name in self.rules:
+            reason = RULES[name](self, state, job)
+            if reason is not None:
+                return Decision(False, reason)
+        return ALLOWED
+
+    def invalidate(self, student_ids=None):
+        """Drop cached offer state for these students, or for everyone."""
+        with self._lock:
+            if student_ids is None:
+                self._states.clear()
+            for student_id in student_ids or ():
+                self._states.pop(student_id, None)
+
+
+placement_policy = PlacementPolicy(app)
+
+
+def _collect_changes(session, changes):
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Application):
+            history = sa.inspect(obj).attrs.status.history
+            if obj.status == STATUS_SELECTED or STATUS_SELECTED in (history.deleted or ()):
+                changes.add(obj.student_id)
+        elif isinstance(obj, JobPosting) and obj not in session.new:
+            # A changed package can change any holder's best offer
+            if sa.inspect(obj).attrs.package_offered.history.has_changes():
+                changes.add(None)
+    for obj in session.deleted:
+        if isinstance(obj, Application) and obj.status == STATUS_SELECTED:
+            changes.add(obj.student_id)
+
+
+def _apply_changes(changes):
+    placement_policy.invalidate(None if None in changes else changes)
+
+
+on_commit('offer_changes', _collect_changes, _apply_changes, container=set)
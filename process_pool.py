@@ -0,0 +1,39 @@
+# Worker process pools started on first use
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+class ProcessPool:
+    """
+    A pool of max_workers spawned processes, started on the first submit
+    (per web worker) and replaced if one of its processes dies.
+    """
+
+    def __init__(self, max_workers=1):
+        self.max_workers = max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _new_pool(self):
+        # Spawned rather than forked: the web worker has threads and open connections
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def submit(self, fn, *args):
+        """
+        Run fn(*args) in a pool process.
+
+        Returns:
+            Future: The call's future
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._new_pool()
+            try:
+                return self._executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # A pool process died; start a fresh pool
+                self._executor = self._new_pool()
+                return self._executor.submit(fn, *args)
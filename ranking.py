@@ -0,0 +1,229 @@
+# Candidate ranking and bulk shortlisting for recruiters
+
+from collections import namedtuple
+from datetime import datetime
+
+import numpy as np
+
+from app import db
+from live_updates import record_status_change
+from funnel import log_bulk_transition
+from models import (
+    Application, StudentProfile, MockInterview, InterviewFeedback,
+    STATUS_APPLIED, STATUS_SHORTLISTED, STATUS_INTERVIEW_SCHEDULED
+)
+
+# Relative weight of each feature in the final score
+DEFAULT_WEIGHTS = {
+    'cgpa': 0.4,
+    'branch': 0.1,
+    'mock': 0.15,
+    'rating': 0.35,
+}
+
+# Completed mock interviews beyond this count add nothing more
+MOCK_INTERVIEW_CAP = 3
+
+# Score used for applicants with no interview ratings yet
+NEUTRAL_RATING = 0.5
+
+# Applications still in the running
+RANKABLE_STATUSES = (STATUS_APPLIED, STATUS_SHORTLISTED, STATUS_INTERVIEW_SCHEDULED)
+
+RankedCandidate = namedtuple(
+    'RankedCandidate',
+    ['application_id', 'student_id', 'full_name', 'status', 'score', 'cgpa_margin', 'mock_count', 'avg_rating']
+)
+
+
+def _align(keys, values, lookup_keys, fill):
+    """
+    Map (keys -> values) onto lookup_keys without a Python loop.
+
+    Args:
+        keys: Array of ids that have a value
+        values: Array of values for those ids
+        lookup_keys: Array of ids to fetch values for
+        fill: Value for ids missing from keys
+
+    Returns:
+        ndarray: Values aligned with lookup_keys
+    """
+    result = np.full(len(lookup_keys), fill, dtype=float)
+    if len(keys) == 0:
+        return result
+
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    positions = np.searchsorted(sorted_keys, lookup_keys)
+    positions = np.clip(positions, 0, len(sorted_keys) - 1)
+    found = sorted_keys[positions] == lookup_keys
+    result[found] = values[order][positions[found]]
+    return result
+
+
+def load_features(job):
+    """
+    Load every rankable applicant to a job with three aggregate queries and
+    build the raw feature arrays.
+
+    Args:
+        job: The JobPosting object
+
+    Returns:
+        dict: Arrays keyed by feature name, plus ids and names
+    """
+    applicants = db.session.execute(
+        db.select(Application.id, Application.student_id, StudentProfile.full_name,
+                  Application.status, StudentProfile.cgpa, StudentProfile.branch)
+        .join(StudentProfile)
+        .where(Application.job_id == job.id, Application.status.in_(RANKABLE_STATUSES))
+    ).all()
+
+    if not applicants:
+        empty = np.array([], dtype=float)
+        return {'application_id': np.array([], dtype=np.int64), 'student_id': np.array([], dtype=np.int64),
+                'full_name': [], 'status': [], 'cgpa': empty, 'branch_match': empty, 'mock_count': empty,
+                'avg_rating': empty}
+
+    application_ids, student_ids, names, statuses, cgpas, branches = zip(*applicants)
+    application_ids = np.array(application_ids, dtype=np.int64)
+    student_ids = np.array(student_ids, dtype=np.int64)
+
+    eligible_branches = np.array(job.eligible_branches.split(','))
+    branch_match = np.isin(np.array(branches), eligible_branches).astype(float)
+
+    applicant_students = db.select(Application.student_id).where(Application.job_id == job.id)
+    mocks = db.session.execute(
+        db.select(MockInterview.student_id, db.func.count(MockInterview.id))
+        .where(MockInterview.status == 'completed', MockInterview.student_id.in_(applicant_students))
+        .group_by(MockInterview.student_id)
+    ).all()
+    mock_keys, mock_counts = (np.array(col) for col in zip(*mocks)) if mocks else (np.array([]), np.array([]))
+
+    ratings = db.session.execute(
+        db.select(InterviewFeedback.application_id, db.func.avg(InterviewFeedback.rating))
+        .join(Application)
+        .where(Application.job_id == job.id, InterviewFeedback.rating.isnot(None))
+        .group_by(InterviewFeedback.application_id)
+    ).all()
+    rating_keys, rating_values = (np.array(col) for col in zip(*ratings)) if ratings else (np.array([]), np.array([]))
+
+    return {
+        'application_id': application_ids,
+        'student_id': student_ids,
+        'full_name': list(names),
+        'status': list(statuses),
+        'cgpa': np.array(cgpas, dtype=float),
+        'branch_match': branch_match,
+        'mock_count': _align(mock_keys, mock_counts, student_ids, 0),
+        'avg_rating': _align(rating_keys, rating_values, application_ids, np.nan),
+    }
+
+
+def score_features(features, cgpa_criteria, weights=None):
+    """
+    Score all applicants at once.
+
+    Args:
+        features: Output of load_features
+        cgpa_criteria: The job's minimum CGPA
+        weights: Optional dict overriding DEFAULT_WEIGHTS
+
+    Returns:
+        tuple: (scores, cgpa_margin) arrays aligned with the applicants
+    """
+    weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+
+    # CGPA margin over the cut-off, scaled to [0, 1] over the remaining range
+    headroom = max(10.0 - cgpa_criteria, 1e-6)
+    cgpa_margin = features['cgpa'] - cgpa_criteria
+    cgpa_score = np.clip(cgpa_margin / headroom, 0.0, 1.0)
+
+    mock_score = np.minimum(features['mock_count'], MOCK_INTERVIEW_CAP) / MOCK_INTERVIEW_CAP
+
+    # Ratings are on a 1-10 scale
+    rating_score = np.where(np.isnan(features['avg_rating']), NEUTRAL_RATING, features['avg_rating'] / 10.0)
+
+    matrix = np.column_stack([cgpa_score, features['branch_match'], mock_score, rating_score])
+    weight_vector = np.array([weights['cgpa'], weights['branch'], weights['mock'], weights['rating']])
+    return matrix @ weight_vector, cgpa_margin
+
+
+def rank_candidates(job, top_k=None, weights=None):
+    """
+    Rank the active applicants to a job, best first.
+
+    Args:
+        job: The JobPosting object
+        top_k: Only return this many candidates (all if None)
+        weights: Optional dict overriding DEFAULT_WEIGHTS
+
+    Returns:
+        list: RankedCandidate tuples ordered by descending score
+    """
+    features = load_features(job)
+    if len(features['application_id']) == 0:
+        return []
+
+    scores, cgpa_margin = score_features(features, job.cgpa_criteria, weights)
+
+    if top_k is not None and top_k < len(scores):
+        # Partial selection keeps this O(n) before sorting just the top K
+        top = np.argpartition(-scores, top_k)[:top_k]
+        order = top[np.argsort(-scores[top], kind='stable')]
+    else:
+        order = np.argsort(-scores, kind='stable')
+
+    return [
+        RankedCandidate(
+            application_id=int(features['application_id'][i]),
+            student_id=int(features['student_id'][i]),
+            full_name=features['full_name'][i],
+            status=features['status'][i],
+            score=float(scores[i]),
+            cgpa_margin=float(cgpa_margin[i]),
+            mock_count=int(features['mock_count'][i]),
+            avg_rating=None if np.isnan(features['avg_rating'][i]) else float(features['avg_rating'][i]),
+        )
+        for i in order
+    ]
+
+
+def shortlist_top_candidates(job, count, weights=None):
+    """
+    Move the top-ranked applicants still in 'applied' status to 'shortlisted'
+    with a single UPDATE.
+
+    Args:
+        job: The JobPosting object
+        count: Number of candidates to shortlist
+        weights: Optional dict overriding DEFAULT_WEIGHTS
+
+    Returns:
+        list: Application ids that were shortlisted. Applications whose
+        status changed after they were ranked are left alone and not listed.
+    """
+    ranked = rank_candidates(job, weights=weights)
+    selected = [candidate for candidate in ranked if candidate.status == STATUS_APPLIED][:count]
+    if not selected:
+        return []
+
+    # The status guard skips applications withdrawn, rejected or moved on
+    # since ranking; RETURNING reports the rows actually changed
+    application_ids = db.session.execute(
+        db.update(Application)
+        .where(Application.id.in_([candidate.application_id for candidate in selected]),
+               Application.status == STATUS_APPLIED)
+        .values(status=STATUS_SHORTLISTED, updated_date=datetime.utcnow())
+        .returning(Application.id)
+    ).scalars().all()
+
+    changed = set(application_ids)
+    shortlisted = [candidate for candidate in selected if candidate.application_id in changed]
+    if shortlisted:
+        log_bulk_transition(application_ids, STATUS_APPLIED, STATUS_SHORTLISTED)
+        for candidate in shortlisted:
+            record_status_change(db.session, candidate.application_id, job.id,
+                                 candidate.student_id, STATUS_SHORTLISTED)
+    return [candidate.application_id for candidate in shortlisted]
@@ -0,0 +1,319 @@
+# Resume-to-job relevance matching with hashed TF-IDF vectors
+
+import math
+import re
+import zlib
+
+import numpy as np
+import sqlalchemy as sa
+
+from app import db
+from blob_store import blob_store
+from commit_hooks import on_commit
+from models import StudentProfile, JobPosting
+from reloading import ReloadingIndex, index_update
+
+# Number of hashed feature buckets; collisions are rare at this size
+NUM_FEATURES = 2 ** 18
+
+# Seconds before the index is rebuilt to pick up changes from other workers
+DEFAULT_MAX_AGE = 300
+
+# Share of documents changed since the last rebuild at which the IDF is
+# considered stale and the index is rebuilt early
+IDF_REFRESH_RATIO = 0.1
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]')
+
+STOP_WORDS = frozenset('''
+a an and are as at be by for from has have in is it its of on or that the this to was were will
+with we you your our i my me am can etc also using used use work worked working
+'''.split())
+
+
+def tokenize(text):
+    """
+    Split text into lowercase terms, dropping stop words.
+
+    Args:
+        text: Resume or job description text
+
+    Returns:
+        list: The terms
+    """
+    if not text:
+        return []
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def _idf(document_frequency, total):
+    return (np.log((1.0 + total) / (1.0 + document_frequency)) + 1.0).astype(np.float32)
+
+
+def hash_terms(text):
+    """
+    Turn text into hashed term-frequency features.
+
+    Returns:
+        tuple: (feature indices, sublinear term frequencies) as NumPy arrays
+    """
+    counts = {}
+    for token in tokenize(text):
+        bucket = zlib.crc32(token.encode('utf-8')) % NUM_FEATURES
+        counts[bucket] = counts.get(bucket, 0) + 1
+
+    if not counts:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    tf = np.fromiter((1.0 + math.log(count) for count in counts.values()), dtype=np.float32, count=len(counts))
+    return indices, tf
+
+
+class _Buffer:
+    """A NumPy array that grows by doubling as values are appended."""
+
+    def __init__(self, dtype):
+        self.data = np.zeros(64, dtype=dtype)
+        self.size = 0
+
+    def append(self, values):
+        end = self.size + len(values)
+        if end > len(self.data):
+            grown = np.zeros(max(end, 2 * len(self.data)), dtype=self.data.dtype)
+            grown[:self.size] = self.data[:self.size]
+            self.data = grown
+        self.data[self.size:end] = values
+        self.size = end
+
+    def view(self):
+        return self.data[:self.size]
+
+
+class _Collection:
+    """
+    One side of the index (students or jobs): raw term vectors per id plus
+    a TF-IDF weighted, L2-normalized sparse matrix stored as parallel
+    (row, feature, value) arrays.
+
+    A changed document gets a new row appended and its old row zeroed, so
+    an update costs only that document's terms. Rows are weighted with the
+    IDF current when they were written; the matrix is rewritten compactly
+    when the index is rebuilt or half its entries are dead.
+    """
+
+    def __init__(self):
+        self.vectors = {}
+        self.clear()
+
+    def clear(self):
+        self.slots = {}
+        self.ids = _Buffer(np.int64)
+        self.rows = _Buffer(np.int64)
+        self.features = _Buffer(np.int64)
+        self.values = _Buffer(np.float32)
+        self.dead = 0
+
+    def reweight(self, idf):
+        """Rewrite the whole matrix from the raw vectors with this IDF."""
+        self.clear()
+        for doc_id, vector in self.vectors.items():
+            self._append(doc_id, vector, idf)
+
+    def _append(self, doc_id, vector, idf):
+        features, tf = vector
+        row = self.ids.size
+        start = self.values.size
+        self.ids.append([doc_id])
+        if len(features):
+            weights = tf * idf[features]
+            self.rows.append(np.full(len(features), row, dtype=np.int64))
+            self.features.append(features)
+            self.values.append(weights / np.linalg.norm(weights))
+        self.slots[doc_id] = (row, start, self.values.size)
+
+    def set(self, doc_id, vector, idf):
+        """Replace one document's row (vector None removes it)."""
+        slot = self.slots.pop(doc_id, None)
+        if slot is not None:
+            row, start, end = slot
+            self.ids.data[row] = -1
+            self.values.data[start:end] = 0
+            self.dead += end - start
+        if vector is None:
+            self.vectors.pop(doc_id, None)
+        else:
+            self.vectors[doc_id] = vector
+            self._append(doc_id, vector, idf)
+        if self.dead > self.values.size // 2:
+            self.reweight(idf)
+
+    def matrix(self):
+        """(row doc ids with -1 for removed rows, rows, features, values)"""
+        return self.ids.view(), self.rows.view(), self.features.view(), self.values.view()
+
+
+class RelevanceIndex(ReloadingIndex):
+    """
+    In-memory TF-IDF index over student resumes and job descriptions.
+
+    Document vectors are hashed once per change, and a change rewrites
+    only that document's row. Scoring a student against all jobs (or a job
+    against all students) is one sparse matrix-vector product via bincount.
+
+    Between rebuilds the IDF is not recomputed, so it drifts slightly as
+    documents change. The index is rebuilt in the background every max_age
+    seconds, and sooner once more than IDF_REFRESH_RATIO of the documents
+    have changed.
+    """
+
+    def __init__(self, max_age=DEFAULT_MAX_AGE):
+        super().__init__(max_age)
+        self.students = _Collection()
+        self.jobs = _Collection()
+        self.document_frequency = np.zeros(NUM_FEATURES, dtype=np.int32)
+        self._idf = None
+        self._changes = 0
+
+    def _build(self):
+        students = db.session.execute(
+            db.select(StudentProfile.id, StudentProfile.resume_text, StudentProfile.resume_digest)
+        ).all()
+        jobs = db.session.execute(db.select(JobPosting.id, JobPosting.title, JobPosting.description)).all()
+
+        student_vectors = {}
+        for student_id, resume, digest in students:
+            if resume is None and digest:
+                resume = blob_store.get(digest)
+            if resume is not None:
+                student_vectors[student_id] = hash_terms(resume)
+        job_vectors = {job_id: hash_terms(job_text(title, description)) for job_id, title, description in jobs}
+
+        document_frequency = np.zeros(NUM_FEATURES, dtype=np.int32)
+        for features, _ in list(student_vectors.values()) + list(job_vectors.values()):
+            document_frequency[features] += 1
+        idf = _idf(document_frequency, len(student_vectors) + len(job_vectors))
+
+        collections = []
+        for vectors in (student_vectors, job_vectors):
+            collection = _Collection()
+            collection.vectors = vectors
+            collection.reweight(idf)
+            collections.append(collection)
+        return collections[0], collections[1], document_frequency, idf
+
+    def _install(self, data):
+        self.students, self.jobs, self.document_frequency, self._idf = data
+        self._changes = 0
+
+    def _set(self, collection, doc_id, text):
+        old = collection.vectors.get(doc_id)
+        if old is not None:
+            self.document_frequency[old[0]] -= 1
+        vector = hash_terms(text) if text is not None else None
+        if vector is not None:
+            self.document_frequency[vector[0]] += 1
+        collection.set(doc_id, vector, self._idf)
+
+        self._changes += 1
+        total = len(self.students.vectors) + len(self.jobs.vectors)
+        if self._changes > IDF_REFRESH_RATIO * total:
+            self.refresh()
+
+    @index_update
+    def update_student(self, student_id, resume):
+        self._set(self.students, student_id, resume)
+
+    @index_update
+    def update_job(self, job_id, title, description):
+        self._set(self.jobs, job_id, job_text(title, description))
+
+    def remove_student(self, student_id):
+        self.update_student(student_id, None)
+
+    @index_update
+    def remove_job(self, job_id):
+        self._set(self.jobs, job_id, None)
+
+    def _query_vector(self, collection, doc_id, idf):
+        vector = np.zeros(NUM_FEATURES, dtype=np.float32)
+        entry = collection.vectors.get(doc_id)
+        if entry is not None and len(entry[0]):
+            features, tf = entry
+            weights = tf * idf[features]
+            vector[features] = weights / np.linalg.norm(weights)
+        return vector
+
+    def _score(self, target, query, candidate_ids):
+        ids, rows, features, values = target.matrix()
+        scores = np.bincount(rows, weights=values * query[features], minlength=len(ids))
+        if candidate_ids is None:
+            mask = ids >= 0
+        else:
+            mask = np.isin(ids, np.fromiter(candidate_ids, dtype=np.int64))
+        return ids[mask], scores[mask]
+
+    def score_jobs_for_student(self, student_id, job_ids=None):
+        """
+        Cosine relevance of every job (or the given jobs) to a student's resume.
+
+        Returns:
+            dict: job id -> score in [0, 1]
+        """
+        with self._lock:
+            self._ensure_loaded()
+            query = self._query_vector(self.students, student_id, self._idf)
+            ids, scores = self._score(self.jobs, query, job_ids)
+        return dict(zip(ids.tolist(), scores.tolist()))
+
+    def rank_students_for_job(self, job_id, student_ids=None, top_k=None):
+        """
+        Rank students (optionally only the given ones) by resume relevance to a job.
+
+        Returns:
+            list: (student id, score) pairs, best first
+        """
+        with self._lock:
+            self._ensure_loaded()
+            query = self._query_vector(self.jobs, job_id, self._idf)
+            ids, scores = self._score(self.students, query, student_ids)
+
+        if top_k is not None and top_k < len(scores):
+            top = np.argpartition(-scores, top_k)[:top_k]
+            order = top[np.argsort(-scores[top], kind='stable')]
+        else:
+            order = np.argsort(-scores, kind='stable')
+        return [(int(ids[i]), float(scores[i])) for i in order]
+
+
+def job_text(title, description):
+    return f'{title or ""}\n{description or ""}'
+
+
+relevance_index = RelevanceIndex()
+
+
+# Keep the index in step with committed profile and posting changes
+def _collect_changes(session, changes):
+    for obj in session.new | session.dirty:
+        state = sa.inspect(obj)
+        if isinstance(obj, StudentProfile):
+            if obj in session.new or state.attrs.resume_digest.history.has_changes():
+                changes.append(('update_student', obj.id, obj.resume))
+        elif isinstance(obj, JobPosting):
+            if (obj in session.new or state.attrs.title.history.has_changes()
+                    or state.attrs.description.history.has_changes()):
+                changes.append(('update_job', obj.id, obj.title, obj.description))
+    for obj in session.deleted:
+        if isinstance(obj, StudentProfile):
+            changes.append(('remove_student', obj.id))
+        elif isinstance(obj, JobPosting):
+            changes.append(('remove_job', obj.id))
+
+
+def _apply_changes(changes):
+    for method, *args in changes:
+        getattr(relevance_index, method)(*args)
+
+
+pending_relevance_changes = on_commit('relevance_changes', _collect_changes, _apply_changes)
@@ -0,0 +1,86 @@
+# Base for in-memory indexes built from the database and rebuilt in the background
+
+import logging
+import threading
+import time
+from functools import wraps
+
+from app import app
+
+
+def index_update(method):
+    """
+    Mark a ReloadingIndex method as an update from a committed change. It
+    runs under the index lock, is skipped until the index is first loaded,
+    and is replayed onto a rebuild that was reading the database meanwhile.
+    Updates must be idempotent (set a value rather than add to one), since
+    the rebuild may already have seen the change.
+    """
+    @wraps(method)
+    def wrapper(self, *args):
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            if self._replay is not None:
+                self._replay.append((method, args))
+            method(self, *args)
+    return wrapper
+
+
+class ReloadingIndex:
+    """
+    An index built from the database on first use and kept in step with
+    changes committed through this worker. Every max_age seconds, or when
+    a subclass asks for it, the index is rebuilt on a background thread to
+    pick up changes made through other workers; queries keep using the
+    current data until the new build is swapped in.
+
+    Subclasses implement _build(), which reads the database and returns the
+    new data without touching the index, and _install(data), which swaps
+    it in under the lock.
+    """
+
+    def __init__(self, max_age):
+        self.max_age = max_age
+        self._loaded_at = None
+        self._replay = None
+        self._lock = threading.RLock()
+
+    def _build(self):
+        raise NotImplementedError
+
+    def _install(self, data):
+        raise NotImplementedError
+
+    def _ensure_loaded(self):
+        """Load on first use; start a background rebuild once max_age has passed. Call with the lock held."""
+        if self._loaded_at is None:
+            self._install(self._build())
+            self._loaded_at = time.monotonic()
+        elif time.monotonic() - self._loaded_at >= self.max_age:
+            self.refresh()
+
+    def refresh(self):
+        """Rebuild the index on a background thread, unless a rebuild is already running."""
+        with self._lock:
+            if self._replay is not None:
+                return
+            self._replay = []
+        threading.Thread(target=self._rebuild, daemon=True).start()
+
+    def _rebuild(self):
+        try:
+            with app.app_context():
+                data = self._build()
+        except Exception:
+            logging.exception(f'Could not rebuild {type(self).__name__}')
+            data = None
+
+        with self._lock:
+            if data is not None:
+                self._install(data)
+                for method, args in self._replay:
+                    method(self, *args)
+            # After a failure, try again in max_age seconds
+            self._loaded_at = time.monotonic()
+            self._replay = None
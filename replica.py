@@ -0,0 +1,137 @@
+# Read-replica routing for the SQLAlchemy session
+
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import g, has_request_context, session
+from flask_sqlalchemy.session import Session
+
+# Bind key used for the replica engine in SQLALCHEMY_BINDS
+REPLICA_BIND_KEY = 'replica'
+
+# Flask session key holding the time until which reads stick to the primary
+STICKY_SESSION_KEY = '_db_primary_until'
+
+# Seconds a user's reads stay on the primary after they commit a write
+DEFAULT_STICKY_SECONDS = 5
+
+
+def _replica_requested(clause):
+    """
+    Decide whether a statement has asked to be sent to the replica.
+
+    Args:
+        clause: The statement being executed, if any
+
+    Returns:
+        bool: True if the route or the query opted into replica reads
+    """
+    if clause is not None:
+        option = clause._execution_options.get('replica')
+        if option is not None:
+            return option
+
+    return has_request_context() and g.get('use_replica', False)
+
+
+def _sticky_to_primary():
+    """
+    Check whether the current user wrote recently enough that their reads
+    must go to the primary (read-your-writes).
+
+    Returns:
+        bool: True if reads should stay on the primary
+    """
+    if not has_request_context():
+        return False
+
+    return session.get(STICKY_SESSION_KEY, 0) > time.time()
+
+
+class RoutingSession(Session):
+    """
+    Session that sends read-only statements to the replica bind when the
+    route or query asks for it, and everything else to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._can_use_replica(mapper, clause):
+            return self._db.engines[REPLICA_BIND_KEY]
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _can_use_replica(self, mapper, clause):
+        if REPLICA_BIND_KEY not in self._db.engines:
+            return False
+
+        # Models on another bind (e.g. the archive) are not replicated
+        if mapper is not None and sa.inspect(mapper).local_table.metadata.info.get('bind_key'):
+            return False
+
+        # Writes, flushes and reads following a write in this transaction
+        # always go to the primary
+        if self._flushing or self.info.get('wrote'):
+            return False
+
+        if clause is not None and not isinstance(clause, sa.Select):
+            return False
+
+        return _replica_requested(clause) and not _sticky_to_primary()
+
+
+@sa.event.listens_for(RoutingSession, 'after_flush')
+def _mark_session_wrote(db_session, flush_context):
+    db_session.info['wrote'] = True
+
+
+def stick_to_primary():
+    """
+    Send the current user's reads to the primary for REPLICA_STICKY_SECONDS,
+    so they see a write just committed for them. Call from the request's
+    thread; does nothing outside a request.
+    """
+    if not has_request_context():
+        return
+
+    from flask import current_app
+    sticky_seconds = current_app.config.get('REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+    session[STICKY_SESSION_KEY] = time.time() + sticky_seconds
+
+
+@sa.event.listens_for(RoutingSession, 'after_commit')
+def _stick_user_to_primary(db_session):
+    if db_session.info.get('wrote'):
+        stick_to_primary()
+
+
+def replica_read(view):
+    """
+    Route decorator that sends the view's read queries to the replica.
+
+    Falls back to the primary when no replica is configured or when the
+    current user has committed a write within REPLICA_STICKY_SECONDS.
+    """
+    @wraps(view)
+    def wrapped(*args, **kwargs):
+        g.use_replica = True
+        try:
+            return view(*args, **kwargs)
+        finally:
+            g.use_replica = False
+    return wrapped
+
+
+@contextmanager
+def use_replica(enabled=True):
+    """
+    Context manager that sends read queries in the block to the replica
+    (or, with enabled=False, pins them to the primary).
+    """
+    previous = g.get('use_replica', False)
+    g.use_replica = enabled
+    try:
+        yield
+    finally:
+        g.use_replica = previous
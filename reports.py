@@ -0,0 +1,588 @@
+# Placement reports rendered offline in a pool of worker processes
+
+import csv
+import logging
+import os
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from markupsafe import escape
+
+from app import app, db
+from archive import archive_enabled, season_applications
+from models import (
+    ReportJob, Application, StudentProfile, JobPosting, CompanyProfile, ArchivedJobPosting, STATUS_SELECTED,
+    REPORT_QUEUED, REPORT_RUNNING, REPORT_DONE, REPORT_FAILED, REPORT_PENDING
+)
+from process_pool import ProcessPool
+from sqlite_mode import write_queue
+from utils import format_status, current_season
+
+REPORT_KINDS = {
+    'branch': 'Placement Report by Branch',
+    'company': 'Placement Report by Company',
+}
+
+# Format -> (file extension, mimetype). "print" is HTML laid out for
+# printing or saving as PDF from the browser, one group per page.
+REPORT_FORMATS = {
+    'html': ('html', 'text/html'),
+    'print': ('html', 'text/html'),
+    'csv': ('csv', 'text/csv'),
+}
+
+DETAIL_HEADERS = ['Branch', 'Roll Number', 'Student', 'CGPA', 'Company', 'Role', 'Package', 'Status', 'Applied On']
+SUMMARY_HEADERS = {
+    'branch': ['Branch', 'Students', 'Placed', 'Placement %', 'Offers', 'Applications'],
+    'company': ['Company', 'Postings', 'Applications', 'Students Applied', 'Offers', 'Students Selected'],
+}
+
+# Rows fetched per round trip while streaming report details; the render
+# timeout is also checked this often
+STREAM_BATCH_SIZE = 1000
+
+# A detail row of an archived season, with the fields _detail_values reads
+ArchivedDetailRow = namedtuple('ArchivedDetailRow', [
+    'group', 'branch', 'roll_number', 'full_name', 'cgpa', 'company_name', 'title', 'package_offered',
+    'status', 'applied_date'
+])
+
+# Queued jobs older than this were lost with the web worker that queued them
+QUEUED_EXPIRY = timedelta(hours=1)
+
+HTML_STYLE = """
+body { font-family: sans-serif; font-size: 12px; margin: 24px; }
+table { border-collapse: collapse; width: 100%; margin-bottom: 24px; }
+th, td { border: 1px solid #ccc; padding: 4px 6px; text-align: left; }
+th { background: #f0f0f0; }
+"""
+
+PRINT_STYLE = """
+@page { size: A4 landscape; margin: 12mm; }
+body { margin: 0; }
+section.group { break-before: page; }
+thead { display: table-header-group; }
+tr { break-inside: avoid; }
+"""
+
+
+def _branch_summary(students, stats):
+    """
+    Branch summary rows from the cohort size and the (applications,
+    offers, placed) totals of each branch.
+    """
+    for branch in sorted(students):
+        applications, offers, placed = stats.get(branch, (0, 0, 0))
+        yield [branch, students[branch], placed, f'{100 * placed / students[branch]:.1f}', offers, applications]
+
+
+def _summary_rows(kind, season):
+    """
+    Per-group totals for the top of a report, from aggregate queries.
+    """
+    is_selected = db.case((Application.status == STATUS_SELECTED, 1), else_=0)
+    selected_student = db.case((Application.status == STATUS_SELECTED, Application.student_id))
+
+    if kind == 'branch':
+        rows = db.session.execute(
+            db.select(
+                StudentProfile.branch,
+                db.func.count(Application.id).label('applications'),
+                db.func.coalesce(db.func.sum(is_selected), 0).label('offers'),
+                db.func.count(db.distinct(selected_student)).label('placed'),
+                db.func.count(db.distinct(Application.student_id)).label('applicants')
+            )
+            .select_from(Application)
+            .join(StudentProfile, Application.student_id == StudentProfile.id)
+            .join(JobPosting, Application.job_id == JobPosting.id)
+            .where(JobPosting.season == season)
+            .group_by(StudentProfile.branch)
+        ).all()
+        stats = {row.branch: (row.applications, row.offers, row.placed) for row in rows}
+        if season >= current_season():
+            # Everyone registered now is in this season's cohort
+            students = dict(db.session.execute(
+                db.select(StudentProfile.branch, db.func.count(StudentProfile.id)).group_by(StudentProfile.branch)
+            ).all())
+        else:
+            # Profiles do not record when a student graduated, so an earlier
+            # season's cohort is the students who applied in it
+            students = {row.branch: row.applicants for row in rows}
+        yield from _branch_summary(students, stats)
+        return
+
+    yield from (list(row) for row in db.session.execute(
+        db.select(
+            CompanyProfile.company_name,
+            db.func.count(db.distinct(JobPosting.id)),
+            db.func.count(Application.id),
+            db.func.count(db.distinct(Application.student_id)),
+            db.func.coalesce(db.func.sum(is_selected), 0),
+            db.func.count(db.distinct(selected_student))
+        )
+        .select_from(JobPosting)
+        .join(CompanyProfile, JobPosting.company_id == CompanyProfile.id)
+        .outerjoin(Application, Application.job_id == JobPosting.id)
+        .where(JobPosting.season == season)
+        .group_by(CompanyProfile.company_name)
+        .order_by(CompanyProfile.company_name)
+    ))
+
+
+def _detail_rows(kind, season):
+    """
+    Stream one row per application in the season, ordered by report group.
+    """
+    if kind == 'branch':
+        group = StudentProfile.branch
+        order = [StudentProfile.branch, StudentProfile.roll_number, CompanyProfile.company_name]
+    else:
+        group = CompanyProfile.company_name
+        order = [CompanyProfile.company_name, JobPosting.title, StudentProfile.roll_number]
+
+    return db.session.execute(
+        db.select(
+            group.label('group'), StudentProfile.branch, StudentProfile.roll_number, StudentProfile.full_name,
+            StudentProfile.cgpa, CompanyProfile.company_name, JobPosting.title, JobPosting.package_offered,
+            Application.status, Application.applied_date
+        )
+        .select_from(Application)
+        .join(StudentProfile, Application.student_id == StudentProfile.id)
+        .join(JobPosting, Application.job_id == JobPosting.id)
+        .join(CompanyProfile, JobPosting.company_id == CompanyProfile.id)
+        .where(JobPosting.season == season)
+        .order_by(*order, Application.id)
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+
+
+def _is_archived(season):
+    """Whether any of the season's postings have been moved to the archive."""
+    return archive_enabled() and db.session.execute(
+        db.select(ArchivedJobPosting.id).where(ArchivedJobPosting.season == season).limit(1)
+    ).first() is not None
+
+
+def _archived_report_rows(kind, season):
+    """
+    Summary and detail rows of a season that is at least partly archived,
+    from archive.season_applications. Branch and CGPA are those recorded
+    when the season was archived, and the branch cohort is the students who
+    applied that season. The season is read into memory, unlike a live one.
+
+    Returns:
+        tuple: (list of summary rows, list of ArchivedDetailRow in report order)
+    """
+    applications = season_applications(season)
+
+    # Roll numbers and names are only kept on the live profiles
+    student_ids = sorted({row.student_id for row in applications})
+    students = {}
+    for start in range(0, len(student_ids), STREAM_BATCH_SIZE):
+        students.update((row.id, row) for row in db.session.execute(
+            db.select(StudentProfile.id, StudentProfile.roll_number, StudentProfile.full_name)
+            .where(StudentProfile.id.in_(student_ids[start:start + STREAM_BATCH_SIZE]))
+        ))
+
+    details = []
+    for row in applications:
+        student = students.get(row.student_id)
+        details.append(ArchivedDetailRow(
+            group=row.branch if kind == 'branch' else row.company_name,
+            branch=row.branch,
+            roll_number=student.roll_number if student else '',
+            full_name=student.full_name if student else '',
+            cgpa=row.cgpa,
+            company_name=row.company_name,
+            title=row.job_title,
+            package_offered=row.package_offered,
+            status=row.status,
+            applied_date=row.applied_date
+        ))
+    if kind == 'branch':
+        details.sort(key=lambda row: (row.branch, row.roll_number, row.company_name))
+    else:
+        details.sort(key=lambda row: (row.company_name, row.title, row.roll_number))
+
+    # Per group: applications, offers, students applied, students selected
+    totals = {}
+    for row in applications:
+        group = totals.setdefault(row.branch if kind == 'branch' else row.company_name, [0, 0, set(), set()])
+        group[0] += 1
+        group[2].add(row.student_id)
+        if row.status == STATUS_SELECTED:
+            group[1] += 1
+            group[3].add(row.student_id)
+
+    if kind == 'branch':
+        summary = list(_branch_summary(
+            {branch: len(applied) for branch, (_, _, applied, _) in totals.items()},
+            {branch: (applications, offers, len(selected))
+             for branch, (applications, offers, _, selected) in totals.items()}
+        ))
+    else:
+        # Postings without applications count too
+        postings = dict(db.session.execute(
+            db.select(ArchivedJobPosting.id, ArchivedJobPosting.company_name).where(ArchivedJobPosting.season == season)
+        ).all())
+        postings.update(db.session.execute(
+            db.select(JobPosting.id, CompanyProfile.company_name)
+            .join(CompanyProfile, JobPosting.company_id == CompanyProfile.id)
+            .where(JobPosting.season == season)
+        ).all())
+        companies = {}
+        for company_name in postings.values():
+            companies[company_name] = companies.get(company_name, 0) + 1
+        summary = []
+        for company_name in sorted(companies):
+            applications, offers, applied, selected = totals.get(company_name, (0, 0, set(), set()))
+            summary.append([company_name, companies[company_name], applications, len(applied), offers, len(selected)])
+    return summary, details
+
+
+def _detail_values(row):
+    return [
+        row.branch, row.roll_number, row.full_name, f'{row.cgpa:.2f}', row.company_name, row.title,
+        row.package_offered or '', format_status(row.status)[0],
+        row.applied_date.strftime('%Y-%m-%d') if row.applied_date else ''
+    ]
+
+
+class _CSVReport:
+    """
+    One CSV row per application; the group is the Branch or Company column.
+    """
+
+    def __init__(self, f, title, summary_headers, summary):
+        self.writer = csv.writer(f)
+        self.writer.writerow(DETAIL_HEADERS)
+
+    def start_group(self, name):
+        pass
+
+    def row(self, values):
+        self.writer.writerow(values)
+
+    def finish(self):
+        pass
+
+
+class _HTMLReport:
+    """
+    Summary table followed by one table of applications per group.
+    """
+
+    def __init__(self, f, title, summary_headers, summary, printable=False):
+        self.f = f
+        self.in_group = False
+        style = HTML_STYLE + (PRINT_STYLE if printable else '')
+        f.write(f'<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{escape(title)}</title>'
+                f'<style>{style}</style></head><body>\n')
+        f.write(f'<h1>{escape(title)}</h1>\n<p>Generated {datetime.utcnow():%Y-%m-%d %H:%M} UTC</p>\n')
+        f.write('<section><h2>Summary</h2>')
+        self._open_table(summary_headers)
+        for values in summary:
+            self.row(values)
+        f.write('</tbody></table></section>\n')
+
+    def _open_table(self, headers):
+        self.f.write('<table><thead><tr>' + ''.join(f'<th>{escape(h)}</th>' for h in headers)
+                     + '</tr></thead><tbody>\n')
+
+    def start_group(self, name):
+        if self.in_group:
+            self.f.write('</tbody></table></section>\n')
+        self.f.write(f'<section class="group"><h2>{escape(name)}</h2>')
+        self._open_table(DETAIL_HEADERS)
+        self.in_group = True
+
+    def row(self, values):
+        self.f.write('<tr>' + ''.join(f'<td>{escape(value)}</td>' for value in values) + '</tr>\n')
+
+    def finish(self):
+        if self.in_group:
+            self.f.write('</tbody></table></section>\n')
+        self.f.write('</body></html>\n')
+
+
+def render_report(kind, fmt, season, path, deadline=None):
+    """
+    Write a report to path. Rows are streamed from the database and written
+    as they arrive, so memory use does not grow with the season's size. The
+    file appears at path only once it is complete.
+
+    Args:
+        kind: A key of REPORT_KINDS
+        fmt: A key of REPORT_FORMATS
+        season: Season such as "2025-26"
+        path: Destination file
+        deadline: time.monotonic() value after which rendering is abandoned
+
+    Returns:
+        int: Number of application rows written
+
+    Raises:
+        TimeoutError: If the deadline passes while rendering
+    """
+    title = f'{REPORT_KINDS[kind]}, {season}'
+    if _is_archived(season):
+        summary, details = _archived_report_rows(kind, season)
+    else:
+        summary, details = list(_summary_rows(kind, season)), _detail_rows(kind, season)
+
+    partial = path + '.part'
+    with open(partial, 'w', newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            report = _CSVReport(f, title, SUMMARY_HEADERS[kind], summary)
+        else:
+            report = _HTMLReport(f, title, SUMMARY_HEADERS[kind], summary, printable=fmt == 'print')
+
+        rows = 0
+        current_group = None
+        for row in details:
+            if rows == 0 or row.group != current_group:
+                current_group = row.group
+                report.start_group(current_group)
+            report.row(_detail_values(row))
+            rows += 1
+            if deadline is not None and rows % STREAM_BATCH_SIZE == 0 and time.monotonic() > deadline:
+                raise TimeoutError(f'Report took longer than {app.config["REPORT_TIMEOUT_SECONDS"]} seconds')
+        report.finish()
+
+    os.replace(partial, path)
+    return rows
+
+
+def storage_path():
+    return app.config.get('REPORT_STORAGE_PATH') or os.path.join(app.instance_path, 'reports')
+
+
+def _set_finished(job_id, **values):
+    db.session.execute(
+        db.update(ReportJob)
+        .where(ReportJob.id == job_id, ReportJob.status.in_(REPORT_PENDING))
+        .values(finished_at=datetime.utcnow(), **values)
+    )
+
+
+def _finish(job_id, **values):
+    _set_finished(job_id, **values)
+    db.session.commit()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def run_report_job(job_id):
+    """
+    Render a queued report job. Runs in a report pool process.
+
+    The claim and the outcome are committed directly rather than through
+    SQLITE_WRITE_QUEUE, whose writer thread belongs to the web worker;
+    on SQLite these two short writes wait on the busy timeout.
+
+    Args:
+        job_id: The ReportJob id
+    """
+    with app.app_context():
+        # Claim the job so it is rendered once even if submitted twice
+        claimed = db.session.execute(
+            db.update(ReportJob)
+            .where(ReportJob.id == job_id, ReportJob.status == REPORT_QUEUED)
+            .values(status=REPORT_RUNNING, started_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return
+
+        job = db.session.get(ReportJob, job_id)
+        directory = storage_path()
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{job.id}-{job.kind}-{job.season}.{REPORT_FORMATS[job.format][0]}')
+
+        started = time.monotonic()
+        try:
+            rows = render_report(job.kind, job.format, job.season, path,
+                                 deadline=started + app.config['REPORT_TIMEOUT_SECONDS'])
+        except Exception as e:
+            logging.exception(f'Report job {job_id} failed')
+            db.session.rollback()
+            _remove(path + '.part')
+            _finish(job_id, status=REPORT_FAILED, error=(str(e) or type(e).__name__)[:500])
+            return
+
+        _finish(job_id, status=REPORT_DONE, file_path=path, row_count=rows, file_size=os.path.getsize(path))
+        logging.info(f'Report job {job_id} ({job.kind}, {job.format}, {job.season}): '
+                     f'{rows} rows in {time.monotonic() - started:.1f}s')
+
+
+def _record_crash(job_id, future):
+    # A pool process that dies (e.g. killed for memory) never reports back
+    if future.exception() is not None:
+        with app.app_context():
+            write_queue.run(_set_finished, job_id, status=REPORT_FAILED,
+                            error=f'Report worker stopped: {future.exception()}'[:500])
+
+
+def expire_stale_jobs():
+    """
+    Fail jobs whose worker is gone: running past the render timeout, or
+    still queued after QUEUED_EXPIRY (the web worker that queued them
+    restarted).
+
+    Returns:
+        int: Number of jobs marked failed
+    """
+    return write_queue.run(_expire_stale_jobs)
+
+
+def _expire_stale_jobs():
+    now = datetime.utcnow()
+    running_cutoff = now - timedelta(seconds=app.config['REPORT_TIMEOUT_SECONDS'] + 60)
+    expired = db.session.execute(
+        db.update(ReportJob)
+        .where(db.or_(
+            db.and_(ReportJob.status == REPORT_RUNNING, ReportJob.started_at < running_cutoff),
+            db.and_(ReportJob.status == REPORT_QUEUED, ReportJob.created_at < now - QUEUED_EXPIRY)
+        ))
+        .values(status=REPORT_FAILED, error='Report worker stopped before finishing', finished_at=now)
+    ).rowcount
+    return expired
+
+
+class ReportRunner:
+    """
+    Queues report jobs on a pool of worker processes, so a report over a
+    whole season never ties up a web worker.
+
+    The pool is started on first use with REPORT_WORKERS processes per web
+    worker. REPORT_MAX_PENDING caps queued and running jobs site-wide and
+    REPORT_MAX_PENDING_PER_USER caps them per user. Asking for a report that
+    is already queued or running returns the existing job.
+    """
+
+    def __init__(self, app=None):
+        self.pool = ProcessPool(max_workers=2)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.pool.max_workers = app.config.get('REPORT_WORKERS', 2)
+
+    def _run(self, job_id):
+        future = self.pool.submit(run_report_job, job_id)
+        future.add_done_callback(lambda f: _record_crash(job_id, f))
+
+    def submit(self, kind, fmt, season, user_id):
+        """
+        Queue a report.
+
+        Args:
+            kind: A key of REPORT_KINDS
+            fmt: A key of REPORT_FORMATS
+            season: Season such as "2025-26"
+            user_id: The requesting user's id
+
+        Returns:
+            ReportJob: The new job, or the matching job already in progress
+
+        Raises:
+            ValueError: If too many reports are already queued or running
+        """
+        # Checked and queued on the writer, so concurrent requests cannot
+        # both pass the caps
+        job_id, created = write_queue.run(_queue_job, kind, fmt, season, user_id)
+        if created:
+            self._run(job_id)
+        return db.session.get(ReportJob, job_id)
+
+
+def _queue_job(kind, fmt, season, user_id):
+    """
+    Returns:
+        tuple: (job id, True if the job is new rather than one in progress)
+    """
+    _expire_stale_jobs()
+
+    existing = db.session.execute(
+        db.select(ReportJob.id).where(
+            ReportJob.kind == kind,
+            ReportJob.format == fmt,
+            ReportJob.season == season,
+            ReportJob.status.in_(REPORT_PENDING)
+        ).limit(1)
+    ).scalar()
+    if existing is not None:
+        return existing, False
+
+    pending = ReportJob.query.filter(ReportJob.status.in_(REPORT_PENDING))
+    if pending.count() >= app.config['REPORT_MAX_PENDING']:
+        raise ValueError('Too many reports are being generated right now. Please try again in a few minutes.')
+    if pending.filter(ReportJob.requested_by == user_id).count() >= app.config['REPORT_MAX_PENDING_PER_USER']:
+        raise ValueError('You already have reports being generated. Please wait for them to finish.')
+
+    job = ReportJob(requested_by=user_id, kind=kind, format=fmt, season=season)
+    db.session.add(job)
+    db.session.flush()
+    return job.id, True
+
+
+report_runner = ReportRunner(app)
+
+
+def report_metrics(days=30):
+    """
+    Timings of report jobs finished in the last days, per kind and format.
+
+    Returns:
+        list: dicts with kind, format, jobs, failed, avg_queue_seconds,
+        avg_run_seconds, max_run_seconds and rows_per_second
+    """
+    jobs = ReportJob.query.filter(
+        ReportJob.finished_at >= datetime.utcnow() - timedelta(days=days)
+    ).all()
+
+    by_key = {}
+    for job in jobs:
+        by_key.setdefault((job.kind, job.format), []).append(job)
+
+    metrics = []
+    for (kind, fmt), group in sorted(by_key.items()):
+        done = [job for job in group if job.status == REPORT_DONE]
+        queued = [job.queue_seconds for job in group if job.queue_seconds is not None]
+        run = [job.run_seconds for job in done]
+        run_total = sum(run)
+        metrics.append({
+            'kind': kind,
+            'format': fmt,
+            'jobs': len(group),
+            'failed': len(group) - len(done),
+            'avg_queue_seconds': sum(queued) / len(queued) if queued else None,
+            'avg_run_seconds': run_total / len(run) if run else None,
+            'max_run_seconds': max(run) if run else None,
+            'rows_per_second': sum(job.row_count for job in done) / run_total if run_total else None,
+        })
+    return metrics
+
+
+def prune_report_jobs(days):
+    """
+    Delete report jobs finished more than days ago, with their files.
+
+    Returns:
+        int: Number of jobs deleted
+    """
+    jobs = ReportJob.query.filter(
+        ReportJob.finished_at < datetime.utcnow() - timedelta(days=days)
+    ).all()
+    for job in jobs:
+        if job.file_path:
+            _remove(job.file_path)
+        db.session.delete(job)
+    db.session.commit()
+    return len(jobs)
@@ -0,0 +1,260 @@
+# Season rollover: clone job postings and their interview rounds into a new season
+
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+from app import db
+from archive import archive_enabled
+from recommendations import pending_relevance_changes
+from replica import stick_to_primary
+from models import (
+    JobPosting, InterviewRound, CompanyProfile, ArchivedJobPosting, ArchivedInterviewRound
+)
+from utils import season_start, season_for
+
+# Posting fields CDC can set for every cloned posting
+OVERRIDABLE_FIELDS = ('cgpa_criteria', 'eligible_branches', 'package_offered')
+
+POSTING_FIELDS = (
+    'company_id', 'title', 'description', 'cgpa_criteria', 'eligible_branches',
+    'application_deadline', 'num_rounds', 'package_offered'
+)
+ROUND_FIELDS = ('round_number', 'round_name', 'round_description', 'round_date')
+
+# What cloning one posting would do. changes holds (field, old, new) for
+# every field that differs from the source; rounds holds (round_number,
+# round_name, old_date, new_date); skip_reason is set if it will not be cloned.
+ClonePlan = namedtuple('ClonePlan', [
+    'source_id', 'company_name', 'title', 'changes', 'rounds', 'warnings', 'skip_reason'
+])
+
+
+def default_offset(source_season, target_season):
+    """
+    Whole weeks closest to the gap between two seasons' start dates, so
+    cloned interview rounds fall on the same weekday.
+
+    Returns:
+        timedelta: The date offset
+    """
+    days = (season_start(target_season) - season_start(source_season)).days
+    return timedelta(weeks=round(days / 7))
+
+
+def season_postings(season):
+    """
+    Postings of a season that can be cloned, from the live tables or, for
+    an archived season, the archive.
+
+    Returns:
+        list: (job_id, company_name, title) tuples ordered by company and title
+    """
+    rows = db.session.execute(
+        db.select(JobPosting.id, CompanyProfile.company_name, JobPosting.title)
+        .join(CompanyProfile, JobPosting.company_id == CompanyProfile.id)
+        .where(JobPosting.season == season)
+        .order_by(CompanyProfile.company_name, JobPosting.title)
+    ).all()
+    if rows or not archive_enabled():
+        return rows
+    return db.session.execute(
+        db.select(ArchivedJobPosting.id, ArchivedJobPosting.company_name, ArchivedJobPosting.title)
+        .where(ArchivedJobPosting.season == season)
+        .order_by(ArchivedJobPosting.company_name, ArchivedJobPosting.title)
+    ).all()
+
+
+def _load_sources(season, job_ids):
+    """
+    Read the selected postings and their rounds, from the live tables or
+    the archive.
+
+    Returns:
+        tuple: (list of posting dicts with id and company_name, dict of
+        job_id -> list of round dicts)
+    """
+    posting_columns = [getattr(JobPosting, field) for field in POSTING_FIELDS]
+    postings = [dict(row._mapping) for row in db.session.execute(
+        db.select(JobPosting.id, CompanyProfile.company_name, *posting_columns)
+        .join(CompanyProfile, JobPosting.company_id == CompanyProfile.id)
+        .where(JobPosting.season == season, JobPosting.id.in_(job_ids))
+        .order_by(CompanyProfile.company_name, JobPosting.title)
+    )]
+    round_model = InterviewRound
+    if not postings and archive_enabled():
+        posting_columns = [getattr(ArchivedJobPosting, field) for field in POSTING_FIELDS]
+        postings = [dict(row._mapping) for row in db.session.execute(
+            db.select(ArchivedJobPosting.id, ArchivedJobPosting.company_name, *posting_columns)
+            .where(ArchivedJobPosting.season == season, ArchivedJobPosting.id.in_(job_ids))
+            .order_by(ArchivedJobPosting.company_name, ArchivedJobPosting.title)
+        )]
+        round_model = ArchivedInterviewRound
+
+    rounds = {}
+    if postings:
+        for row in db.session.execute(
+            db.select(round_model.job_id, *[getattr(round_model, field) for field in ROUND_FIELDS])
+            .where(round_model.job_id.in_([posting['id'] for posting in postings]))
+            .order_by(round_model.job_id, round_model.round_number)
+        ):
+            rounds.setdefault(row.job_id, []).append(dict(row._mapping))
+    return postings, rounds
+
+
+def _skip_reasons(postings, target_season):
+    """
+    Postings that cannot be cloned: already cloned into the target season,
+    or whose company is no longer registered.
+
+    Returns:
+        dict: job_id -> reason
+    """
+    ids = [posting['id'] for posting in postings]
+    cloned = set(db.session.execute(
+        db.select(JobPosting.cloned_from_id)
+        .where(JobPosting.season == target_season, JobPosting.cloned_from_id.in_(ids))
+    ).scalars())
+    companies = set(db.session.execute(
+        db.select(CompanyProfile.id)
+        .where(CompanyProfile.id.in_({posting['company_id'] for posting in postings}))
+    ).scalars())
+
+    reasons = {}
+    for posting in postings:
+        if posting['id'] in cloned:
+            reasons[posting['id']] = f'Already cloned into {target_season}'
+        elif posting['company_id'] not in companies:
+            reasons[posting['id']] = 'Company is no longer registered'
+    return reasons
+
+
+def _shift(moment, offset):
+    return moment + offset if moment is not None else None
+
+
+def _cloned_posting(posting, offset, overrides):
+    values = {field: posting[field] for field in POSTING_FIELDS}
+    values['application_deadline'] = _shift(posting['application_deadline'], offset)
+    values.update(overrides)
+    return values
+
+
+def _cloned_round(round_, offset):
+    values = {field: round_[field] for field in ROUND_FIELDS}
+    values['round_date'] = _shift(round_['round_date'], offset)
+    return values
+
+
+def _clean_overrides(overrides):
+    return {field: value for field, value in (overrides or {}).items()
+            if field in OVERRIDABLE_FIELDS and value is not None}
+
+
+def plan_clone(source_season, target_season, job_ids, offset=None, overrides=None):
+    """
+    Work out what cloning would create, without writing anything.
+
+    Args:
+        source_season: Season to copy from, e.g. '2024-25'
+        target_season: Season to copy into
+        job_ids: Ids of the source postings
+        offset: timedelta added to deadlines and round dates; defaults to
+            default_offset(source_season, target_season)
+        overrides: Values for OVERRIDABLE_FIELDS applied to every posting;
+            None values are ignored
+
+    Returns:
+        list: A ClonePlan per source posting
+    """
+    if offset is None:
+        offset = default_offset(source_season, target_season)
+    overrides = _clean_overrides(overrides)
+    postings, rounds = _load_sources(source_season, job_ids)
+    skip_reasons = _skip_reasons(postings, target_season) if postings else {}
+    now = datetime.utcnow()
+
+    plans = []
+    for posting in postings:
+        cloned = _cloned_posting(posting, offset, overrides)
+        changes = [(field, posting[field], cloned[field])
+                   for field in ('application_deadline',) + OVERRIDABLE_FIELDS
+                   if posting[field] != cloned[field]]
+
+        warnings = []
+        deadline = cloned['application_deadline']
+        if deadline < now:
+            warnings.append('The new deadline has already passed')
+        if season_for(deadline) != target_season:
+            warnings.append(f'The new deadline falls outside {target_season}')
+
+        plans.append(ClonePlan(
+            source_id=posting['id'],
+            company_name=posting['company_name'],
+            title=posting['title'],
+            changes=changes,
+            rounds=[(r['round_number'], r['round_name'], r['round_date'], _shift(r['round_date'], offset))
+                    for r in rounds.get(posting['id'], [])],
+            warnings=warnings,
+            skip_reason=skip_reasons.get(posting['id'])
+        ))
+    return plans
+
+
+def clone_postings(source_season, target_season, job_ids, offset=None, overrides=None):
+    """
+    Clone postings and their interview rounds into another season. Postings
+    already cloned into the target season, or whose company is gone, are
+    skipped. Commits.
+
+    Args:
+        source_season: Season to copy from, e.g. '2024-25'
+        target_season: Season to copy into
+        job_ids: Ids of the source postings
+        offset: timedelta added to deadlines and round dates; defaults to
+            default_offset(source_season, target_season)
+        overrides: Values for OVERRIDABLE_FIELDS applied to every posting
+
+    Returns:
+        tuple: (postings created, rounds created)
+
+    Raises:
+        IntegrityError: If another request cloned one of the postings into
+        the target season at the same time
+    """
+    if offset is None:
+        offset = default_offset(source_season, target_season)
+    overrides = _clean_overrides(overrides)
+    postings, rounds = _load_sources(source_season, job_ids)
+    skip_reasons = _skip_reasons(postings, target_season) if postings else {}
+    postings = [posting for posting in postings if posting['id'] not in skip_reasons]
+    if not postings:
+        return 0, 0
+
+    # One executemany per table rather than a flushed object per row
+    db.session.execute(db.insert(JobPosting), [
+        {**_cloned_posting(posting, offset, overrides), 'season': target_season, 'cloned_from_id': posting['id']}
+        for posting in postings
+    ])
+    new_ids = dict(db.session.execute(
+        db.select(JobPosting.cloned_from_id, JobPosting.id)
+        .where(JobPosting.season == target_season,
+               JobPosting.cloned_from_id.in_([posting['id'] for posting in postings]))
+    ).all())
+
+    round_rows = [
+        {**_cloned_round(round_, offset), 'job_id': new_ids[posting['id']]}
+        for posting in postings
+        for round_ in rounds.get(posting['id'], [])
+    ]
+    if round_rows:
+        db.session.execute(db.insert(InterviewRound), round_rows)
+
+    # Bulk inserts skip the flush hooks, so hand the recommendations index
+    # the new postings itself
+    pending_relevance_changes(db.session).extend(
+        ('update_job', new_ids[posting['id']], posting['title'], posting['description'])
+        for posting in postings
+    )
+    db.session.commit()
+    stick_to_primary()
+    return len(postings), len(round_rows)
@@ -1,29 +1,66 @@
-from flask import render_template, redirect, url_for, flash, request, jsonify, session
+from flask import render_template, redirect, url_for, flash, request, jsonify, session, Response, send_file
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash
+from sqlalchemy.exc import IntegrityError
 from app import app, db
 from models import (
     User, StudentProfile, CompanyProfile, JobPosting, Application, 
-    InterviewRound, InterviewFeedback, MockInterview,
-    ROLE_STUDENT, ROLE_CDC, ROLE_COMPANY
+    InterviewRound, InterviewFeedback, MockInterview, ReportJob,
+    ROLE_STUDENT, ROLE_CDC, ROLE_COMPANY, REPORT_DONE, can_transition
 )
 from forms import (
     LoginForm, StudentRegistrationForm, CompanyRegistrationForm, 
     JobPostingForm, EditJobPostingForm, InterviewRoundForm, 
     InterviewFeedbackForm, MockInterviewForm, MockFeedbackForm,
-    ApplicationStatusForm, StudentProfileForm, ChatbotForm
+    ApplicationStatusForm, StudentProfileForm, ChatbotForm, ShortlistForm,
+    AutoAssignSlotsForm, BulkMockInterviewForm, ReportForm, RolloverForm
+)
+from utils import (
+    check_eligibility, format_branches, format_status, current_season, season_for, season_start, live_season_filter
 )
-from utils import check_eligibility, format_branches
 from chatbot import get_chatbot_response
-from datetime import datetime
+from replica import replica_read
+from sqlite_mode import write_queue
+from idempotency import idempotent
+from admission import apply_gate
+from applied_jobs import applied_jobs
+from policy import placement_policy
+from skills import skill_extractor, parse_skills, students_with_skills
+from ranking import shortlist_top_candidates
+from scheduling import (
+    ScheduleIndex, ACTIVE_STATUSES, save_assignments, mock_cohort, assign_mock_interviews,
+    save_mock_interviews, parse_interviewer_availability
+)
+from recommendations import relevance_index
+from reports import report_runner, report_metrics, REPORT_FORMATS
+from archive import live_seasons, archived_seasons
+from rollover import season_postings, plan_clone, clone_postings, default_offset
+from live_updates import live_updates, student_channel
+import funnel  # noqa: F401  # registers the status event log hook
+from http_cache import (
+    conditional_view, eligible_companies_version, cdc_companies_version,
+    student_feedback_version
+)
+from datetime import datetime, timedelta
+import json
 import logging
+import os
+import queue
 
 # Template context processor for utility functions
 @app.context_processor
 def utility_processor():
     def now():
         return datetime.utcnow()
-    return dict(now=now)
+    return dict(now=now, format_branches=format_branches, format_status=format_status)
+
+def _schedule_index_for(moment, exclude_round_id=None):
+    return ScheduleIndex.for_day(
+        moment,
+        exclude_round_id=exclude_round_id,
+        round_minutes=app.config['INTERVIEW_ROUND_MINUTES'],
+        mock_minutes=app.config['MOCK_INTERVIEW_MINUTES']
+    )
 
 # Home route
 @app.route('/')
@@ -119,6 +156,7 @@ def register_company():
 # Dashboard route
 @app.route('/dashboard')
 @login_required
+@replica_read
 def dashboard():
     if current_user.is_student():
         # For student dashboard
@@ -126,8 +164,9 @@ def dashboard():
             JobPosting.application_deadline >= datetime.utcnow()
         ).count()
         
-        applied_jobs = Application.query.filter_by(
-            student_id=current_user.student_profile.id
+        applied_jobs = Application.query.join(JobPosting).filter(
+            Application.student_id == current_user.student_profile.id,
+            live_season_filter(JobPosting.season)
         ).count()
         
         mock_interviews = MockInterview.query.filter_by(
@@ -147,7 +186,9 @@ def dashboard():
         active_jobs_count = JobPosting.query.filter(
             JobPosting.application_deadline >= datetime.utcnow()
         ).count()
-        applications_count = Application.query.count()
+        applications_count = Application.query.join(JobPosting).filter(
+            live_season_filter(JobPosting.season)
+        ).count()
         students_count = StudentProfile.query.count()
         
         return render_template(
@@ -162,7 +203,7 @@ def dashboard():
         # For company dashboard
         company_id = current_user.company_profile.id
         
-        jobs = JobPosting.query.filter_by(company_id=company_id).all()
+        jobs = JobPosting.query.filter(JobPosting.company_id == company_id, live_season_filter(JobPosting.season)).all()
         jobs_count = len(jobs)
         
         applications_count = sum(len(job.applications) for job in jobs)
@@ -182,6 +223,8 @@ def dashboard():
 # Student module routes
 @app.route('/student/eligible-companies')
 @login_required
+@replica_read
+@conditional_view(eligible_companies_version)
 def student_eligible_companies():
     if not current_user.is_student():
         flash('Access denied. Student privileges required.', 'danger')
@@ -192,61 +235,112 @@ def student_eligible_companies():
         JobPosting.application_deadline >= datetime.utcnow()
     ).all()
     
+    # Only the "applied" badge depends on the viewer; job cards are fragment-cached
+    applied_job_ids = {
+        job_id for (job_id,) in db.session.query(Application.job_id).filter_by(student_id=student.id)
+    }
+    
     eligible_jobs = []
     for job in active_jobs:
         if check_eligibility(student, job):
-            # Check if already applied
-            application = Application.query.filter_by(
-                student_id=student.id,
-                job_id=job.id
-            ).first()
-            
+            # Placement rules use the student's cached offers, not a query per job
+            decision = placement_policy.evaluate(student.id, job)
             eligible_jobs.append({
                 'job': job,
-                'applied': application is not None
+                'applied': job.id in applied_job_ids,
+                'can_apply': decision.allowed,
+                'policy_reason': decision.reason
             })
     
+    # Most relevant to the student's resume first
+    relevance = relevance_index.score_jobs_for_student(student.id, [item['job'].id for item in eligible_jobs])
+    for item in eligible_jobs:
+        item['relevance'] = relevance.get(item['job'].id, 0.0)
+    eligible_jobs.sort(key=lambda item: item['relevance'], reverse=True)
+    
     return render_template('student/eligible_companies.html', eligible_jobs=eligible_jobs)
 
+# Short write transactions, run through the SQLite write queue when enabled
+def _create_application(student_id, job_id):
+    """
+    Create an application unless the student has already applied.
+    
+    Returns:
+        bool: True if an application was created
+    """
+    if Application.query.filter_by(student_id=student_id, job_id=job_id).first():
+        return False
+    
+    db.session.add(Application(student_id=student_id, job_id=job_id))
+    return True
+
+def _set_application_status(application_id, status):
+    application = db.session.get(Application, application_id)
+    application.status = status
+    application.updated_date = datetime.utcnow()
+
+def _save_feedback(application_id, round_id, text, rating, interviewer_name):
+    # Check if feedback already exists
+    feedback = InterviewFeedback.query.filter_by(
+        application_id=application_id,
+        round_id=round_id
+    ).first()
+    
+    if feedback is None:
+        feedback = InterviewFeedback(application_id=application_id, round_id=round_id)
+        db.session.add(feedback)
+    
+    feedback.feedback = text
+    feedback.rating = rating
+    feedback.interviewer_name = interviewer_name
+
 @app.route('/student/apply/<int:job_id>', methods=['POST'])
 @login_required
+@idempotent
 def student_apply(job_id):
     if not current_user.is_student():
         flash('Access denied. Student privileges required.', 'danger')
         return redirect(url_for('dashboard'))
     
-    job = JobPosting.query.get_or_404(job_id)
     student = current_user.student_profile
     
-    # Check if already applied
-    existing_application = Application.query.filter_by(
-        student_id=student.id,
-        job_id=job.id
-    ).first()
-    
-    if existing_application:
+    # Check if already applied (cached per worker, before taking a slot)
+    if applied_jobs.has_applied(student.id, job_id):
         flash('You have already applied for this job.', 'info')
         return redirect(url_for('student_eligible_companies'))
     
-    # Check eligibility
-    if not check_eligibility(student, job):
-        flash('You do not meet the eligibility criteria for this job.', 'danger')
+    # Queue for one of the worker's apply slots, or get a 503 to retry later
+    with apply_gate.admit():
+        job = JobPosting.query.get_or_404(job_id)
+        
+        # Check eligibility
+        if not check_eligibility(student, job):
+            flash('You do not meet the eligibility criteria for this job.', 'danger')
+            return redirect(url_for('student_eligible_companies'))
+        
+        # Placement rules, against the student's offers as of now
+        decision = placement_policy.evaluate(student.id, job, fresh=True)
+        if not decision.allowed:
+            flash(decision.reason, 'warning')
+            return redirect(url_for('student_eligible_companies'))
+        
+        # Create application
+        try:
+            created = write_queue.run(_create_application, student.id, job.id)
+        except IntegrityError:
+            # A concurrent submission won the unique constraint
+            created = False
+    
+    if not created:
+        flash('You have already applied for this job.', 'info')
         return redirect(url_for('student_eligible_companies'))
     
-    # Create application
-    application = Application(
-        student_id=student.id,
-        job_id=job.id
-    )
-    
-    db.session.add(application)
-    db.session.commit()
-    
     flash(f'Successfully applied for {job.title} at {job.company.company_name}.', 'success')
     return redirect(url_for('student_applications'))
 
 @app.route('/student/withdraw/<int:application_id>', methods=['POST'])
 @login_required
+@idempotent
 def student_withdraw(application_id):
     if not current_user.is_student():
         flash('Access denied. Student privileges required.', 'danger')
@@ -272,18 +366,55 @@ def student_withdraw(application_id):
 
 @app.route('/student/applications')
 @login_required
+@replica_read
 def student_applications():
     if not current_user.is_student():
         flash('Access denied. Student privileges required.', 'danger')
         return redirect(url_for('dashboard'))
     
     student = current_user.student_profile
-    applications = Application.query.filter_by(student_id=student.id).all()
+    applications = Application.query.join(JobPosting).filter(
+        Application.student_id == student.id,
+        live_season_filter(JobPosting.season)
+    ).all()
     
     return render_template('student/applications.html', applications=applications)
 
+@app.route('/student/events')
+@login_required
+def student_events():
+    if not current_user.is_student():
+        flash('Access denied. Student privileges required.', 'danger')
+        return redirect(url_for('dashboard'))
+    
+    # Resolve the channel now; the stream runs after the request's DB session is closed
+    channel = student_channel(current_user.student_profile.id)
+    keepalive = app.config['LIVE_UPDATES_KEEPALIVE_SECONDS']
+    
+    def stream():
+        subscriber = live_updates.subscribe(channel)
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ': keepalive\n\n'
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            live_updates.unsubscribe(channel, subscriber)
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/student/feedback')
 @login_required
+@replica_read
+@conditional_view(student_feedback_version)
 def student_feedback():
     if not current_user.is_student():
         flash('Access denied. Student privileges required.', 'danger')
@@ -291,11 +422,15 @@ def student_feedback():
     
     student = current_user.student_profile
     
-    # Get mock interview feedback
-    mock_interviews = MockInterview.query.filter_by(student_id=student.id).all()
+    # Get mock interview feedback (feedback text is deferred by default)
+    mock_interviews = MockInterview.query.filter_by(student_id=student.id).options(
+        db.undefer(MockInterview.feedback)
+    ).all()
     
     # Get company interview feedback
-    applications = Application.query.filter_by(student_id=student.id).all()
+    applications = Application.query.filter_by(student_id=student.id).options(
+        db.selectinload(Application.interview_feedbacks).undefer(InterviewFeedback.feedback)
+    ).all()
     interview_feedbacks = []
     
     for application in applications:
@@ -341,6 +476,8 @@ def student_profile():
 # CDC Module Routes
 @app.route('/cdc/companies')
 @login_required
+@replica_read
+@conditional_view(cdc_companies_version)
 def cdc_companies():
     if not current_user.is_cdc():
         flash('Access denied. CDC privileges required.', 'danger')
@@ -375,7 +512,8 @@ def cdc_add_company():
             eligible_branches=branches,
             application_deadline=form.application_deadline.data,
             num_rounds=form.num_rounds.data,
-            package_offered=form.package_offered.data
+            package_offered=form.package_offered.data,
+            season=season_for(form.application_deadline.data)
         )
         
         db.session.add(job)
@@ -393,7 +531,7 @@ def cdc_edit_company(job_id):
         flash('Access denied. CDC privileges required.', 'danger')
         return redirect(url_for('dashboard'))
     
-    job = JobPosting.query.get_or_404(job_id)
+    job = JobPosting.query.options(db.undefer(JobPosting.description)).get_or_404(job_id)
     form = EditJobPostingForm(obj=job)
     
     # Pre-populate branches
@@ -406,6 +544,7 @@ def cdc_edit_company(job_id):
         job.cgpa_criteria = form.cgpa_criteria.data
         job.eligible_branches = ','.join(form.eligible_branches.data)
         job.application_deadline = form.application_deadline.data
+        job.season = season_for(form.application_deadline.data)
         job.num_rounds = form.num_rounds.data
         job.package_offered = form.package_offered.data
         
@@ -417,12 +556,15 @@ def cdc_edit_company(job_id):
 
 @app.route('/cdc/student-applications')
 @login_required
+@replica_read
 def cdc_student_applications():
     if not current_user.is_cdc():
         flash('Access denied. CDC privileges required.', 'danger')
         return redirect(url_for('dashboard'))
     
-    applications = Application.query.all()
+    applications = Application.query.join(JobPosting).filter(
+        live_season_filter(JobPosting.season)
+    ).all()
     return render_template('cdc/student_applications.html', applications=applications)
 
 @app.route('/cdc/schedule-mock', methods=['GET', 'POST'])
@@ -439,6 +581,21 @@ def cdc_schedule_mock():
     form.student.choices = [(student.id, f"{student.full_name} ({student.roll_number})") for student in students]
     
     if form.validate_on_submit():
+        # Reject slots that overlap the student's or the interviewer's other commitments
+        start = form.scheduled_date.data
+        end = start + timedelta(minutes=app.config['MOCK_INTERVIEW_MINUTES'])
+        schedule = _schedule_index_for(start)
+        conflicts = (
+            schedule.student_conflicts([form.student.data], start, end) +
+            schedule.interviewer_conflicts(form.interviewer.data, start, end)
+        )
+        if conflicts:
+            details = '; '.join(
+                f"{conflict.commitment.label} at {conflict.commitment.start:%H:%M}" for conflict in conflicts
+            )
+            flash(f'This slot conflicts with existing commitments: {details}', 'danger')
+            return render_template('cdc/schedule_mock.html', form=form)
+        
         mock = MockInterview(
             student_id=form.student.data,
             scheduled_by=current_user.id,
@@ -455,6 +612,148 @@ def cdc_schedule_mock():
     
     return render_template('cdc/schedule_mock.html', form=form)
 
+@app.route('/cdc/bulk-schedule-mock', methods=['GET', 'POST'])
+@login_required
+def cdc_bulk_schedule_mock():
+    if not current_user.is_cdc():
+        flash('Access denied. CDC privileges required.', 'danger')
+        return redirect(url_for('dashboard'))
+    
+    form = BulkMockInterviewForm()
+    
+    if form.validate_on_submit():
+        students = mock_cohort(
+            branches=form.branches.data or None,
+            min_cgpa=form.min_cgpa.data,
+            max_cgpa=form.max_cgpa.data,
+            not_yet_mocked=form.not_yet_mocked.data
+        )
+        assignments, unassigned = assign_mock_interviews(
+            students,
+            parse_interviewer_availability(form.interviewers.data),
+            form.slot_minutes.data,
+            mock_minutes=app.config['MOCK_INTERVIEW_MINUTES']
+        )
+        
+        # Dry run: show the plan without saving it
+        if form.preview.data:
+            return render_template(
+                'cdc/bulk_schedule_mock.html',
+                form=form,
+                assignments=assignments,
+                unassigned=unassigned
+            )
+        
+        save_mock_interviews(assignments, form.topic.data, current_user.id)
+        db.session.commit()
+        
+        flash(f'Scheduled {len(assignments)} mock interviews.', 'success')
+        if unassigned:
+            flash(f'{len(unassigned)} students could not be fitted into the interviewers\' slots.', 'warning')
+        return redirect(url_for('dashboard'))
+    
+    return render_template('cdc/bulk_schedule_mock.html', form=form)
+
+@app.route('/cdc/reports', methods=['GET', 'POST'])
+@login_required
+def cdc_reports():
+    if not current_user.is_cdc():
+        flash('Access denied. CDC privileges required.', 'danger')
+        return redirect(url_for('dashboard'))
+    
+    form = ReportForm()
+    season = current_season()
+    # Archived seasons are rendered from the archive
+    seasons = sorted(set(live_seasons()) | set(archived_seasons()), reverse=True)
+    form.season.choices = [(name, name) for name in seasons] or [(season, season)]
+    
+    if form.validate_on_submit():
+        # Rendered in a report worker process; the page polls
+        # /api/v1/reports/<id> until the job is done
+        try:
+            job = report_runner.submit(form.kind.data, form.format.data, form.season.data, current_user.id)
+        except ValueError as e:
+            flash(str(e), 'warning')
+        else:
+            flash(f'Report #{job.id} is being generated. It will be available below when ready.', 'info')
+        return redirect(url_for('cdc_reports'))
+    
+    if request.method == 'GET':
+        form.season.data = season
+    
+    jobs = ReportJob.query.order_by(ReportJob.id.desc()).limit(50).all()
+    return render_template('cdc/reports.html', form=form, jobs=jobs, metrics=report_metrics())
+
+@app.route('/cdc/reports/<int:job_id>/download')
+@login_required
+def cdc_download_report(job_id):
+    if not current_user.is_cdc():
+        flash('Access denied. CDC privileges required.', 'danger')
+        return redirect(url_for('dashboard'))
+    
+    job = ReportJob.query.get_or_404(job_id)
+    if job.status != REPORT_DONE or not os.path.exists(job.file_path):
+        flash('This report is not available for download.', 'warning')
+        return redirect(url_for('cdc_reports'))
+    
+    extension, mimetype = REPORT_FORMATS[job.format]
+    # HTML opens in the browser (to read or print); CSV downloads
+    return send_file(
+        job.file_path,
+        mimetype=mimetype,
+        as_attachment=job.format == 'csv',
+        download_name=f'{job.kind}-report-{job.season}.{extension}'
+    )
+
+@app.route('/cdc/rollover', methods=['GET', 'POST'])
+@login_required
+def cdc_rollover():
+    if not current_user.is_cdc():
+        flash('Access denied. CDC privileges required.', 'danger')
+        return redirect(url_for('dashboard'))
+    
+    form = RolloverForm()
+    seasons = sorted(set(live_seasons()) | set(archived_seasons()), reverse=True)
+    form.source_season.choices = [(name, name) for name in seasons]
+    # The posting list depends on the source season, so it is read before validation
+    source_season = form.source_season.data if request.method == 'POST' else request.args.get('season')
+    if source_season not in seasons:
+        source_season = seasons[0] if seasons else current_season()
+    form.source_season.data = source_season
+    form.job_ids.choices = [
+        (job_id, f'{company_name} - {title}') for job_id, company_name, title in season_postings(source_season)
+    ]
+    
+    if request.method == 'GET':
+        form.target_season.data = season_for(season_start(current_season()) + timedelta(days=366))
+        form.job_ids.data = [job_id for job_id, _ in form.job_ids.choices]
+    
+    plans = None
+    if form.validate_on_submit():
+        offset = (timedelta(days=form.offset_days.data) if form.offset_days.data is not None
+                  else default_offset(source_season, form.target_season.data))
+        overrides = {
+            'cgpa_criteria': form.cgpa_criteria.data,
+            'eligible_branches': ','.join(form.eligible_branches.data) or None,
+            'package_offered': form.package_offered.data or None,
+        }
+        if form.submit.data:
+            try:
+                postings, rounds = clone_postings(
+                    source_season, form.target_season.data, form.job_ids.data, offset, overrides
+                )
+            except IntegrityError:
+                db.session.rollback()
+                flash('Some of these postings were cloned by someone else at the same time. Please preview again.', 'warning')
+            else:
+                flash(f'Cloned {postings} job postings and {rounds} interview rounds into '
+                      f'{form.target_season.data}.', 'success')
+                return redirect(url_for('cdc_companies'))
+        plans = plan_clone(source_season, form.target_season.data, form.job_ids.data, offset, overrides)
+        form.offset_days.data = offset.days
+    
+    return render_template('cdc/rollover.html', form=form, plans=plans)
+
 @app.route('/cdc/provide-mock-feedback/<int:mock_id>', methods=['GET', 'POST'])
 @login_required
 def cdc_provide_mock_feedback(mock_id):
@@ -483,19 +782,26 @@ def cdc_provide_mock_feedback(mock_id):
 # Company module routes
 @app.route('/company/students')
 @login_required
+@replica_read
 def company_students():
     if not current_user.is_company():
         flash('Access denied. Company privileges required.', 'danger')
         return redirect(url_for('dashboard'))
     
     company_id = current_user.company_profile.id
-    jobs = JobPosting.query.filter_by(company_id=company_id).all()
+    jobs = JobPosting.query.filter(JobPosting.company_id == company_id, live_season_filter(JobPosting.season)).all()
+    # ?skill=python,react keeps applicants with all of the skills
+    skills = parse_skills(request.args.get('skill'))
     
     applications_by_job = {}
     for job in jobs:
-        applications_by_job[job.id] = Application.query.filter_by(job_id=job.id).all()
+        query = Application.query.filter_by(job_id=job.id)
+        if skills:
+            query = query.filter(Application.student_id.in_(students_with_skills(skills)))
+        applications_by_job[job.id] = query.all()
     
-    return render_template('company/students.html', jobs=jobs, applications_by_job=applications_by_job)
+    return render_template('company/students.html', jobs=jobs, applications_by_job=applications_by_job,
+                           skills=skills, all_skills=skill_extractor.skills)
 
 @app.route('/company/schedule-interview/<int:job_id>', methods=['GET', 'POST'])
 @login_required
@@ -526,14 +832,60 @@ def company_schedule_interview(job_id):
             round_date=form.round_date.data
         )
         
+        # Warn about applicants who already have something else at this time
+        start = form.round_date.data
+        end = start + timedelta(minutes=app.config['INTERVIEW_ROUND_MINUTES'])
+        student_ids = [
+            student_id for (student_id,) in db.session.query(Application.student_id).filter(
+                Application.job_id == job.id, Application.status.in_(ACTIVE_STATUSES)
+            )
+        ]
+        conflicts = _schedule_index_for(start).student_conflicts(student_ids, start, end)
+        
         db.session.add(round)
         db.session.commit()
         
         flash(f'Interview round {next_round} scheduled successfully!', 'success')
+        if conflicts:
+            conflicted_students = len({conflict.key for conflict in conflicts})
+            flash(f'{conflicted_students} candidate(s) have another interview at this time. '
+                  f'Use slot assignment to spread them out.', 'warning')
         return redirect(url_for('company_students'))
     
     return render_template('company/schedule_interview.html', form=form, job=job)
 
+@app.route('/company/assign-slots/<int:round_id>', methods=['POST'])
+@login_required
+def company_assign_slots(round_id):
+    if not current_user.is_company():
+        flash('Access denied. Company privileges required.', 'danger')
+        return redirect(url_for('dashboard'))
+    
+    round = InterviewRound.query.get_or_404(round_id)
+    
+    # Check if round belongs to this company
+    if round.job_posting.company_id != current_user.company_profile.id:
+        flash('You do not have permission to assign slots for this round.', 'danger')
+        return redirect(url_for('dashboard'))
+    
+    form = AutoAssignSlotsForm()
+    
+    if not form.validate_on_submit() or not round.round_date:
+        flash('Please provide a slot length and at least one interviewer for a dated round.', 'danger')
+        return redirect(url_for('company_students'))
+    
+    interviewers = [name.strip() for name in form.interviewers.data.split(',') if name.strip()]
+    schedule = _schedule_index_for(round.round_date, exclude_round_id=round.id)
+    assignments, unassigned = schedule.auto_assign(round, form.slot_minutes.data, interviewers)
+    
+    save_assignments(round, assignments)
+    db.session.commit()
+    
+    flash(f'Assigned {len(assignments)} candidates to interview slots.', 'success')
+    if unassigned:
+        flash(f'{len(unassigned)} candidates could not be fitted into a conflict-free slot today.', 'warning')
+    return redirect(url_for('company_students'))
+
 @app.route('/company/update-status/<int:application_id>', methods=['GET', 'POST'])
 @login_required
 def company_update_status(application_id):
@@ -552,10 +904,15 @@ def company_update_status(application_id):
     form = ApplicationStatusForm(obj=application)
     
     if form.validate_on_submit():
-        application.status = form.status.data
-        application.updated_date = datetime.utcnow()
+        if not can_transition(application.status, form.status.data):
+            flash(f'Cannot change status from {application.status} to {form.status.data}.', 'danger')
+            return redirect(url_for('company_update_status', application_id=application.id))
         
-        db.session.commit()
+        try:
+            write_queue.run(_set_application_status, application.id, form.status.data)
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('company_update_status', application_id=application.id))
         flash('Application status updated successfully!', 'success')
         return redirect(url_for('company_students'))
     
@@ -567,6 +924,31 @@ def company_update_status(application_id):
         job=job
     )
 
+@app.route('/company/shortlist/<int:job_id>', methods=['POST'])
+@login_required
+def company_shortlist(job_id):
+    if not current_user.is_company():
+        flash('Access denied. Company privileges required.', 'danger')
+        return redirect(url_for('dashboard'))
+    
+    job = JobPosting.query.get_or_404(job_id)
+    
+    # Check if job belongs to this company
+    if job.company_id != current_user.company_profile.id:
+        flash('You do not have permission to shortlist candidates for this job.', 'danger')
+        return redirect(url_for('dashboard'))
+    
+    form = ShortlistForm()
+    
+    if form.validate_on_submit():
+        shortlisted = shortlist_top_candidates(job, form.count.data)
+        db.session.commit()
+        flash(f'Shortlisted {len(shortlisted)} top-ranked candidates for {job.title}.', 'success')
+    else:
+        flash('Please enter how many candidates to shortlist.', 'danger')
+    
+    return redirect(url_for('company_students'))
+
 @app.route('/company/provide-feedback/<int:application_id>/<int:round_id>', methods=['GET', 'POST'])
 @login_required
 def company_provide_feedback(application_id, round_id):
@@ -590,29 +972,10 @@ def company_provide_feedback(application_id, round_id):
     form = InterviewFeedbackForm()
     
     if form.validate_on_submit():
-        # Check if feedback already exists
-        existing_feedback = InterviewFeedback.query.filter_by(
-            application_id=application_id,
-            round_id=round_id
-        ).first()
-        
-        if existing_feedback:
-            # Update existing feedback
-            existing_feedback.feedback = form.feedback.data
-            existing_feedback.rating = form.rating.data
-            existing_feedback.interviewer_name = form.interviewer_name.data
-        else:
-            # Create new feedback
-            feedback = InterviewFeedback(
-                application_id=application_id,
-                round_id=round_id,
-                feedback=form.feedback.data,
-                rating=form.rating.data,
-                interviewer_name=form.interviewer_name.data
-            )
-            db.session.add(feedback)
-        
-        db.session.commit()
+        write_queue.run(
+            _save_feedback, application_id, round_id,
+            form.feedback.data, form.rating.data, form.interviewer_name.data
+        )
         flash('Interview feedback provided successfully!', 'success')
         return redirect(url_for('company_students'))
     
@@ -0,0 +1,412 @@
+# Interview slot conflict detection and automatic slot assignment
+
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+
+from app import db
+from models import (
+    Application, InterviewRound, InterviewSlot, MockInterview, JobPosting,
+    CompanyProfile, StudentProfile, STATUS_APPLIED, STATUS_SHORTLISTED, STATUS_INTERVIEW_SCHEDULED
+)
+from utils import current_season, season_start
+
+# Assumed length of a round with no per-candidate slots, and of a mock interview
+DEFAULT_ROUND_MINUTES = 60
+DEFAULT_MOCK_MINUTES = 45
+
+# Applications whose holders are expected at the job's interview rounds
+ACTIVE_STATUSES = (STATUS_APPLIED, STATUS_SHORTLISTED, STATUS_INTERVIEW_SCHEDULED)
+
+Commitment = namedtuple('Commitment', ['start', 'end', 'kind', 'label'])
+Conflict = namedtuple('Conflict', ['key', 'commitment'])
+SlotAssignment = namedtuple('SlotAssignment', ['application_id', 'student_id', 'interviewer', 'start', 'end'])
+InterviewerAvailability = namedtuple('InterviewerAvailability', ['name', 'capacity', 'windows'])
+MockAssignment = namedtuple('MockAssignment', ['student_id', 'full_name', 'roll_number', 'interviewer', 'start', 'end'])
+
+AVAILABILITY_TIME_FORMAT = '%Y-%m-%d %H:%M'
+
+
+class IntervalIndex:
+    """
+    Per-key sorted interval lists with a running maximum of end times.
+
+    Intervals are kept sorted by start. For a query [start, end), only
+    intervals starting before `end` can overlap; a bisect finds them and the
+    prefix maximum of end times says in O(log n) whether any of them reaches
+    past `start`, so the scan stops as soon as no earlier interval can overlap.
+    """
+
+    def __init__(self):
+        self._intervals = defaultdict(list)
+        self._max_end = defaultdict(list)
+
+    def add(self, key, commitment):
+        intervals = self._intervals[key]
+        position = bisect_left(intervals, commitment)
+        intervals.insert(position, commitment)
+
+        # Recompute the running maximum from the insertion point on
+        max_end = self._max_end[key]
+        del max_end[position:]
+        running = max_end[-1] if max_end else None
+        for interval in intervals[position:]:
+            running = interval.end if running is None or interval.end > running else running
+            max_end.append(running)
+
+    def has_conflict(self, key, start, end):
+        intervals = self._intervals.get(key)
+        if not intervals:
+            return False
+        upper = bisect_left(intervals, (end,))
+        return upper > 0 and self._max_end[key][upper - 1] > start
+
+    def conflicts(self, key, start, end):
+        """
+        Return every commitment for `key` overlapping [start, end).
+        """
+        intervals = self._intervals.get(key)
+        if not intervals:
+            return []
+
+        max_end = self._max_end[key]
+        found = []
+        position = bisect_left(intervals, (end,)) - 1
+        while position >= 0 and max_end[position] > start:
+            if intervals[position].end > start:
+                found.append(intervals[position])
+            position -= 1
+        found.reverse()
+        return found
+
+
+class ScheduleIndex:
+    """
+    Student and interviewer commitments within a time window, loaded with
+    one query per source (interview slots, whole rounds, mock interviews).
+
+    Keys are ('student', student_profile_id) and ('interviewer', name).
+    """
+
+    def __init__(self, window_start, window_end, round_minutes=DEFAULT_ROUND_MINUTES,
+                 mock_minutes=DEFAULT_MOCK_MINUTES):
+        self.window_start = window_start
+        self.window_end = window_end
+        self.round_length = timedelta(minutes=round_minutes)
+        self.mock_length = timedelta(minutes=mock_minutes)
+        self.index = IntervalIndex()
+
+    @classmethod
+    def for_day(cls, moment, exclude_round_id=None, **kwargs):
+        """Build the index covering the calendar day of `moment`."""
+        day_start = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+        return cls(day_start, day_start + timedelta(days=1), **kwargs).load(exclude_round_id)
+
+    def load(self, exclude_round_id=None):
+        lookback = max(self.round_length, self.mock_length)
+
+        # Per-candidate slots already assigned
+        slots = db.session.execute(
+            db.select(InterviewSlot.round_id, InterviewSlot.interviewer, InterviewSlot.start_time,
+                      InterviewSlot.end_time, Application.student_id, JobPosting.title,
+                      CompanyProfile.company_name)
+            .join(Application, InterviewSlot.application_id == Application.id)
+            .join(JobPosting, Application.job_id == JobPosting.id)
+            .join(CompanyProfile)
+            .where(InterviewSlot.start_time < self.window_end,
+                   InterviewSlot.end_time > self.window_start)
+        ).all()
+        slotted_rounds = set()
+        for round_id, interviewer, start, end, student_id, title, company in slots:
+            slotted_rounds.add(round_id)
+            if round_id == exclude_round_id:
+                continue
+            commitment = Commitment(start, end, 'interview', f'{company} - {title}')
+            self.index.add(('student', student_id), commitment)
+            if interviewer:
+                self.index.add(('interviewer', interviewer), commitment)
+
+        # Rounds without slots block every active applicant for the round length
+        rounds = db.session.execute(
+            db.select(InterviewRound.id, InterviewRound.round_date, InterviewRound.round_name,
+                      Application.student_id, JobPosting.title, CompanyProfile.company_name)
+            .join(JobPosting, InterviewRound.job_id == JobPosting.id)
+            .join(CompanyProfile)
+            .join(Application, Application.job_id == JobPosting.id)
+            .where(InterviewRound.round_date < self.window_end,
+                   InterviewRound.round_date > self.window_start - lookback,
+                   Application.status.in_(ACTIVE_STATUSES))
+        ).all()
+        for round_id, round_date, round_name, student_id, title, company in rounds:
+            if round_id in slotted_rounds or round_id == exclude_round_id:
+                continue
+            commitment = Commitment(round_date, round_date + self.round_length, 'interview',
+                                    f'{company} - {title} ({round_name})')
+            self.index.add(('student', student_id), commitment)
+
+        mocks = db.session.execute(
+            db.select(MockInterview.student_id, MockInterview.interviewer,
+                      MockInterview.scheduled_date, MockInterview.topic)
+            .where(MockInterview.scheduled_date < self.window_end,
+                   MockInterview.scheduled_date > self.window_start - lookback,
+                   MockInterview.status == 'scheduled')
+        ).all()
+        for student_id, interviewer, scheduled_date, topic in mocks:
+            commitment = Commitment(scheduled_date, scheduled_date + self.mock_length, 'mock',
+                                    f'Mock interview: {topic}')
+            self.index.add(('student', student_id), commitment)
+            self.index.add(('interviewer', interviewer), commitment)
+
+        return self
+
+    def student_conflicts(self, student_ids, start, end):
+        """
+        Return conflicts for each student with a commitment overlapping the slot.
+
+        Args:
+            student_ids: StudentProfile ids attending the proposed slot
+            start: Slot start
+            end: Slot end
+
+        Returns:
+            list: Conflict tuples
+        """
+        conflicts = []
+        for student_id in student_ids:
+            key = ('student', student_id)
+            for commitment in self.index.conflicts(key, start, end):
+                conflicts.append(Conflict(key, commitment))
+        return conflicts
+
+    def interviewer_conflicts(self, interviewer, start, end):
+        key = ('interviewer', interviewer)
+        return [Conflict(key, commitment) for commitment in self.index.conflicts(key, start, end)]
+
+    def auto_assign(self, round, slot_minutes, interviewers, last_start=None):
+        """
+        Pack a round's candidates into the earliest non-conflicting slots.
+
+        Slots start at round.round_date and repeat every slot_minutes; each
+        slot time runs one interview per interviewer (panel). Candidates are
+        placed greedily in application order into the first slot time where
+        they and some free interviewer have no other commitment.
+
+        Args:
+            round: The InterviewRound object
+            slot_minutes: Length of each candidate's slot
+            interviewers: Names of the panels running the round in parallel
+            last_start: Latest allowed slot start (defaults to the end of the window)
+
+        Returns:
+            tuple: (list of SlotAssignment, list of application ids left unassigned)
+        """
+        length = timedelta(minutes=slot_minutes)
+        last_start = last_start or self.window_end - length
+
+        candidates = db.session.execute(
+            db.select(Application.id, Application.student_id)
+            .where(Application.job_id == round.job_id, Application.status.in_(ACTIVE_STATUSES))
+            .order_by(Application.id)
+        ).all()
+
+        slot_times = []
+        start = round.round_date
+        while start <= last_start:
+            slot_times.append(start)
+            start += length
+
+        # Interviewers still free at each slot time
+        free = [
+            [name for name in interviewers if not self.index.has_conflict(('interviewer', name), t, t + length)]
+            for t in slot_times
+        ]
+        first_open = 0
+
+        assignments = []
+        unassigned = []
+        for application_id, student_id in candidates:
+            key = ('student', student_id)
+            while first_open < len(slot_times) and not free[first_open]:
+                first_open += 1
+
+            for position in range(first_open, len(slot_times)):
+                slot_start = slot_times[position]
+                slot_end = slot_start + length
+                if not free[position] or self.index.has_conflict(key, slot_start, slot_end):
+                    continue
+
+                interviewer = free[position].pop(0)
+                commitment = Commitment(slot_start, slot_end, 'interview', round.round_name)
+                self.index.add(key, commitment)
+                self.index.add(('interviewer', interviewer), commitment)
+                assignments.append(SlotAssignment(application_id, student_id, interviewer, slot_start, slot_end))
+                break
+            else:
+                unassigned.append(application_id)
+
+        return assignments, unassigned
+
+
+def save_assignments(round, assignments):
+    """
+    Replace a round's slots with the given assignments in one bulk insert.
+    """
+    db.session.execute(db.delete(InterviewSlot).where(InterviewSlot.round_id == round.id))
+    if assignments:
+        db.session.execute(db.insert(InterviewSlot), [
+            {
+                'round_id': round.id,
+                'application_id': assignment.application_id,
+                'interviewer': assignment.interviewer,
+                'start_time': assignment.start,
+                'end_time': assignment.end,
+            }
+            for assignment in assignments
+        ])
+
+
+def parse_interviewer_availability(text):
+    """
+    Parse one interviewer per line as
+    "Name | capacity | 2025-11-03 09:00 - 12:00; 2025-11-04 14:00 - 17:00".
+
+    Returns:
+        list: InterviewerAvailability tuples, windows as (start, end) datetimes
+
+    Raises:
+        ValueError: With the offending line number if a line is malformed
+    """
+    interviewers = []
+    for number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            name, capacity, windows = [part.strip() for part in line.split('|')]
+            parsed_windows = []
+            for window in windows.split(';'):
+                start_text, end_text = [part.strip() for part in window.split(' - ')]
+                start = datetime.strptime(start_text, AVAILABILITY_TIME_FORMAT)
+                end = datetime.strptime(f'{start_text[:10]} {end_text}', AVAILABILITY_TIME_FORMAT)
+                if end <= start:
+                    raise ValueError
+                parsed_windows.append((start, end))
+            interviewers.append(InterviewerAvailability(name, int(capacity), parsed_windows))
+        except ValueError:
+            raise ValueError(
+                f'Line {number}: expected "Name | capacity | YYYY-MM-DD HH:MM - HH:MM; ..."'
+            )
+        if not name or interviewers[-1].capacity < 1:
+            raise ValueError(f'Line {number}: needs a name and a capacity of at least 1')
+    return interviewers
+
+
+def mock_cohort(branches=None, min_cgpa=None, max_cgpa=None, not_yet_mocked=False):
+    """
+    Students for a bulk mock round, ordered by roll number.
+
+    Args:
+        branches: Branch names to include; None for all
+        min_cgpa: Lowest CGPA to include
+        max_cgpa: Highest CGPA to include
+        not_yet_mocked: Skip students with a mock interview this season
+
+    Returns:
+        list: (id, full_name, roll_number) rows
+    """
+    query = db.select(StudentProfile.id, StudentProfile.full_name, StudentProfile.roll_number)
+    if branches:
+        query = query.where(StudentProfile.branch.in_(branches))
+    if min_cgpa is not None:
+        query = query.where(StudentProfile.cgpa >= min_cgpa)
+    if max_cgpa is not None:
+        query = query.where(StudentProfile.cgpa <= max_cgpa)
+    if not_yet_mocked:
+        query = query.where(~db.exists().where(
+            MockInterview.student_id == StudentProfile.id,
+            MockInterview.scheduled_date >= season_start(current_season())
+        ))
+    return db.session.execute(query.order_by(StudentProfile.roll_number)).all()
+
+
+def assign_mock_interviews(students, interviewers, slot_minutes, mock_minutes=DEFAULT_MOCK_MINUTES):
+    """
+    Assign students to interviewer slots in one pass over time.
+
+    Every interviewer's windows are cut into slot_minutes slots, dropping
+    those that clash with the interviewer's existing commitments. Slots are
+    then filled in start order (ties by interviewer order), each with the
+    first waiting student who is free at that time, until the interviewer's
+    capacity or the students run out.
+
+    Args:
+        students: (id, full_name, roll_number) rows, in priority order
+        interviewers: InterviewerAvailability tuples
+        slot_minutes: Length of each mock interview
+        mock_minutes: Assumed length of already scheduled mocks
+
+    Returns:
+        tuple: (list of MockAssignment, list of unassigned student rows)
+    """
+    length = timedelta(minutes=slot_minutes)
+    windows = [window for interviewer in interviewers for window in interviewer.windows]
+    if not windows or not students:
+        return [], list(students)
+
+    schedule = ScheduleIndex(
+        min(start for start, _ in windows), max(end for _, end in windows), mock_minutes=mock_minutes
+    ).load()
+
+    slots = []
+    for order, interviewer in enumerate(interviewers):
+        key = ('interviewer', interviewer.name)
+        for window_start, window_end in interviewer.windows:
+            start = window_start
+            while start + length <= window_end:
+                if not schedule.index.has_conflict(key, start, start + length):
+                    slots.append((start, order))
+                start += length
+    slots.sort()
+
+    remaining = {interviewer.name: interviewer.capacity for interviewer in interviewers}
+    waiting = list(students)
+    assignments = []
+    for start, order in slots:
+        if not waiting:
+            break
+        interviewer = interviewers[order].name
+        end = start + length
+        # Overlapping windows for one interviewer must not double-book them
+        if not remaining[interviewer] or schedule.index.has_conflict(('interviewer', interviewer), start, end):
+            continue
+
+        for position, student in enumerate(waiting):
+            key = ('student', student.id)
+            if schedule.index.has_conflict(key, start, end):
+                continue
+            del waiting[position]
+            remaining[interviewer] -= 1
+            commitment = Commitment(start, end, 'mock', 'Mock interview')
+            schedule.index.add(key, commitment)
+            schedule.index.add(('interviewer', interviewer), commitment)
+            assignments.append(MockAssignment(student.id, student.full_name, student.roll_number,
+                                              interviewer, start, end))
+            break
+
+    return assignments, waiting
+
+
+def save_mock_interviews(assignments, topic, scheduled_by):
+    """
+    Insert the assigned mock interviews with one bulk insert.
+    """
+    if assignments:
+        db.session.execute(db.insert(MockInterview), [
+            {
+                'student_id': assignment.student_id,
+                'scheduled_by': scheduled_by,
+                'interviewer': assignment.interviewer,
+                'scheduled_date': assignment.start,
+                'topic': topic,
+            }
+            for assignment in assignments
+        ])
@@ -0,0 +1,258 @@
+# Resume skill extraction into the indexed student_skill table
+
+import json
+import logging
+import os
+import re
+
+import sqlalchemy as sa
+
+from app import app, db
+from blob_store import blob_store
+from commit_hooks import on_commit
+from models import StudentProfile, StudentSkill
+from process_pool import ProcessPool
+
+# Characters that continue a skill name, so "c++" does not match inside
+# "c++11" and "js" does not match inside "node.js"
+BEFORE_BOUNDARY = r'(?<![\w.+#])'
+AFTER_BOUNDARY = r'(?![\w+#])'
+
+
+def load_taxonomy(path):
+    """
+    Read the skill taxonomy: a JSON object mapping each skill's display
+    name to a list of aliases found in resumes.
+
+    Returns:
+        dict: Skill name -> list of aliases
+
+    Raises:
+        ValueError: If the file is not an object of string lists
+    """
+    with open(path, encoding='utf-8') as f:
+        taxonomy = json.load(f)
+    if not isinstance(taxonomy, dict):
+        raise ValueError('Skill taxonomy must be a JSON object of skill -> aliases')
+    for name, aliases in taxonomy.items():
+        if not isinstance(aliases, list) or not all(isinstance(alias, str) for alias in aliases):
+            raise ValueError(f'Aliases of {name!r} must be a list of strings')
+    return taxonomy
+
+
+def _normalize(text):
+    return ' '.join(text.lower().split())
+
+
+def _trie_pattern(words):
+    """
+    One regular expression matching any of the words, factored into a
+    trie so the engine follows shared prefixes once instead of trying every
+    alternative at each position. Longer words are preferred.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def render(node):
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        if '' in node:
+            return '(?:' + '|'.join(branches) + ')?'
+        if len(branches) == 1:
+            return branches[0]
+        return '(?:' + '|'.join(branches) + ')'
+
+    return render(trie)
+
+
+class SkillMatcher:
+    """
+    Finds taxonomy skills in text with a single precompiled pattern over
+    every alias, so a resume is scanned once whatever the taxonomy size.
+    """
+
+    def __init__(self, taxonomy):
+        # Only aliases are looked for in resumes, since some names ("Go",
+        # "R", "C") are ordinary words; filters accept names and aliases. An
+        # alias may stand for several skills, e.g. "c/c++".
+        self.aliases = {}
+        for name, aliases in taxonomy.items():
+            for alias in aliases:
+                self.aliases.setdefault(_normalize(alias), []).append(name)
+        self.names = {**{alias: names[0] for alias, names in self.aliases.items()},
+                      **{_normalize(name): name for name in taxonomy}}
+        self.skills = sorted(taxonomy, key=str.lower)
+        self.pattern = re.compile(BEFORE_BOUNDARY + '(' + _trie_pattern(self.aliases) + ')' + AFTER_BOUNDARY)
+
+    def extract(self, text):
+        """
+        Returns:
+            set: Names of the skills mentioned in the text
+        """
+        if not text or not self.aliases:
+            return set()
+        return {name for match in self.pattern.findall(_normalize(text)) for name in self.aliases[match]}
+
+    def canonical(self, name):
+        """The taxonomy name for a skill name or alias, or None if unknown."""
+        return self.names.get(_normalize(name))
+
+
+def store_skills(results):
+    """
+    Replace the stored skills of each student whose resume has not changed
+    since it was read, and commit.
+
+    Args:
+        results: (student_id, resume_digest, skill names) tuples
+
+    Returns:
+        int: Number of students whose skills were stored
+    """
+    stored = []
+    for student_id, digest, skills in results:
+        # Skip the student if the resume was replaced after it was read; the
+        # newer resume has its own extraction queued
+        if db.session.execute(
+            db.update(StudentProfile)
+            .where(StudentProfile.id == student_id, StudentProfile.resume_digest == digest)
+            .values(skills_digest=digest)
+            .execution_options(synchronize_session=False)
+        ).rowcount:
+            stored.append((student_id, skills))
+
+    if stored:
+        db.session.execute(
+            db.delete(StudentSkill)
+            .where(StudentSkill.student_id.in_([student_id for student_id, _ in stored]))
+            .execution_options(synchronize_session=False)
+        )
+        rows = [{'student_id': student_id, 'skill': skill} for student_id, skills in stored for skill in skills]
+        if rows:
+            db.session.execute(db.insert(StudentSkill), rows)
+    db.session.commit()
+    return len(stored)
+
+
+def extract_skills(student_ids):
+    """
+    Extract and store the skills in these students' current resumes. Runs
+    in a skill pool process, or inline from `flask extract-skills`.
+
+    Args:
+        student_ids: StudentProfile ids
+
+    Returns:
+        int: Number of students whose skills were stored
+    """
+    with app.app_context():
+        results = []
+        for student_id, text, digest in db.session.execute(
+            db.select(StudentProfile.id, StudentProfile.resume_text, StudentProfile.resume_digest)
+            .where(StudentProfile.id.in_(student_ids))
+        ):
+            if text is None and digest:
+                text = blob_store.get(digest)
+                if text is None:
+                    # Lost blob (already logged); keep the skills found before
+                    continue
+            results.append((student_id, digest, sorted(skill_extractor.matcher.extract(text))))
+        return store_skills(results)
+
+
+def _log_failure(student_ids, future):
+    if future.exception() is not None:
+        logging.error(f'Skill extraction failed for students {student_ids}: {future.exception()}')
+
+
+class SkillExtractor:
+    """
+    Keeps the student_skill table in step with resumes. When a commit
+    changes a resume, the student is queued on a pool of
+    SKILL_EXTRACTION_WORKERS processes (started on first use, per web
+    worker), so matching never runs on the request path. With no workers,
+    skills are only extracted by `flask extract-skills`.
+
+    The taxonomy is read from SKILLS_TAXONOMY_PATH when the app starts.
+    """
+
+    def __init__(self, app=None):
+        self.path = None
+        self.pool = ProcessPool(max_workers=1)
+        self.matcher = SkillMatcher({})
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.path = app.config.get('SKILLS_TAXONOMY_PATH') or os.path.join(app.root_path, 'data', 'skills.json')
+        self.pool.max_workers = app.config.get('SKILL_EXTRACTION_WORKERS', 1)
+        self.matcher = SkillMatcher(load_taxonomy(self.path))
+
+    @property
+    def skills(self):
+        """Every skill name in the taxonomy, alphabetically."""
+        return self.matcher.skills
+
+    def submit(self, student_ids):
+        """Queue skill extraction for these students, if workers are configured."""
+        student_ids = sorted(student_ids)
+        if not student_ids or self.pool.max_workers < 1:
+            return
+        future = self.pool.submit(extract_skills, student_ids)
+        future.add_done_callback(lambda f: _log_failure(student_ids, f))
+
+
+skill_extractor = SkillExtractor(app)
+
+
+def parse_skills(raw):
+    """
+    Read a comma-separated skill filter such as "python, react". Aliases
+    are mapped to their taxonomy names; unknown names are kept as given and
+    match no one.
+
+    Returns:
+        list: Distinct skill names in the order given
+    """
+    skills = []
+    for name in (raw or '').split(','):
+        name = name.strip()
+        if name:
+            skill = skill_extractor.matcher.canonical(name) or name
+            if skill not in skills:
+                skills.append(skill)
+    return skills
+
+
+def students_with_skills(skills):
+    """
+    Ids of students with all of these skills, for use in
+    `StudentProfile.id.in_(...)`. Reads only the (skill, student_id) index.
+
+    Args:
+        skills: Skill names as stored, e.g. from parse_skills
+
+    Returns:
+        Select: A statement selecting student ids
+    """
+    return (
+        db.select(StudentSkill.student_id)
+        .where(StudentSkill.skill.in_(skills))
+        .group_by(StudentSkill.student_id)
+        .having(db.func.count() == len(skills))
+    )
+
+
+# Queue students whose resume changed in a committed transaction
+def _collect_changes(session, changes):
+    for obj in session.new | session.dirty:
+        if isinstance(obj, StudentProfile) and sa.inspect(obj).attrs.resume_digest.history.has_changes():
+            changes.add(obj.id)
+
+
+pending_skill_changes = on_commit('skill_changes', _collect_changes, skill_extractor.submit, container=set)
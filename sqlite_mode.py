@@ -0,0 +1,177 @@
+# SQLite production mode: connection pragmas and a single-writer write queue
+
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError
+
+import sqlalchemy as sa
+
+from replica import stick_to_primary
+
+# Seconds a request waits for the writer thread to start its write
+WRITE_TIMEOUT = 30
+
+
+def set_sqlite_pragmas(engine, config):
+    """
+    Apply the SQLITE_* settings to every new connection of a SQLite engine.
+
+    WAL lets readers run alongside the single writer, and the busy timeout
+    makes a writer wait for the lock instead of failing with "database is
+    locked".
+
+    Args:
+        engine: A SQLAlchemy engine; non-SQLite engines are left alone
+        config: The Flask app config
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = [
+        f"journal_mode={config.get('SQLITE_JOURNAL_MODE', 'WAL')}",
+        f"synchronous={config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f"busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        # Negative cache_size is in KiB rather than pages
+        f"cache_size={-int(config.get('SQLITE_CACHE_SIZE_KB', 65536))}",
+        f"mmap_size={int(config.get('SQLITE_MMAP_SIZE', 268435456))}",
+        'temp_store=MEMORY',
+    ]
+
+    @sa.event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(f'PRAGMA {pragma}')
+        cursor.close()
+
+
+class WriteQueue:
+    """
+    Runs short write transactions one at a time on a dedicated writer
+    thread per worker, committing queued writes together (group commit).
+
+    SQLite allows one writer at a time; funnelling a worker's writes through
+    one thread means its request threads never contend for the write lock,
+    and a burst of submissions costs one commit instead of one each. With
+    the queue disabled (or on other databases) writes run inline in the
+    request's session.
+
+    Write functions use db.session, must not commit, and should return plain
+    values rather than ORM objects, since they may run in another session.
+    """
+
+    def __init__(self):
+        self.db = None
+        self.app = None
+        self.enabled = False
+        self.batch_size = 50
+        self._queue = queue.Queue()
+        self._writer = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app, db):
+        """
+        Apply SQLite pragmas to the app's SQLite engines and enable the
+        queue if SQLITE_WRITE_QUEUE is set. Call inside an app context,
+        before the first connection is opened.
+        """
+        self.app = app
+        self.db = db
+        for engine in db.engines.values():
+            set_sqlite_pragmas(engine, app.config)
+
+        self.enabled = app.config.get('SQLITE_WRITE_QUEUE', False) and db.engine.dialect.name == 'sqlite'
+        self.batch_size = app.config.get('SQLITE_WRITE_BATCH_SIZE', 50)
+
+    def run(self, func, *args, **kwargs):
+        """
+        Run a write function in a transaction and return its result once
+        committed.
+
+        Raises:
+            TimeoutError: If the writer did not start the write within
+            WRITE_TIMEOUT seconds; the write is cancelled and never runs
+            Exception: Whatever the function or the commit raised; the write
+            is rolled back
+        """
+        if not self.enabled:
+            try:
+                result = func(*args, **kwargs)
+                self.db.session.commit()
+            except Exception:
+                self.db.session.rollback()
+                raise
+            return result
+
+        # Hand the request's pooled connection back so the writer never
+        # waits for a connection held by a request waiting on the writer
+        self.db.session.commit()
+
+        future = Future()
+        self._start()
+        self._queue.put((future, func, args, kwargs))
+        try:
+            result, wrote = future.result(timeout=WRITE_TIMEOUT)
+        except TimeoutError:
+            if future.cancel():
+                raise
+            # Already started: it will commit or fail shortly, so wait for it
+            result, wrote = future.result()
+
+        # The writer thread has no request, so the read-your-writes cookie
+        # is set here
+        if wrote:
+            stick_to_primary()
+        return result
+
+    def _start(self):
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name='sqlite-writer', daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        with self.app.app_context():
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                # Drop writes whose request timed out; the rest can no longer be cancelled
+                batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+                if batch:
+                    self._commit(batch)
+                    self.db.session.close()
+
+    def _commit(self, batch):
+        """
+        Run a batch of writes in one transaction. If any of them fails, the
+        batch is rolled back and each write is retried on its own, so one
+        bad write only fails its own request.
+        """
+        results = []
+        try:
+            for future, func, args, kwargs in batch:
+                result = func(*args, **kwargs)
+                # Flush each write on its own to tell whether it changed anything
+                self.db.session.flush()
+                results.append((result, self.db.session.info.pop('wrote', False)))
+            self.db.session.commit()
+        except Exception as e:
+            self.db.session.rollback()
+            self.db.session.info.pop('wrote', None)
+            if len(batch) > 1:
+                for item in batch:
+                    self._commit([item])
+            else:
+                batch[0][0].set_exception(e)
+            return
+
+        for (future, *_), result in zip(batch, results):
+            future.set_result(result)
+
+
+write_queue = WriteQueue()
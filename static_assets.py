@@ -0,0 +1,210 @@
+# Fingerprinted, precompressed static assets with far-future caching
+
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+
+from flask import abort, request, send_file, url_for
+
+from compression import brotli, COMPRESSIBLE_TYPES
+
+# Hex digits of the content hash put into asset names
+FINGERPRINT_LENGTH = 12
+
+# Fingerprinted URLs never change content, so browsers may keep them a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+MANIFEST_NAME = 'manifest.json'
+
+# Content coding -> suffix of the precompressed copy
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def fingerprinted_name(filename, digest):
+    """
+    Put a content hash into a file name: css/site.css -> css/site.3f2a9c1b7d4e.css
+    """
+    root, extension = os.path.splitext(filename)
+    return f'{root}.{digest[:FINGERPRINT_LENGTH]}{extension}'
+
+
+def _static_files(folder):
+    """
+    Yield (name relative to the folder with / separators, path) for every
+    file in the static folder, skipping hidden files.
+    """
+    if not folder or not os.path.isdir(folder):
+        return
+    for directory, subdirectories, files in os.walk(folder):
+        subdirectories[:] = sorted(name for name in subdirectories if not name.startswith('.'))
+        for name in sorted(files):
+            if not name.startswith('.'):
+                path = os.path.join(directory, name)
+                yield os.path.relpath(path, folder).replace(os.sep, '/'), path
+
+
+def _compressible(filename):
+    return mimetypes.guess_type(filename)[0] in COMPRESSIBLE_TYPES
+
+
+def build_assets(static_folder, build_path, min_size=500):
+    """
+    Copy every static file to build_path under its fingerprinted name,
+    with .gz (and .br when Brotli is installed) copies of text files that
+    come out smaller, and write the manifest. The manifest is written last,
+    so a build that fails part-way leaves the previous one in use.
+
+    Returns:
+        int: Number of assets built
+    """
+    files = {}
+    encodings = {}
+    sources = {}
+    for name, path in _static_files(static_folder):
+        with open(path, 'rb') as f:
+            data = f.read()
+            stat = os.fstat(f.fileno())
+        sources[name] = [stat.st_size, stat.st_mtime_ns]
+        fingerprinted = fingerprinted_name(name, hashlib.sha256(data).hexdigest())
+        target = os.path.join(build_path, fingerprinted)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(data)
+
+        variants = []
+        if _compressible(name) and len(data) >= min_size:
+            compressed = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                compressed['br'] = brotli.compress(data, quality=11)
+            for encoding, body in compressed.items():
+                if len(body) < len(data):
+                    with open(target + ENCODING_SUFFIXES[encoding], 'wb') as f:
+                        f.write(body)
+                    variants.append(encoding)
+
+        files[name] = fingerprinted
+        if variants:
+            encodings[fingerprinted] = variants
+
+    os.makedirs(build_path, exist_ok=True)
+    manifest = os.path.join(build_path, MANIFEST_NAME)
+    with open(manifest + '.tmp', 'w') as f:
+        json.dump({'files': files, 'encodings': encodings, 'sources': sources}, f, indent=2, sort_keys=True)
+    os.replace(manifest + '.tmp', manifest)
+    return len(files)
+
+
+class StaticAssets:
+    """
+    Serves static files at /assets/ under content-hash names, marked
+    immutable for a year. Templates link them with
+    {{ asset_url('css/style.css') }}; a changed file gets a new URL, so
+    repeat page loads fetch only the HTML.
+
+    `flask build-assets` writes the fingerprinted files and their
+    precompressed copies to ASSETS_BUILD_PATH. Without a build, or when
+    the static folder no longer matches it, names are hashed from the
+    static folder at startup and served uncompressed.
+    """
+
+    def __init__(self, app=None):
+        self.static_folder = None
+        self.build_path = None
+        self.manifest = {}
+        self.paths = {}
+        self.encodings = {}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.static_folder = app.static_folder
+        self.build_path = app.config.get('ASSETS_BUILD_PATH') or os.path.join(app.instance_path, 'assets')
+        self.load()
+        app.add_url_rule('/assets/<path:filename>', 'assets', self.serve)
+        app.jinja_env.globals['asset_url'] = self.url
+
+    def load(self):
+        """
+        Read the build manifest, or hash the static folder if there is none
+        or it is out of date.
+        """
+        manifest = os.path.join(self.build_path, MANIFEST_NAME)
+        if os.path.exists(manifest):
+            with open(manifest) as f:
+                built = json.load(f)
+            stale = self._stale_files(built)
+            if not stale:
+                self.manifest = built['files']
+                self.paths = {name: os.path.join(self.build_path, name) for name in self.manifest.values()}
+                self.encodings = built['encodings']
+                return
+            logging.warning(f'Static files changed since `flask build-assets` ({", ".join(stale[:5])}); '
+                            f'serving the static folder uncompressed until the assets are rebuilt')
+
+        self.manifest, self.paths, self.encodings = {}, {}, {}
+        for name, path in _static_files(self.static_folder):
+            with open(path, 'rb') as f:
+                fingerprinted = fingerprinted_name(name, hashlib.sha256(f.read()).hexdigest())
+            self.manifest[name] = fingerprinted
+            self.paths[fingerprinted] = path
+
+    def _stale_files(self, built):
+        """
+        Static files added, removed or changed since the build. A file whose
+        size and mtime differ from the build (e.g. after a fresh checkout)
+        is hashed and only counts as changed if its content did.
+
+        Returns:
+            list: Names of the stale files; empty if the build is current or
+            there is no static folder to compare with
+        """
+        if not self.static_folder or not os.path.isdir(self.static_folder):
+            return []
+
+        current = dict(_static_files(self.static_folder))
+        sources = built.get('sources', {})
+        stale = sorted(set(built['files']) ^ set(current))
+        for name in sorted(set(built['files']) & set(current)):
+            stat = os.stat(current[name])
+            if sources.get(name) == [stat.st_size, stat.st_mtime_ns]:
+                continue
+            with open(current[name], 'rb') as f:
+                if fingerprinted_name(name, hashlib.sha256(f.read()).hexdigest()) != built['files'][name]:
+                    stale.append(name)
+        return stale
+
+    def url(self, filename):
+        """
+        URL of a static file by its plain name; files not in the manifest
+        fall back to the ordinary static URL.
+        """
+        fingerprinted = self.manifest.get(filename)
+        if fingerprinted is None:
+            return url_for('static', filename=filename)
+        return url_for('assets', filename=fingerprinted)
+
+    def serve(self, filename):
+        path = self.paths.get(filename)
+        if path is None:
+            abort(404)
+
+        variants = self.encodings.get(filename, [])
+        encoding = request.accept_encodings.best_match(variants) if variants else None
+        response = send_file(
+            path + ENCODING_SUFFIXES[encoding] if encoding else path,
+            mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+            max_age=IMMUTABLE_MAX_AGE
+        )
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if variants:
+            response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+
+static_assets = StaticAssets()
@@ -1,3 +1,11 @@
+from datetime import datetime
+from functools import lru_cache
+
+from flask import current_app, has_app_context
+
+# Month in which a new placement season (academic year) starts
+SEASON_START_MONTH = 7
+
 def check_eligibility(student, job):
     """
     Check if a student is eligible for a job based on CGPA and branch.
@@ -20,6 +28,7 @@ def check_eligibility(student, job):
     
     return True
 
+@lru_cache(maxsize=256)
 def format_branches(branches_str):
     """
     Format the comma-separated branches string into a readable format.
@@ -36,6 +45,7 @@ def format_branches(branches_str):
     branches = branches_str.split(',')
     return ", ".join(branches)
 
+@lru_cache(maxsize=64)
 def format_status(status):
     """
     Format the application status for display.
@@ -58,3 +68,58 @@ def format_status(status):
         return status_map[status]
     
     return (status.replace('_', ' ').title(), 'badge-secondary')
+
+def season_for(moment):
+    """
+    Return the placement season (academic year) a date falls in.
+    
+    Args:
+        moment: A datetime
+    
+    Returns:
+        str: The season, e.g. '2025-26'
+    """
+    start_year = moment.year if moment.month >= SEASON_START_MONTH else moment.year - 1
+    return f'{start_year}-{(start_year + 1) % 100:02d}'
+
+def season_start(season):
+    """
+    Return the first day of a placement season.
+    
+    Args:
+        season: The season, e.g. '2025-26'
+    
+    Returns:
+        datetime: Midnight on the season's first day
+    """
+    return datetime(int(season[:4]), SEASON_START_MONTH, 1)
+
+def current_season():
+    """
+    Return the season live pages work with: CURRENT_SEASON from the config,
+    or the season of today's date.
+    
+    Returns:
+        str: The current season
+    """
+    if has_app_context() and current_app.config.get('CURRENT_SEASON'):
+        return current_app.config['CURRENT_SEASON']
+    return season_for(datetime.utcnow())
+
+def live_season_filter(season_column, season=None):
+    """
+    Build the season condition for live pages: the given season, or by
+    default the current season and any later one, since a posting whose
+    deadline falls in the next season is listed before that season starts.
+    Season names sort in date order.
+    
+    Args:
+        season_column: The season column to filter on
+        season: A season chosen by the user, e.g. '2025-26'
+    
+    Returns:
+        The SQL condition
+    """
+    if season:
+        return season_column == season
+    return season_column >= current_season()